@@ -7,6 +7,7 @@ from ..utils.visualizer import audiowave_visualizer
 from ..utils.metadata_utils import get_audio_bitrate
 from .effects import VoiceEffectProcessor
 from filemac.utils.colors import fg, rs
+from filemac.utils.workspace import Workspace
 import sys
 # import io
 
@@ -34,6 +35,9 @@ class VideoProcessor:
         Clogger.info(f"Set Voice effect : {fg.MAGENTA}{effect}{RESET}")
         Clogger.info(f"Processing video file: {input_file}")
 
+        # Intermediate audio of this run only, concurrent runs in one
+        # directory no longer overwrite each other's files
+        ws = Workspace("audiobot")
         try:
             # Get the original video bitrate
             original_bitrate = get_audio_bitrate(input_file, verbosity)
@@ -54,7 +58,8 @@ class VideoProcessor:
             finally:
                 sys.stdout = old_stdout  # Restore stdout
                 sys.stderr = old_stderr  # Restore stder
-                audio_file = "temp_audio.wav"
+                audio_file = str(ws.temp_file(".wav"))
+                modified_file = str(ws.temp_file(".wav"))
 
             # Extract audio and save it to a file
             if verbosity:
@@ -74,10 +79,10 @@ class VideoProcessor:
             # Export the modified audio to a WAV file
             if verbosity:
                 Clogger.info("Export the modified audio to a WAV file")
-            modified_audio.export("modified_audio.wav", format="wav")
+            modified_audio.export(modified_file, format="wav")
 
             # Load the modified audio file back into an AudioFileClip
-            new_audio = AudioFileClip("modified_audio.wav")
+            new_audio = AudioFileClip(modified_file)
 
             # Set the video to use the modified audio
             if verbosity:
@@ -108,12 +113,7 @@ class VideoProcessor:
             Clogger.debug(f"Final bitrate = {get_audio_bitrate(output_file)}")
             # Optional: visualize the before and after audio
             if visualize:
-                audiowave_visualizer(audio_file, "modified_audio.wav")
-
-            # Clean up temporary files
-            if os.path.exists(audio_file):
-                os.remove(audio_file)
-                os.remove("modified_audio.wav")
+                audiowave_visualizer(audio_file, modified_file)
 
         except KeyboardInterrupt:
             Clogger.info("Quit")
@@ -121,6 +121,9 @@ class VideoProcessor:
         except Exception as e:
             Clogger.error(f"Error processing video file {input_file}: {e}")
             # raise
+        finally:
+            # Clean up temporary files
+            ws.cleanup()
 
 
 class AudioProcessor:
@@ -38,21 +38,64 @@ Extract text from an image.
         example filemac --OCR image.png
 """
 
-from audiobot.cli import cli as audiobot
-
-from .core.image.core import (
-    GrayscaleConverter,
-    ImageCompressor,
-    ImageConverter,
-    ImageDocxConverter,
-    ImagePdfConverter,
-)
-from .core.pdf.core import PageExtractor, PDF2LongImageConverter, PDFCombine
-from .core.recorder import SoundRecorder
-from .core.video.core import VideoConverter
-from .cli.main import CliInit as main, OperationMapper
-from .cli.converter import DocConverter
-from voice.VoiceType import VoiceTypeEngine
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:  # pragma: no cover - static analysers only
+    from audiobot.cli import cli as audiobot
+    from voice.VoiceType import VoiceTypeEngine
+
+    from .cli.main import CliInit as main, OperationMapper
+    from .core.document import DocConverter
+    from .core.image.core import (
+        GrayscaleConverter,
+        ImageCompressor,
+        ImageConverter,
+        ImageDocxConverter,
+        ImagePdfConverter,
+    )
+    from .core.pdf.core import PageExtractor, PDF2LongImageConverter, PDFCombine
+    from .core.pipeline import Source, convert
+    from .core.recorder import SoundRecorder
+    from .core.video.core import VideoConverter
+
+# Public names are resolved on first attribute access so that `filemac --help`
+# and `filemac --version` do not pay for cv2, moviepy, librosa or pyautogui
+# (the latter also needs a display and breaks on headless machines).
+_LAZY_ATTRS = {
+    "audiobot": ("audiobot.cli", "cli"),
+    "GrayscaleConverter": (".core.image.core", "GrayscaleConverter"),
+    "ImageConverter": (".core.image.core", "ImageConverter"),
+    "ImageCompressor": (".core.image.core", "ImageCompressor"),
+    "ImagePdfConverter": (".core.image.core", "ImagePdfConverter"),
+    "ImageDocxConverter": (".core.image.core", "ImageDocxConverter"),
+    "PDF2LongImageConverter": (".core.pdf.core", "PDF2LongImageConverter"),
+    "PDFCombine": (".core.pdf.core", "PDFCombine"),
+    "PageExtractor": (".core.pdf.core", "PageExtractor"),
+    "VideoConverter": (".core.video.core", "VideoConverter"),
+    "SoundRecorder": (".core.recorder", "SoundRecorder"),
+    "DocConverter": (".core.document", "DocConverter"),
+    "Source": (".core.pipeline", "Source"),
+    "convert": (".core.pipeline", "convert"),
+    "OperationMapper": (".cli.main", "OperationMapper"),
+    "VoiceTypeEngine": ("voice.VoiceType", "VoiceTypeEngine"),
+    "main": (".cli.main", "CliInit"),
+}
+
+
+def __getattr__(name):
+    try:
+        module_name, attr = _LAZY_ATTRS[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    value = getattr(importlib.import_module(module_name, __name__), attr)
+    # Cache on the module so the import machinery is only hit once per name
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
 
 
 __version__ = "2.1.0"
@@ -70,6 +113,8 @@ __all__ = [
     "VideoConverter",
     "SoundRecorder",
     "DocConverter",
+    "Source",
+    "convert",
     "OperationMapper",
     "VoiceTypeEngine",
     "main",
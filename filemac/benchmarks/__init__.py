@@ -0,0 +1,6 @@
+"""
+Benchmarks bundled with filemac.
+
+Each module can be executed directly, e.g:
+    python -m filemac.benchmarks.startup --budget 0.5
+"""
@@ -0,0 +1,149 @@
+"""
+Per-job latency with and without the `filemac serve` daemon.
+
+Starts a private daemon on a temporary socket, runs the same job repeatedly
+through the normal cli entry in both modes and reports the latencies.
+
+    python -m filemac.benchmarks.daemon
+    python -m filemac.benchmarks.daemon --runs 50 -- --convert_doc notes.txt -tf docx
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Sequence
+
+DEFAULT_RUNS = 20
+
+_ENTRY = "import sys; from filemac.cli.main import CliInit; CliInit()"
+_SERVE = "from filemac.cli.main import CliInit; CliInit(['serve'])"
+
+
+class JobError(RuntimeError):
+    """The job exited with an error, its timings mean nothing."""
+
+
+def _time_jobs(argv: Sequence[str], env: dict, runs: int) -> List[float]:
+    """
+    Return wall clock durations (seconds) of `runs` jobs.
+
+    Raises:
+        JobError: a job exited with an error.
+    """
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-c", _ENTRY, *argv],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+            check=False,
+        )
+        timings.append(time.perf_counter() - start)
+        if result.returncode != 0:
+            mode = "without" if env.get("FILEMAC_NO_DAEMON") else "with"
+            raise JobError(
+                f"filemac {' '.join(argv)} exited with {result.returncode} "
+                f"{mode} the daemon: {result.stderr.strip()[-200:]}"
+            )
+    return timings
+
+
+def _summary(timings: List[float]) -> dict:
+    return {
+        "mean": statistics.mean(timings),
+        "median": statistics.median(timings),
+        "min": min(timings),
+        "max": max(timings),
+    }
+
+
+def run(argv: Sequence[str], runs: int = DEFAULT_RUNS, startup_timeout=60) -> dict:
+    with tempfile.TemporaryDirectory(prefix="filemac_bench_") as tmp:
+        socket_path = Path(tmp) / "filemac.sock"
+        env = dict(os.environ, FILEMAC_SOCKET=str(socket_path))
+        env.pop("FILEMAC_NO_DAEMON", None)
+
+        cold = _time_jobs(argv, dict(env, FILEMAC_NO_DAEMON="1"), runs)
+
+        daemon = subprocess.Popen(
+            [sys.executable, "-c", _SERVE],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            warm_start = time.perf_counter()
+            while not socket_path.exists():
+                if daemon.poll() is not None:
+                    raise RuntimeError("filemac daemon exited during start up")
+                if time.perf_counter() - warm_start > startup_timeout:
+                    raise TimeoutError("filemac daemon did not start in time")
+                time.sleep(0.05)
+            warm_up = time.perf_counter() - warm_start
+            warm = _time_jobs(argv, env, runs)
+        finally:
+            daemon.terminate()
+            daemon.wait()
+
+    report = {
+        "argv": list(argv),
+        "runs": runs,
+        "daemon_warm_up": warm_up,
+        "without_daemon": _summary(cold),
+        "with_daemon": _summary(warm),
+    }
+    report["speedup"] = (
+        report["without_daemon"]["median"] / report["with_daemon"]["median"]
+    )
+    return report
+
+
+def main(args=None) -> int:
+    parser = argparse.ArgumentParser(description="filemac daemon latency benchmark")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS)
+    parser.add_argument("--json", action="store_true", help="Print JSON report")
+    parser.add_argument(
+        "job", nargs="*", default=["--version"], help="Arguments for filemac"
+    )
+    opts = parser.parse_args(args)
+
+    argv = opts.job or ["--version"]
+    try:
+        report = run(argv, opts.runs)
+    except JobError as e:
+        if opts.json:
+            print(json.dumps({"argv": argv, "error": str(e), "ok": False}, indent=2))
+        else:
+            print(e)
+            print("FAIL")
+        return 1
+    if opts.json:
+        print(json.dumps(report, indent=2))
+        return 0
+
+    print(f"Job: filemac {' '.join(report['argv'])} ({report['runs']} runs)")
+    print(f"  daemon warm up  : {report['daemon_warm_up']:.3f}s (once)")
+    for label, key in (
+        ("without daemon", "without_daemon"),
+        ("with daemon", "with_daemon"),
+    ):
+        stats = report[key]
+        print(
+            f"  {label:<15} : median {stats['median'] * 1000:.1f}ms "
+            f"mean {stats['mean'] * 1000:.1f}ms"
+        )
+    print(f"  speedup         : {report['speedup']:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,292 @@
+"""
+Deterministic synthetic fixtures for the benchmark suite.
+
+Everything is generated offline from a fixed seed so two runs, or two
+releases, benchmark the same bytes. `scale` multiplies the amount of content
+(pages, rows, images, seconds of audio) for heavier runs.
+
+    python -m filemac.benchmarks.fixtures /tmp/fixtures --scale 2
+"""
+
+import argparse
+import datetime
+import math
+import os
+import random
+import re
+import shutil
+import struct
+import sys
+import wave
+import zipfile
+from pathlib import Path
+from typing import Dict
+
+SEED = 20240501
+# Fixed timestamp written into office document metadata
+EPOCH = datetime.datetime(2024, 1, 1)
+
+_WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod "
+    "tempor incididunt ut labore et dolore magna aliqua enim ad minim veniam "
+    "quis nostrud exercitation ullamco laboris nisi aliquip ex ea commodo"
+).split()
+
+
+def _sentence(rng: random.Random, words: int = 12) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(words)).capitalize() + "."
+
+
+def _freeze_zip(path: Path) -> Path:
+    """Rewrite an office (zip) file with fixed entry and metadata timestamps."""
+    with zipfile.ZipFile(path) as src:
+        entries = [(info, src.read(info)) for info in src.infolist()]
+    stamp = EPOCH.strftime("%Y-%m-%dT%H:%M:%SZ").encode()
+    entries = [
+        (
+            info,
+            (
+                re.sub(rb"\d{4}-\d\d-\d\dT\d\d:\d\d:\d\dZ", stamp, data)
+                if info.filename == "docProps/core.xml"
+                else data
+            ),
+        )
+        for info, data in entries
+    ]
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as dest:
+        for info, data in entries:
+            frozen = zipfile.ZipInfo(info.filename, EPOCH.timetuple()[:6])
+            frozen.compress_type = zipfile.ZIP_DEFLATED
+            dest.writestr(frozen, data)
+    return path
+
+
+def make_pdf(path: Path, pages: int, rng: random.Random) -> Path:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    # invariant drops the creation date and random document id
+    pdf = canvas.Canvas(str(path), pagesize=A4, invariant=1)
+    width, height = A4
+    for page in range(pages):
+        pdf.setFont("Helvetica-Bold", 16)
+        pdf.drawString(72, height - 72, f"Benchmark page {page + 1}")
+        pdf.setFont("Helvetica", 10)
+        y = height - 100
+        while y > 72:
+            pdf.drawString(72, y, _sentence(rng, 14))
+            y -= 14
+        pdf.showPage()
+    pdf.save()
+    return path
+
+
+def make_docx(path: Path, paragraphs: int, rng: random.Random) -> Path:
+    from docx import Document
+
+    doc = Document()
+    doc.core_properties.created = EPOCH
+    doc.core_properties.modified = EPOCH
+    doc.add_heading("Benchmark document", level=1)
+    for i in range(paragraphs):
+        doc.add_paragraph(_sentence(rng, 30))
+        if i % 50 == 0:
+            table = doc.add_table(rows=4, cols=4)
+            for row in table.rows:
+                for cell in row.cells:
+                    cell.text = rng.choice(_WORDS)
+    doc.save(path)
+    return _freeze_zip(path)
+
+
+def make_pptx(path: Path, slides: int, rng: random.Random) -> Path:
+    from pptx import Presentation
+
+    prs = Presentation()
+    prs.core_properties.created = EPOCH
+    prs.core_properties.modified = EPOCH
+    for i in range(slides):
+        slide = prs.slides.add_slide(prs.slide_layouts[1])
+        slide.shapes.title.text = f"Slide {i + 1}"
+        body = slide.placeholders[1].text_frame
+        body.text = _sentence(rng)
+        for _ in range(4):
+            body.add_paragraph().text = _sentence(rng)
+    prs.save(path)
+    return _freeze_zip(path)
+
+
+def make_xlsx(path: Path, rows: int, rng: random.Random) -> Path:
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    wb.properties.created = EPOCH
+    wb.properties.modified = EPOCH
+    for name in ("Sales", "Inventory"):
+        ws = wb.create_sheet(name)
+        ws.append(["id", "name", "quantity", "price", "ratio"])
+        for i in range(rows):
+            ws.append(
+                [
+                    i,
+                    rng.choice(_WORDS),
+                    rng.randint(0, 10_000),
+                    round(rng.uniform(0, 1000), 2),
+                    rng.random(),
+                ]
+            )
+    wb.save(path)
+    return _freeze_zip(path)
+
+
+def make_csv(path: Path, rows: int, rng: random.Random) -> Path:
+    import csv
+
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "quantity", "price", "note"])
+        for i in range(rows):
+            writer.writerow(
+                [
+                    i,
+                    rng.choice(_WORDS),
+                    rng.randint(0, 10_000),
+                    round(rng.uniform(0, 1000), 2),
+                    _sentence(rng, 6) if i % 5 else "",
+                ]
+            )
+    return path
+
+
+def make_text(path: Path, lines: int, rng: random.Random) -> Path:
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(lines):
+            # Paragraphs of a few sentences separated by blank lines
+            f.write(f"{_sentence(rng, rng.randint(4, 20))}\n" if i % 8 else "\n")
+    return path
+
+
+def make_images(directory: Path, count: int, rng: random.Random) -> Path:
+    from PIL import Image, ImageDraw
+
+    directory.mkdir(parents=True, exist_ok=True)
+    for i in range(count):
+        img = Image.new("RGB", (1280, 960), (255, 255, 255))
+        draw = ImageDraw.Draw(img)
+        for _ in range(40):
+            x0, y0 = rng.randint(0, 1200), rng.randint(0, 900)
+            color = tuple(rng.randint(0, 255) for _ in range(3))
+            draw.rectangle((x0, y0, x0 + rng.randint(10, 200), y0 + 60), fill=color)
+        ext, fmt = ("png", "PNG") if i % 2 == 0 else ("jpg", "JPEG")
+        img.save(directory / f"image_{i:03d}.{ext}", fmt)
+    return directory
+
+
+def make_text_image(path: Path, lines: int, rng: random.Random) -> Path:
+    """Black text on white, something tesseract can actually read."""
+    from PIL import Image, ImageDraw, ImageFont
+
+    try:
+        font = ImageFont.load_default(size=28)
+    except TypeError:  # Pillow < 10.1
+        font = ImageFont.load_default()
+    img = Image.new("L", (1600, 60 + lines * 40), 255)
+    draw = ImageDraw.Draw(img)
+    for i in range(lines):
+        draw.text((40, 30 + i * 40), _sentence(rng, 8), fill=0, font=font)
+    img.save(path)
+    return path
+
+
+def make_wavs(directory: Path, count: int, seconds: float, rng: random.Random) -> Path:
+    directory.mkdir(parents=True, exist_ok=True)
+    rate = 22_050
+    for i in range(count):
+        freq = 220 + rng.randint(0, 440)
+        frames = b"".join(
+            struct.pack("<h", int(12_000 * math.sin(2 * math.pi * freq * n / rate)))
+            for n in range(int(rate * seconds))
+        )
+        # Numbered like text-to-speech chunks, which AudioJoiner sorts on
+        with wave.open(str(directory / f"clip_{i}.wav"), "wb") as out:
+            out.setnchannels(1)
+            out.setsampwidth(2)
+            out.setframerate(rate)
+            out.writeframes(frames)
+    return directory
+
+
+def make_mp3(source_wav: Path, path: Path) -> Path:
+    """Encode a wav to mp3, needs ffmpeg."""
+    from pydub import AudioSegment
+
+    AudioSegment.from_wav(source_wav).export(path, format="mp3")
+    return path
+
+
+def make_html(path: Path, sections: int, rng: random.Random) -> Path:
+    parts = [
+        "<html><head><style>",
+        "h2 { color: #336699; } .note { font-style: italic; }",
+        "</style></head><body><h1>Benchmark</h1>",
+    ]
+    for i in range(sections):
+        parts.append(f"<h2>Section {i + 1}</h2>")
+        parts.append(f"<p>{_sentence(rng, 40)} <b>{_sentence(rng, 4)}</b></p>")
+        parts.append(
+            "<ul>"
+            + "".join(f"<li>{_sentence(rng, 6)}</li>" for _ in range(5))
+            + "</ul>"
+        )
+        if i % 10 == 0:
+            rows = "".join(
+                "<tr>" + "".join(f"<td>{rng.randint(0, 999)}</td>" for _ in range(4))
+                for _ in range(8)
+            )
+            parts.append(f"<table>{rows}</table>")
+        parts.append(f'<p class="note">{_sentence(rng)}</p>')
+    parts.append("</body></html>")
+    path.write_text("\n".join(parts), encoding="utf-8")
+    return path
+
+
+def generate(root: os.PathLike, scale: int = 1) -> Dict[str, str]:
+    """
+    Generate all fixtures under `root`.
+
+    Returns:
+        Mapping of fixture name to path. Fixtures that need a missing
+        external tool (mp3 needs ffmpeg) are left out.
+    """
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(SEED)
+    fixtures = {
+        "pdf": make_pdf(root / "document.pdf", 20 * scale, rng),
+        "docx": make_docx(root / "document.docx", 400 * scale, rng),
+        "pptx": make_pptx(root / "slides.pptx", 40 * scale, rng),
+        "xlsx": make_xlsx(root / "workbook.xlsx", 20_000 * scale, rng),
+        "images": make_images(root / "images", 8 * scale, rng),
+        "ocr_image": make_text_image(root / "scan.png", 20, rng),
+        "wavs": make_wavs(root / "wavs", 6 * scale, 2.0, rng),
+        "html": make_html(root / "page.html", 200 * scale, rng),
+        "csv": make_csv(root / "table.csv", 50_000 * scale, rng),
+        "txt": make_text(root / "notes.txt", 20_000 * scale, rng),
+    }
+    if shutil.which("ffmpeg"):
+        fixtures["mp3"] = make_mp3(root / "wavs" / "clip_0.wav", root / "clip.mp3")
+    return {name: str(path) for name, path in fixtures.items()}
+
+
+def main(args=None) -> int:
+    parser = argparse.ArgumentParser(description="Generate benchmark fixtures")
+    parser.add_argument("root", help="Output directory")
+    parser.add_argument("--scale", type=int, default=1)
+    opts = parser.parse_args(args)
+    for name, path in generate(opts.root, opts.scale).items():
+        print(f"{name:<10} {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+"""
+Cold start benchmark for the filemac command line entry.
+
+Spawns a fresh interpreter for every run so that nothing is cached between
+measurements, then checks the median against a fixed time budget and verifies
+that none of the heavy optional dependencies were imported on the way.
+
+    python -m filemac.benchmarks.startup
+    python -m filemac.benchmarks.startup --budget 0.3 --runs 20 -- --version
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from typing import List, Sequence
+
+# Seconds allowed for `filemac --help` from process spawn to exit
+DEFAULT_BUDGET = 0.5
+DEFAULT_RUNS = 10
+
+# Modules that must never be imported just to print help/version
+HEAVY_MODULES = (
+    "cv2",
+    "pandas",
+    "moviepy",
+    "librosa",
+    "pyautogui",
+    "pydub",
+    "sounddevice",
+    "pynput",
+    "speech_recognition",
+    "docx",
+    "pptx",
+    "reportlab",
+    "PyPDF2",
+    "fitz",
+    "audiobot",
+)
+
+_ENTRY = (
+    "import sys;"
+    "sys.argv[0] = 'filemac';"
+    "from filemac import main;"
+    "main()"
+)
+
+# Reports at exit since `--help`/`--version` may end with sys.exit(), but
+# only once the entry imported: a crashed import has nothing to report
+_PROBE = """
+import atexit, json, sys
+heavy = json.loads(sys.argv.pop())
+sys.argv[0] = "filemac"
+from filemac import main
+atexit.register(
+    lambda: sys.stderr.write(
+        "\\n" + json.dumps(sorted(m for m in heavy if m in sys.modules))
+    )
+)
+main()
+"""
+
+
+class StartupError(RuntimeError):
+    """The entry exited with an error, its timings mean nothing."""
+
+
+def _check(result: subprocess.CompletedProcess, argv: Sequence[str]) -> None:
+    if result.returncode != 0:
+        raise StartupError(
+            f"filemac {' '.join(argv)} exited with {result.returncode}: "
+            f"{result.stderr.strip()[-200:]}"
+        )
+
+
+def time_startup(argv: Sequence[str], runs: int = DEFAULT_RUNS) -> List[float]:
+    """
+    Return wall clock durations (seconds) of `runs` cold starts.
+
+    Raises:
+        StartupError: a run exited with an error.
+    """
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-c", _ENTRY, *argv],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+            check=False,
+        )
+        timings.append(time.perf_counter() - start)
+        _check(result, argv)
+    return timings
+
+
+def imported_heavy_modules(argv: Sequence[str]) -> List[str]:
+    """
+    Run the entry once and report which heavy modules ended up imported.
+
+    Raises:
+        StartupError: the entry exited with an error.
+    """
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            _PROBE,
+            *argv,
+            json.dumps(HEAVY_MODULES),
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=False,
+    )
+    _check(result, argv)
+    try:
+        return json.loads(result.stderr.strip().splitlines()[-1])
+    except (IndexError, ValueError):
+        raise StartupError(
+            f"filemac {' '.join(argv)} exited before the probe reported: "
+            f"{result.stderr.strip()[-200:]}"
+        )
+
+
+def run(argv: Sequence[str], budget: float, runs: int) -> dict:
+    timings = time_startup(argv, runs)
+    return {
+        "argv": list(argv),
+        "runs": runs,
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "max": max(timings),
+        "budget": budget,
+        "heavy_imports": imported_heavy_modules(argv),
+    }
+
+
+def main(args=None) -> int:
+    parser = argparse.ArgumentParser(description="filemac cold start benchmark")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET)
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS)
+    parser.add_argument("--json", action="store_true", help="Print JSON report")
+    parser.add_argument(
+        "entry_args", nargs="*", default=["--help"], help="Arguments for filemac"
+    )
+    opts = parser.parse_args(args)
+
+    argv = opts.entry_args or ["--help"]
+    try:
+        report = run(argv, opts.budget, opts.runs)
+    except StartupError as e:
+        if opts.json:
+            print(json.dumps({"argv": argv, "error": str(e), "ok": False}, indent=2))
+        else:
+            print(e)
+            print("FAIL")
+        return 1
+    ok = report["median"] <= report["budget"] and not report["heavy_imports"]
+    report["ok"] = ok
+
+    if opts.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(
+            f"filemac {' '.join(report['argv'])}: median {report['median']:.3f}s "
+            f"(min {report['min']:.3f}s, max {report['max']:.3f}s, "
+            f"budget {report['budget']:.3f}s)"
+        )
+        if report["heavy_imports"]:
+            print(f"Heavy imports: {', '.join(report['heavy_imports'])}")
+        print("OK" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,583 @@
+"""
+End-to-end benchmarks of the main conversions on synthetic fixtures.
+
+Every benchmark runs in a fresh interpreter so its peak RSS is its own, with
+the conversion cache disabled and a single job. Inputs are copied into a new
+directory before each timed run, outputs land next to them like in real use.
+
+    python -m filemac.benchmarks.suite
+    python -m filemac.benchmarks.suite --only pdf_to_txt html2word --runs 5
+    python -m filemac.benchmarks.suite --json results.json
+    python -m filemac.benchmarks.suite --compare results.json  # exit 1 on regressions
+    python -m filemac.benchmarks.suite --save-costs  # costs for the conversion planner
+
+Operations needing a missing external tool (poppler, tesseract, ffmpeg) are
+reported as skipped.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+DEFAULT_RUNS = 3
+# Relative slowdown tolerated by --compare before flagging a regression
+DEFAULT_THRESHOLD = 0.2
+
+Prepared = Tuple[Callable[[], object], int, int]
+
+
+class Benchmark(NamedTuple):
+    name: str
+    # Executables that must be on PATH
+    requires: Tuple[str, ...]
+    # prepare(fixtures, workdir) -> (run, input bytes, items)
+    prepare: Callable[[Dict[str, str], Path], Prepared]
+    # (source, target) conversion whose planner cost this measures
+    edge: Optional[Tuple[str, str]] = None
+    # Globs, relative to the run directory, each of which must match a
+    # non-empty file after every run; a run without files checks itself
+    outputs: Tuple[str, ...] = ()
+
+
+def _copy(src: str, workdir: Path) -> Path:
+    dest = workdir / os.path.basename(src)
+    if os.path.isdir(src):
+        shutil.copytree(src, dest)
+    else:
+        shutil.copy2(src, dest)
+    return dest
+
+
+def _size(path: Path) -> int:
+    if path.is_dir():
+        return sum(f.stat().st_size for f in path.iterdir() if f.is_file())
+    return path.stat().st_size
+
+
+def _pdf_to_txt(fx, work):
+    from filemac.core.document import DocConverter
+
+    pdf = _copy(fx["pdf"], work)
+    return lambda: DocConverter(str(pdf)).pdf_to_txt(), _size(pdf), 1
+
+
+def _doc2image(fx, work):
+    from filemac.core.document import DocConverter
+
+    pdf = _copy(fx["pdf"], work)
+    return lambda: DocConverter(str(pdf)).doc2image(), _size(pdf), 1
+
+
+def _long_image(fx, work):
+    from filemac.core.pdf.core import PDF2LongImageConverter
+
+    pdf = _copy(fx["pdf"], work)
+    return lambda: PDF2LongImageConverter(str(pdf)).preprocess(), _size(pdf), 1
+
+
+def _convert_image(fx, work):
+    from filemac.core.image.core import ImageConverter
+
+    images = _copy(fx["images"], work)
+    count = len(list(images.iterdir()))
+    return (
+        lambda: ImageConverter(str(images), "webp").convert_image(),
+        _size(images),
+        count,
+    )
+
+
+def _ocr(fx, work):
+    from filemac.core.ocr import ExtractText
+
+    image = _copy(fx["ocr_image"], work)
+    return (
+        lambda: ExtractText(str(image)).run(str(work / "scan.txt")),
+        _size(image),
+        1,
+    )
+
+
+def _audio_join(fx, work):
+    from filemac.core.audio.core import AudioJoiner
+
+    wavs = _copy(fx["wavs"], work)
+    count = len(list(wavs.iterdir()))
+    return (
+        lambda: AudioJoiner(str(wavs), str(work / "master.ogg")).worker(),
+        _size(wavs),
+        count,
+    )
+
+
+def _html2word(fx, work):
+    from filemac.core.html.core.converter import HTML2Word
+
+    html = _copy(fx["html"], work)
+    return (
+        lambda: HTML2Word().convert_file(str(html), str(work / "page.docx")),
+        _size(html),
+        1,
+    )
+
+
+def _with_backend(backend: str, prepare):
+    """Run `prepare` with the given pdf backend, in the benchmark child."""
+
+    def wrapped(fx, work):
+        os.environ["FILEMAC_PDF_BACKEND"] = backend
+        return prepare(fx, work)
+
+    return wrapped
+
+
+def _pdf_text(fx, work):
+    from filemac.core.pdf.text import extract_text
+
+    pdf = _copy(fx["pdf"], work)
+    return (
+        lambda: extract_text(pdf, work / "document.txt", jobs=1, progress=False),
+        _size(pdf),
+        1,
+    )
+
+
+def _pdf_merge(fx, work):
+    from filemac.core.pdf.backend import get_backend
+
+    pdf = str(_copy(fx["pdf"], work))
+    backend = get_backend()
+    # Interleave the document with itself, page by page like PDFCombine
+    pages = [(pdf, i) for i in range(backend.page_count(pdf)) for _ in range(2)]
+    return (
+        lambda: backend.write_pages(work / "merged.pdf", pages),
+        _size(Path(pdf)) * 2,
+        len(pages),
+    )
+
+
+def _pdf_raster(fx, work):
+    from filemac.core.pdf.backend import get_backend
+
+    pdf = _copy(fx["pdf"], work)
+    backend = get_backend()
+    count = backend.page_count(pdf)
+
+    def run():
+        rendered = 0
+        for image in backend.rasterize(pdf):
+            image.close()
+            rendered += 1
+        if rendered != count:
+            raise RuntimeError(f"rendered {rendered} of {count} pages")
+
+    return run, _size(pdf), count
+
+
+def _docx_to_txt(fx, work):
+    from filemac.core.document import DocConverter
+
+    docx = _copy(fx["docx"], work)
+    return lambda: DocConverter(str(docx)).word_to_txt(), _size(docx), 1
+
+
+def _pptx_to_txt(fx, work):
+    from filemac.core.document import DocConverter
+
+    pptx = _copy(fx["pptx"], work)
+    return lambda: DocConverter(str(pptx)).pptx_to_txt(), _size(pptx), 1
+
+
+def _pptx_to_word(fx, work):
+    from filemac.core.document import DocConverter
+
+    pptx = _copy(fx["pptx"], work)
+    return lambda: DocConverter(str(pptx)).ppt_to_word(), _size(pptx), 1
+
+
+def _xlsx_to_csv(fx, work):
+    from filemac.core.document import DocConverter
+
+    xlsx = _copy(fx["xlsx"], work)
+    return lambda: DocConverter(str(xlsx)).convert_xlsx_to_csv(), _size(xlsx), 1
+
+
+def _xlsx_to_word(fx, work):
+    from filemac.core.document import DocConverter
+
+    xlsx = _copy(fx["xlsx"], work)
+    return lambda: DocConverter(str(xlsx)).convert_xls_to_word(), _size(xlsx), 1
+
+
+def _xlsx_to_sqlite(fx, work):
+    from filemac.core.document import DocConverter
+
+    xlsx = _copy(fx["xlsx"], work)
+    db = str(work / "bench.db")
+    return (
+        lambda: DocConverter(str(xlsx)).convert_xlsx_to_database(db=db),
+        _size(xlsx),
+        1,
+    )
+
+
+def _txt_to_word(fx, work):
+    from filemac.core.document import DocConverter
+
+    txt = _copy(fx["txt"], work)
+    return lambda: DocConverter(str(txt)).text_to_word(), _size(txt), 1
+
+
+def _rich_text_to_word(fx, work):
+    from filemac.core.text.core import StyledText
+
+    txt = _copy(fx["txt"], work)
+    return lambda: StyledText(str(txt)).text_to_word(), _size(txt), 1
+
+
+def _txt_to_pdf(fx, work):
+    from filemac.core.document import DocConverter
+
+    txt = _copy(fx["txt"], work)
+    return lambda: DocConverter(str(txt)).txt_to_pdf(), _size(txt), 1
+
+
+def _pdf_to_word(fx, work):
+    from filemac.core.document import DocConverter
+
+    pdf = _copy(fx["pdf"], work)
+    return lambda: DocConverter(str(pdf)).pdf_to_word(), _size(pdf), 1
+
+
+def _docx_to_pdf(fx, work):
+    from filemac.core.document import DocConverter
+
+    docx = _copy(fx["docx"], work)
+    return lambda: DocConverter(str(docx)).word_to_pdf(), _size(docx), 1
+
+
+def _csv_to_xlsx(fx, work):
+    from filemac.core.document import DocConverter
+
+    table = _copy(fx["csv"], work)
+    return lambda: DocConverter(str(table)).convert_csv_to_xlsx(), _size(table), 1
+
+
+BENCHMARKS = {
+    bench.name: bench
+    for bench in (
+        Benchmark(
+            "pdf_to_txt", (), _pdf_to_txt, ("pdf", "txt"), outputs=("document.txt",)
+        ),
+        Benchmark("doc2image", (), _doc2image, outputs=("document_*.png",)),
+        Benchmark("long_image", (), _long_image, outputs=("document*.png",)),
+        Benchmark("convert_image", (), _convert_image, outputs=("images/*.webp",)),
+        Benchmark("ocr", ("tesseract",), _ocr, outputs=("scan.txt",)),
+        Benchmark("audio_join", ("ffmpeg",), _audio_join, outputs=("master.ogg",)),
+        Benchmark("html2word", (), _html2word, outputs=("page.docx",)),
+        Benchmark(
+            "docx_to_txt", (), _docx_to_txt, ("docx", "txt"), outputs=("document.txt",)
+        ),
+        Benchmark(
+            "pptx_to_txt", (), _pptx_to_txt, ("pptx", "txt"), outputs=("slides.txt",)
+        ),
+        Benchmark(
+            "pptx_to_word",
+            (),
+            _pptx_to_word,
+            ("pptx", "docx"),
+            outputs=("slides.docx",),
+        ),
+        Benchmark(
+            "txt_to_word", (), _txt_to_word, ("txt", "docx"), outputs=("notes.docx",)
+        ),
+        Benchmark(
+            "txt_to_pdf", (), _txt_to_pdf, ("txt", "pdf"), outputs=("notes.pdf",)
+        ),
+        Benchmark(
+            "rich_text_to_word", (), _rich_text_to_word, outputs=("notes_filemac.docx",)
+        ),
+        Benchmark(
+            "pdf_to_word", (), _pdf_to_word, ("pdf", "docx"), outputs=("document.docx",)
+        ),
+        Benchmark(
+            "docx_to_pdf",
+            ("soffice",),
+            _docx_to_pdf,
+            ("docx", "pdf"),
+            outputs=("document.pdf",),
+        ),
+        Benchmark(
+            "xlsx_to_csv",
+            (),
+            _xlsx_to_csv,
+            ("xlsx", "csv"),
+            outputs=("workbook_Inventory.csv", "workbook_Sales.csv"),
+        ),
+        Benchmark(
+            "xlsx_to_word",
+            (),
+            _xlsx_to_word,
+            ("xlsx", "docx"),
+            outputs=("workbook.docx",),
+        ),
+        Benchmark(
+            "csv_to_xlsx", (), _csv_to_xlsx, ("csv", "xlsx"), outputs=("table.xlsx",)
+        ),
+        Benchmark(
+            "xlsx_to_sqlite", (), _xlsx_to_sqlite, ("xlsx", "db"), outputs=("bench.db",)
+        ),
+        # The same pdf operations on each backend
+        Benchmark(
+            "pdf_text_pymupdf",
+            (),
+            _with_backend("pymupdf", _pdf_text),
+            outputs=("document.txt",),
+        ),
+        Benchmark(
+            "pdf_text_pypdf2",
+            (),
+            _with_backend("pypdf2", _pdf_text),
+            outputs=("document.txt",),
+        ),
+        Benchmark(
+            "pdf_merge_pymupdf",
+            (),
+            _with_backend("pymupdf", _pdf_merge),
+            outputs=("merged.pdf",),
+        ),
+        Benchmark(
+            "pdf_merge_pypdf2",
+            (),
+            _with_backend("pypdf2", _pdf_merge),
+            outputs=("merged.pdf",),
+        ),
+        Benchmark("pdf_raster_pymupdf", (), _with_backend("pymupdf", _pdf_raster)),
+        Benchmark(
+            "pdf_raster_pypdf2", ("pdftoppm",), _with_backend("pypdf2", _pdf_raster)
+        ),
+    )
+}
+
+
+def _check_outputs(bench: Benchmark, work: Path) -> int:
+    """
+    Fail a run that did not produce its outputs, its time means nothing.
+
+    Returns:
+        Bytes of the outputs.
+    """
+    total = 0
+    for pattern in bench.outputs:
+        sizes = [p.stat().st_size for p in work.glob(pattern) if p.is_file()]
+        if not any(sizes):
+            raise RuntimeError(f"{bench.name} wrote no {pattern}")
+        total += sum(sizes)
+    return total
+
+
+def _run_child(name: str, fixtures: Dict[str, str], runs: int, out: str) -> None:
+    """Executed in the child interpreter: time `name` and write the result."""
+    from filemac.utils.profiler import peak_rss
+
+    bench = BENCHMARKS[name]
+    timings = []
+    with tempfile.TemporaryDirectory(prefix=f"filemac_{name}_") as tmp:
+        for i in range(runs):
+            work = Path(tmp) / str(i)
+            work.mkdir()
+            run, nbytes, items = bench.prepare(fixtures, work)
+            start = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - start
+            out_bytes = _check_outputs(bench, work)
+            timings.append(elapsed)
+    median = statistics.median(timings)
+    result = {
+        "runs": runs,
+        "median_s": median,
+        "min_s": min(timings),
+        "max_s": max(timings),
+        "input_bytes": nbytes,
+        "output_bytes": out_bytes,
+        "mb_per_s": nbytes / median / 1e6 if median else None,
+        "items_per_s": items / median if median else None,
+        "peak_rss": peak_rss(),
+    }
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(result, f)
+
+
+def run_benchmark(
+    name: str, fixtures: Dict[str, str], runs: int = DEFAULT_RUNS
+) -> dict:
+    bench = BENCHMARKS[name]
+    missing = [tool for tool in bench.requires if shutil.which(tool) is None]
+    if missing:
+        return {"skipped": f"missing {', '.join(missing)}"}
+
+    env = dict(os.environ, FILEMAC_NO_CACHE="1", FILEMAC_JOBS="1")
+    env.pop("FILEMAC_PROFILE", None)
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as out:
+        out_path = out.name
+    try:
+        proc = subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "filemac.benchmarks.suite",
+                "--child",
+                name,
+                "--child-fixtures",
+                json.dumps(fixtures),
+                "--runs",
+                str(runs),
+                "--child-out",
+                out_path,
+            ],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+        if proc.returncode != 0 or not os.path.getsize(out_path):
+            tail = proc.stderr.strip().splitlines()[-1:] or ["no output"]
+            return {"error": tail[0]}
+        with open(out_path, encoding="utf-8") as f:
+            return json.load(f)
+    finally:
+        os.remove(out_path)
+
+
+def run(
+    names: Optional[Sequence[str]] = None,
+    runs: int = DEFAULT_RUNS,
+    scale: int = 1,
+    fixtures_dir: Optional[str] = None,
+) -> dict:
+    from filemac import __version__
+
+    from .fixtures import generate
+
+    names = list(names or BENCHMARKS)
+    with tempfile.TemporaryDirectory(prefix="filemac_fixtures_") as tmp:
+        fixtures = generate(fixtures_dir or tmp, scale)
+        results = {name: run_benchmark(name, fixtures, runs) for name in names}
+    return {
+        "filemac": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "scale": scale,
+        "results": results,
+    }
+
+
+def compare(
+    report: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD
+) -> List[str]:
+    """Describe every operation that got slower than `threshold` allows."""
+    regressions = []
+    for name, result in report["results"].items():
+        old = baseline.get("results", {}).get(name, {})
+        if "median_s" not in result or "median_s" not in old:
+            continue
+        ratio = result["median_s"] / old["median_s"]
+        if ratio > 1 + threshold:
+            regressions.append(
+                f"{name}: {old['median_s']:.3f}s -> {result['median_s']:.3f}s "
+                f"({(ratio - 1) * 100:+.0f}%)"
+            )
+    return regressions
+
+
+def costs(report: dict) -> dict:
+    """Planner costs of the conversions measured in `report`."""
+    from filemac.core.planner import Cost
+
+    measured = {}
+    for name, result in report["results"].items():
+        edge = BENCHMARKS[name].edge if name in BENCHMARKS else None
+        if edge is None or not result.get("input_bytes") or "median_s" not in result:
+            continue
+        # Small fixtures, the fixed start-up cost is folded into the MB rate
+        mb = result["input_bytes"] / 1e6
+        ratio = result.get("output_bytes", 0) / result["input_bytes"] or 1.0
+        measured[edge] = Cost(per_mb=result["median_s"] / mb, ratio=ratio)
+    return measured
+
+
+def _print_report(report: dict) -> None:
+    print(
+        f"filemac {report['filemac']} / python {report['python']} "
+        f"(scale {report['scale']})"
+    )
+    print(f"{'operation':<15} {'median':>9} {'MB/s':>8} {'items/s':>8} {'rss MB':>8}")
+    for name, result in report["results"].items():
+        if "median_s" not in result:
+            print(f"{name:<15} {result.get('skipped') or result.get('error')}")
+            continue
+        rss = result["peak_rss"].get("self_mb", 0)
+        print(
+            f"{name:<15} {result['median_s'] * 1000:>7.0f}ms "
+            f"{result['mb_per_s']:>8.2f} {result['items_per_s']:>8.2f} {rss:>8.1f}"
+        )
+
+
+def main(args=None) -> int:
+    parser = argparse.ArgumentParser(description="filemac conversion benchmarks")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS))
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS)
+    parser.add_argument("--scale", type=int, default=1, help="Fixture size factor")
+    parser.add_argument("--fixtures", help="Keep generated fixtures in this directory")
+    parser.add_argument("--json", metavar="FILE", help="Write the JSON report here")
+    parser.add_argument("--compare", metavar="FILE", help="Baseline JSON report")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument(
+        "--save-costs",
+        action="store_true",
+        help="Store the measured conversion costs for the conversion planner",
+    )
+    # Internal, used to run one benchmark in a fresh interpreter
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--child-fixtures", help=argparse.SUPPRESS)
+    parser.add_argument("--child-out", help=argparse.SUPPRESS)
+    opts = parser.parse_args(args)
+
+    if opts.child:
+        _run_child(
+            opts.child, json.loads(opts.child_fixtures), opts.runs, opts.child_out
+        )
+        return 0
+
+    report = run(opts.only, opts.runs, opts.scale, opts.fixtures)
+    _print_report(report)
+    if opts.json:
+        with open(opts.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if opts.save_costs:
+        from filemac.core.planner import save_costs
+
+        measured = costs(report)
+        if measured:
+            print(f"Saved {len(measured)} conversion costs to {save_costs(measured)}")
+
+    if opts.compare:
+        with open(opts.compare, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), opts.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
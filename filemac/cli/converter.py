@@ -2,13 +2,22 @@ import os
 import sys
 from typing import List, Union
 from ..core.warning import default_supressor
+from ..core.exceptions import FilemacError
 from ..utils.simple import logger
+from ..utils.cache import cache_enabled, cached_conversion, reported_outputs
 from ..utils.colors import fg, rs
+from ..utils.executor import BatchExecutor
+from ..utils.memory import cost_of
+from ..utils.discovery import discover
+from ..utils.manifest import ConversionManifest
+from ..core.pdf.text import get_pages
 from ..core.tts.gtts import GoogleTTS
 from ..utils.formats import (
     SUPPORTED_AUDIO_FORMATS_DIRECT,
 )
 from ..core.document import DocConverter
+from ..core import pipeline, planner
+from ..utils.profiler import span
 
 RESET = rs
 default_supressor()
@@ -18,6 +27,10 @@ class DirectoryConverter:
     """
     If the input file in convert_doc argument is a directory, walk throught the directory and
         converter all the surported files to the target format
+
+    Conversion is incremental: a manifest in the directory records what was
+    converted, so reruns only convert new or changed files and remove the
+    outputs of deleted ones. `--no-cache` forces a full reconversion.
     """
 
     def __init__(self, _dir_, _format_, no_resume, threads, _isolate_=None):
@@ -27,28 +40,39 @@ class DirectoryConverter:
         self.no_resume = no_resume
         self.threads = threads
         # Handle isolation and non isolation modes distinctively
-        self._ls_ = (
-            ["pdf", "docx", "doc", "xlsx", "ppt", "pptxxls", "txt"]
-            if _isolate_ is None
-            else [_isolate_]
-        )
+        self._ls_ = self.sources(_isolate_)
         if self._isolate_:
             print(f"INFO\t {fg.FMAGENTA}Isolate {fg.DCYAN}{self._isolate_}{RESET}")
 
+    @staticmethod
+    def sources(_isolate_=None):
+        """Extensions of the files converted in a directory"""
+        if _isolate_ is not None:
+            return [_isolate_]
+        return ["pdf", "docx", "doc", "xlsx", "xls", "ppt", "pptx", "txt"]
+
     def _unbundle_dir_(self):
         if self._format_ in SUPPORTED_AUDIO_FORMATS_DIRECT:
             return Batch_Audiofy(self._dir_, self.no_resume, self.threads)
-        try:
-            for root, dirs, files in os.walk(self._dir_):
-                for file in files:
-                    _ext_ = file.split(".")[-1]
+        manifest = ConversionManifest(self._dir_, _target(self._format_))
+        seen = []
 
-                    _path_ = os.path.join(root, file)
+        def checkpoint(result):
+            if result.ok:
+                try:
+                    manifest.record(result.item, result.value)
+                except OSError as e:
+                    logger.warning(f"Not recording {result.item}: {e}")
 
-                    if _ext_ in self._ls_ and os.path.exists(_path_):
-                        print(f"INFO\t {fg.FYELLOW}Parse {fg.BLUE}{_path_}{RESET}")
-                        init = MethodMappingEngine(_path_, self._format_)
-                        init.document_eval()
+        try:
+            executor = BatchExecutor(
+                desc="Converting", on_result=checkpoint, cost=cost_of()
+            )
+            executor.map(
+                _convert_document, self._pending(manifest, seen), self._format_
+            )
+            for path in manifest.prune(seen):
+                print(f"INFO\t {fg.FYELLOW}Removed stale {fg.BLUE}{path}{RESET}")
 
         except FileNotFoundError as e:
             print(e)
@@ -60,6 +84,57 @@ class DirectoryConverter:
         except Exception as e:
             print(e)
             pass
+        finally:
+            manifest.save()
+
+    def _pending(self, manifest, seen):
+        """Yield the files that need converting, skipping up-to-date ones"""
+        full = not cache_enabled()
+        outputs = manifest.outputs()
+        skipped = 0
+        for _path_ in self._walk():
+            rel = os.path.relpath(os.path.abspath(_path_), manifest.directory)
+            if rel in outputs:
+                continue
+            seen.append(_path_)
+            if not full and manifest.is_current(_path_):
+                skipped += 1
+                continue
+            yield _path_
+        if skipped:
+            print(f"INFO\t {fg.FYELLOW}Up to date {fg.BLUE}{skipped} file(s){RESET}")
+
+    def _walk(self):
+        """Yield the files under the directory matching the source formats"""
+        return discover(self._dir_, extensions=self._ls_, recursive=True)
+
+
+def _target(_format_):
+    """Target format plus the options changing its output, for cache keys"""
+    target = _format_.lower()
+    pages = get_pages()
+    if pages:
+        target += f"@pages={pages}"
+    backend = os.environ.get("FILEMAC_PDF_BACKEND")
+    if backend:
+        target += f"@pdf={backend}"
+    max_rows = os.environ.get("FILEMAC_MAX_ROWS")
+    if max_rows:
+        target += f"@rows={max_rows}"
+    return target
+
+
+def _convert_document(_path_, _format_):
+    """Convert a single file, module level so it can run in a worker process"""
+    print(f"INFO\t {fg.FYELLOW}Parse {fg.BLUE}{_path_}{RESET}")
+    init = MethodMappingEngine(_path_, _format_)
+    outputs = init.document_eval()
+    source, target = init.formats()
+    if not outputs and source != target:
+        # Converters log their failures and return nothing, a failed item
+        # must not reach the manifest as converted
+        raise FilemacError(f"no {target} written for {_path_}")
+    return outputs
 
 
 class Batch_Audiofy:
@@ -81,7 +156,7 @@ class Batch_Audiofy:
 
     def worker(self):
         conv = GoogleTTS(self.folder, resume=self.no_resume)
-        inst = conv.THAudio(conv)
+        inst = conv.ThreadClient(conv)
         inst.audiofy(num_threads=self.threads)
 
 
@@ -89,118 +164,157 @@ class MethodMappingEngine:
     """
     Class to handle document conversions based on their extensions and the target
         output document format
+
+    Conversions are planned over the pipeline converters and the DocConverter
+    methods with their measured costs, see `filemac.core.planner`. A direct
+    DocConverter conversion runs with its progress and messages, a chain of
+    conversions runs in memory through the pipeline.
     """
 
+    # Conversions DocConverter does in one step, naming the outputs after the
+    # input; spreadsheets may produce a file per sheet or --max-rows part
+    _handlers = {
+        ("csv", "xlsx"): DocConverter.convert_csv_to_xlsx,
+        ("doc", "pdf"): DocConverter.word_to_pdf,
+        ("docx", "pdf"): DocConverter.word_to_pdf,
+        ("docx", "pptx"): DocConverter.word_to_pptx,
+        ("docx", "txt"): DocConverter.word_to_txt,
+        ("pdf", "docx"): DocConverter.pdf_to_word,
+        ("pdf", "txt"): DocConverter.pdf_to_txt,
+        ("ppt", "pptx"): lambda conv: conv.convert_ppt_to_pptx(conv.input_file),
+        ("pptx", "docx"): DocConverter.ppt_to_word,
+        ("pptx", "txt"): DocConverter.pptx_to_txt,
+        ("txt", "docx"): DocConverter.text_to_word,
+        ("txt", "pdf"): DocConverter.txt_to_pdf,
+        ("xls", "csv"): DocConverter.convert_xlsx_to_csv,
+        ("xls", "db"): DocConverter.convert_xlsx_to_database,
+        ("xls", "docx"): DocConverter.convert_xls_to_word,
+        ("xls", "txt"): DocConverter.convert_xls_to_text,
+        ("xlsx", "csv"): DocConverter.convert_xlsx_to_csv,
+        ("xlsx", "db"): DocConverter.convert_xlsx_to_database,
+        ("xlsx", "docx"): DocConverter.convert_xls_to_word,
+        ("xlsx", "txt"): DocConverter.convert_xls_to_text,
+    }
+    # Target names accepted on the command line
+    _aliases = {"text": "txt", "word": "docx", "excel": "xlsx", "audio": "ogg"}
+    # Formats written as another one, outputs are always the current office
+    # formats and speech is ogg; the user is told
+    _substitutes = {
+        "doc": "docx",
+        "ppt": "pptx",
+        "xls": "xlsx",
+        "mp3": "ogg",
+        "wav": "ogg",
+    }
+
     def __init__(self, file, outf):
         self.file = file
         self.outf = outf
 
-    def spreedsheet(self, conv):
-        if self.outf.lower() == "csv":
-            conv.convert_xlsx_to_csv()
-        elif self.outf.lower() in ("txt", "text"):
-            conv.convert_xls_to_text()
-        elif self.outf.lower() in list(self.doc_ls):
-            conv.convert_xls_to_word()
-        elif self.outf.lower() == "db":
-            conv.convert_xlsx_to_database()
-        else:
-            print(f"{fg.RED}Unsupported output format❌{RESET}")
-
-    def word(self, conv):
-        if self.outf.lower() in ("txt", "text"):
-            conv.word_to_txt()
-        elif self.outf.lower() == "pdf":
-            conv.word_to_pdf()
-        elif self.outf.lower() in ("pptx", "ppt"):
-            conv.word_to_pptx()
-        elif self.outf.lower() in ("audio", "ogg"):
-            conv = GoogleTTS(self.file)
-            conv.audiofy()
-        else:
-            print(f"{fg.RED}Unsupported output format❌{RESET}")
-
-    def text(self, conv):
-        if self.outf.lower() == "pdf":
-            conv.txt_to_pdf()
-        elif self.outf.lower() in ("doc", "docx", "word"):
-            conv.text_to_word()
-        elif self.outf.lower() in ("audio", "ogg"):
-            conv = GoogleTTS(self.file)
-            conv.audiofy()
-        else:
-            print(f"{fg.RED}Unsupported output format❌{RESET}")
-
-    def ppt(self, conv):
-        if self.outf.lower() in ("doc", "docx", "word"):
-            conv.ppt_to_word()
-        elif self.outf.lower() in ("text", "txt"):
-            word = conv.ppt_to_word()
-            conv = DocConverter(word)
-            conv.word_to_txt()
-        elif self.outf.lower() in ("pptx"):
-            conv.convert_ppt_to_pptx(self.file)
-        elif self.outf.lower() in ("audio", "ogg", "mp3", "wav"):
-            conv = GoogleTTS(self.file)
-            conv.audiofy()
-        else:
-            print(f"{fg.RED}Unsupported output format❌{RESET}")
-
-    def pdf(self, conv):
-        if self.outf.lower() in ("doc", "docx", "word"):
-            conv.pdf_to_word()
-        elif self.outf.lower() in ("txt", "text"):
-            conv.pdf_to_txt()
-        elif self.outf.lower() in ("audio", "ogg", "mp3", "wav"):
-            conv = GoogleTTS(self.file)
-            conv.audiofy()
-        else:
-            print(f"{fg.RED}Unsupported output format❌{RESET}")
+    def formats(self):
+        """The file's format and the target format, aliases resolved."""
+        source = os.path.splitext(self.file)[1].lstrip(".").lower()
+        target = self.outf.lower().lstrip(".")
+        target = self._substitutes.get(target, self._aliases.get(target, target))
+        return source, target
 
-    def document_eval(self):
-        self.doc_ls = ["docx", "doc"]
-        sheetls = ["xlsx", "xls"]
-        try:
-            conv = DocConverter(self.file)
-            if self.file.lower().endswith(tuple(sheetls)):
-                self.spreedsheet(conv=conv)
+    def plan(self) -> planner.Plan:
+        """
+        The cheapest conversion of the file to the target format.
 
-            elif self.file.lower().endswith(tuple(self.doc_ls)):
-                self.word(conv=conv)
+        Raises:
+            ValueError: the target cannot be reached from the file's format.
+        """
+        source, target = self.formats()
+        size = os.path.getsize(self.file)
+        plans = []
+        if (source, target) in self._handlers:
+            converter = pipeline.CONVERTERS.get((source, target))
+            edges = {(source, target): converter.cost if converter else None}
+            plans.append(planner.plan(edges, source, target, size))
+        try:
+            plans.append(pipeline.plan(source, target, size))
+        except ValueError:
+            if not plans:
+                raise
+        # The DocConverter method wins a tie with the same pipeline step
+        return min(plans, key=lambda plan: (plan.seconds, len(plan.steps)))
 
-            elif self.file.endswith("txt"):
-                self.text(conv=conv)
+    def _substitute_note(self):
+        """Tell the user when the requested format is written as another one."""
+        requested = self.outf.lower().lstrip(".")
+        if requested in self._substitutes:
+            print(
+                f"{fg.BYELLOW}{requested} is not supported as output, writing "
+                f"{self._substitutes[requested]} instead{RESET}"
+            )
 
-            elif self.file.split(".")[-1].lower() in ("ppt", "pptx"):
-                self.ppt(conv)
+    def explain(self):
+        """Print the plan, see --explain"""
+        try:
+            plan = self.plan()
+        except ValueError as e:
+            print(f"{fg.BLUE}{self.file}{RESET}: {e}")
+            return
+        print(f"{fg.BLUE}{self.file}{RESET}\n{plan.describe()}")
+        self._substitute_note()
 
-            elif self.file.lower().endswith("pdf"):
-                self.pdf(conv)
+    # Targets that prompt, synthesise over the network or write outside the
+    # source directory are never served from the cache
+    _uncached = ("db", "audio", "ogg", "mp3", "wav")
 
-            elif self.file.lower().endswith("csv"):
-                if self.outf.lower() in ("xls", "xlsx", "excel"):
-                    conv.convert_csv_to_xlsx()
+    def document_eval(self):
+        if self.outf.lower() in self._uncached:
+            return reported_outputs(self._document_eval())
+        return cached_conversion(
+            self.file,
+            "document",
+            self._document_eval,
+            params={"to": _target(self.outf)},
+        )
 
-            else:
-                print(f"{fg.fg.BYELLOW}Unsupported Conversion type❌{RESET}")
-                pass
+    def _document_eval(self):
+        try:
+            plan = self.plan()
+        except ValueError as e:
+            print(f"{fg.BYELLOW}Unsupported Conversion type❌ {e}{RESET}")
+            return
+        if not plan.steps:
+            print(f"{fg.BYELLOW}{self.file} is already {plan.source}{RESET}")
+            return
+        self._substitute_note()
+        try:
+            handler = self._handlers.get(tuple(plan.formats))
+            if handler is not None:
+                return handler(DocConverter(self.file))
+            return self._run_plan(plan)
         except Exception as e:
             logger.error(e)
 
+    def _run_plan(self, plan: planner.Plan) -> str:
+        """Convert through the pipeline, next to the input like DocConverter."""
+        target = plan.formats[-1]
+        output = f"{os.path.splitext(self.file)[0]}.{target}"
+        logger.info(
+            f"{fg.BYELLOW}Convert {fg.BLUE}{self.file}{fg.BYELLOW} via "
+            f"{' -> '.join(plan.formats)}{RESET}"
+        )
+        with span("doc.plan", route=" -> ".join(plan.formats)):
+            pipeline.Source(self.file).to(target).save(output)
+        logger.info(f"{fg.MAGENTA}New file is {fg.CYAN}{output}{RESET}")
+        return output
+
 
-def _isolate_file(_dir_, target):
-    try:
-        isolated_files = []
-        for root, dirs, files in os.walk(_dir_):
-            for file in files:
-                if file.lower().endswith(target):
-                    _path_ = os.path.join(root, file)
-                    isolated_files.append(_path_)
-        return isolated_files
-    except FileNotFoundError as e:
-        print(e)
-    except KeyboardInterrupt:
-        print("\nQuit!")
-        sys.exit(1)
-    except Exception as e:
-        print(e)
+def explain(paths, _format_, _isolate_=None):
+    """Print the conversion plan of every file, directories walked like conversions"""
+    for path in paths:
+        if os.path.isdir(path):
+            files = discover(
+                path,
+                extensions=DirectoryConverter.sources(_isolate_),
+                recursive=True,
+            )
+        else:
+            files = [path]
+        for file in files:
+            MethodMappingEngine(file, _format_).explain()
@@ -0,0 +1,348 @@
+"""
+Persistent worker daemon for filemac.
+
+`filemac serve` imports the converters once, warms tesseract/LibreOffice and
+then accepts jobs over a local Unix socket. Every job is served by a process
+forked from the warm daemon, so it starts with all imports already done while
+keeping cwd, environment and global state isolated per job.
+
+The client hands its own stdin/stdout/stderr over the socket (SCM_RIGHTS), so
+output, colours, progress bars and prompts behave exactly as in-process runs.
+`CliInit` forwards to the daemon transparently whenever the socket is live;
+set FILEMAC_NO_DAEMON=1 to force in-process execution.
+"""
+
+import argparse
+import importlib
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+from pathlib import Path
+from typing import Optional, Sequence
+
+from ..utils.colors import fg, rs
+from ..utils.config import DAEMON_SOCKET
+from ..utils.simple import logger
+
+RESET = rs
+
+# Modules imported once by the daemon so forked jobs don't pay for them
+WARM_MODULES = (
+    "filemac.cli.converter",
+    "filemac.core.document",
+    "filemac.core.pdf.core",
+    "filemac.core.image.core",
+    "filemac.core.ocr",
+    "filemac.core.audio.core",
+    "filemac.core.tts.gtts",
+    "filemac.core.html",
+)
+
+_MAX_MESSAGE = 1 << 20
+
+
+def _send(conn: socket.socket, message: dict) -> None:
+    conn.sendall(json.dumps(message).encode("utf-8") + b"\n")
+
+
+def _recv(conn: socket.socket, maxfds: int = 0):
+    """Read one newline terminated JSON message (and any attached fds)."""
+    buffer, fds = b"", []
+    while not buffer.endswith(b"\n"):
+        if maxfds:
+            data, new_fds, _, _ = socket.recv_fds(conn, 65536, maxfds)
+            fds.extend(new_fds)
+        else:
+            data = conn.recv(65536)
+        if not data:
+            break
+        buffer += data
+        if len(buffer) > _MAX_MESSAGE:
+            raise ValueError("Message too large")
+    if not buffer:
+        return None, fds
+    return json.loads(buffer.decode("utf-8")), fds
+
+
+class _JobHandler(socketserver.BaseRequestHandler):
+    """Runs inside the forked child: one connection == one job."""
+
+    def handle(self):
+        message, fds = _recv(self.request, maxfds=3)
+        if message is None:
+            return
+
+        command = message.get("cmd", "run")
+        if command == "ping":
+            _send(self.request, {"ok": True, "pid": os.getppid()})
+            return
+        if command == "shutdown":
+            _send(self.request, {"ok": True})
+            os.kill(os.getppid(), signal.SIGTERM)
+            return
+
+        _send(self.request, {"pid": os.getpid()})
+        code = self.run_job(message, fds)
+        _send(self.request, {"exit": code})
+
+    @staticmethod
+    def run_job(message: dict, fds: Sequence[int]) -> int:
+        # Take over the client's terminal/pipes
+        for target, fd in enumerate(fds[:3]):
+            os.dup2(fd, target)
+            os.close(fd)
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+        os.environ.clear()
+        os.environ.update(message.get("env", {}))
+        os.chdir(message.get("cwd", os.getcwd()))
+
+        from .main import run_cli
+
+        code = 0
+        try:
+            run_cli(message.get("argv", []))
+        except SystemExit as e:
+            if e.code is None:
+                code = 0
+            elif isinstance(e.code, int):
+                code = e.code
+            else:
+                print(e.code, file=sys.stderr)
+                code = 1
+        except KeyboardInterrupt:
+            code = 130
+        except BaseException as e:
+            logger.exception(e)
+            code = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        return code
+
+
+class _ForkingServer(socketserver.ForkingMixIn, socketserver.UnixStreamServer):
+    # Jobs may outlive the default 40-child cap on busy cron boxes
+    max_children = 256
+    block_on_close = False
+
+
+class FilemacDaemon:
+    """
+    Long running filemac worker.
+
+    Args:
+        socket_path: Unix socket to listen on, defaults to DAEMON_SOCKET.
+    """
+
+    def __init__(self, socket_path: Optional[os.PathLike] = None):
+        self.socket_path = Path(socket_path or DAEMON_SOCKET)
+        self.server = None
+
+    def warm_up(self):
+        """Import converters and probe external tools once."""
+        for module in WARM_MODULES:
+            try:
+                importlib.import_module(module)
+            except Exception as e:
+                logger.warning(f"Could not preload {module}: {e}")
+
+        try:
+            import pytesseract
+
+            pytesseract.get_tesseract_version()
+        except Exception as e:
+            logger.warning(f"Tesseract unavailable: {e}")
+
+        # Cached, forked jobs inherit the answer
+        from ..utils import office
+
+        if not office.available():
+            logger.warning("LibreOffice (soffice) not found on PATH")
+
+    def _remove_stale_socket(self):
+        if not self.socket_path.exists():
+            return
+        if DaemonClient(self.socket_path).ping():
+            raise RuntimeError(f"A daemon is already listening on {self.socket_path}")
+        self.socket_path.unlink()
+
+    def serve_forever(self):
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        self._remove_stale_socket()
+        self.warm_up()
+
+        old_umask = os.umask(0o177)  # Socket is private to the current user
+        try:
+            self.server = _ForkingServer(str(self.socket_path), _JobHandler)
+        finally:
+            os.umask(old_umask)
+
+        def _stop(signum, frame):
+            raise KeyboardInterrupt
+
+        signal.signal(signal.SIGTERM, _stop)
+        print(
+            f"{fg.BGREEN}filemac daemon listening on {fg.BLUE}{self.socket_path}{RESET}"
+        )
+        try:
+            self.server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.server.server_close()
+            if self.socket_path.exists():
+                self.socket_path.unlink()
+            print(f"{fg.YELLOW}filemac daemon stopped{RESET}")
+
+
+class DaemonClient:
+    """Thin client used by `CliInit` to hand jobs to a running daemon."""
+
+    def __init__(self, socket_path: Optional[os.PathLike] = None, timeout=0.5):
+        self.socket_path = Path(socket_path or DAEMON_SOCKET)
+        self.timeout = timeout
+
+    def _connect(self) -> Optional[socket.socket]:
+        if not self.socket_path.exists():
+            return None
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        conn.settimeout(self.timeout)
+        try:
+            conn.connect(str(self.socket_path))
+        except OSError:
+            conn.close()
+            return None
+        return conn
+
+    def _control(self, command: str) -> Optional[dict]:
+        conn = self._connect()
+        if conn is None:
+            return None
+        with conn:
+            _send(conn, {"cmd": command})
+            reply, _ = _recv(conn)
+            return reply
+
+    def ping(self) -> bool:
+        try:
+            return bool(self._control("ping"))
+        except (OSError, ValueError):
+            return False
+
+    def shutdown(self) -> bool:
+        try:
+            return bool(self._control("shutdown"))
+        except (OSError, ValueError):
+            return False
+
+    def forward(self, argv: Sequence[str]) -> Optional[int]:
+        """
+        Run `argv` on the daemon.
+
+        Returns:
+            The job's exit code, or None when no daemon is reachable and the
+            caller should run the job itself.
+        """
+        conn = self._connect()
+        if conn is None:
+            return None
+
+        with conn:
+            request = {
+                "argv": list(argv),
+                "cwd": os.getcwd(),
+                "env": dict(os.environ),
+            }
+            try:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                socket.send_fds(
+                    conn,
+                    [json.dumps(request).encode("utf-8") + b"\n"],
+                    [0, 1, 2],
+                )
+            except OSError:
+                return None
+
+            # Once the request is out the job may run for hours; never fall
+            # back to running in-process after this point unless the daemon
+            # closed the connection before starting the job.
+            conn.settimeout(None)
+            try:
+                started, _ = _recv(conn)
+            except (OSError, ValueError):
+                started = None
+            if not started or "pid" not in started:
+                return None
+
+            while True:
+                try:
+                    reply, _ = _recv(conn)
+                    break
+                except KeyboardInterrupt:
+                    # Forward Ctrl+C to the job, then wait for it to wind down
+                    try:
+                        os.kill(started["pid"], signal.SIGINT)
+                    except ProcessLookupError:
+                        return 130
+            if reply is None:
+                # The job process died without reporting back
+                return 1
+            return int(reply.get("exit", 1))
+
+
+def forward_to_daemon(argv: Sequence[str]) -> Optional[int]:
+    """Forward a cli invocation to the daemon if one is running."""
+    if os.environ.get("FILEMAC_NO_DAEMON") or not hasattr(socket, "AF_UNIX"):
+        return None
+    if not DAEMON_SOCKET.exists():
+        return None
+    return DaemonClient().forward(argv)
+
+
+def serve_cli(argv: Sequence[str]) -> int:
+    """Entry for `filemac serve`"""
+    parser = argparse.ArgumentParser(
+        prog="filemac serve",
+        description="Run filemac as a persistent worker daemon",
+    )
+    parser.add_argument(
+        "--socket",
+        default=None,
+        help=f"Unix socket path (default: {fg.BYELLOW}{DAEMON_SOCKET}{RESET})",
+    )
+    parser.add_argument(
+        "--stop", action="store_true", help="Stop the running daemon and exit."
+    )
+    parser.add_argument(
+        "--status", action="store_true", help="Report whether a daemon is running."
+    )
+    args = parser.parse_args(argv)
+
+    if not hasattr(socket, "AF_UNIX"):
+        print(f"{fg.RED}filemac serve requires Unix domain sockets{RESET}")
+        return 1
+
+    client = DaemonClient(args.socket)
+    if args.status:
+        running = client.ping()
+        print(
+            f"{fg.BGREEN}running{RESET}"
+            if running
+            else f"{fg.YELLOW}not running{RESET}"
+        )
+        return 0 if running else 1
+    if args.stop:
+        return 0 if client.shutdown() else 1
+
+    try:
+        FilemacDaemon(args.socket).serve_forever()
+    except RuntimeError as e:
+        print(f"{fg.RED}{e}{RESET}")
+        return 1
+    return 0
@@ -1,32 +1,70 @@
 #!/usr/bin/env python3
 import argparse
 import os
+import signal
 import sys
 from functools import lru_cache
-from ..core.document import DocConverter
-from ..core.pdf.core import PageExtractor
 from ..core.exceptions import FileSystemError, FilemacError
 from pathlib import Path
 from ..utils.colors import fg, bg, rs
 
 from ..utils.simple import logger
+from ..utils.cache import set_cache_enabled
+from ..utils import profiler
+from ..utils.executor import set_jobs, set_memory_budget
+from ..utils.memory import parse_size
 
-try:
-    from audiobot.cli import cli as audiobot_cli
-except ImportError:
-    pass
-
-_entry_ = PageExtractor._entry_
+# NOTE: keep this module free of heavy top-level imports (pandas, cv2, moviepy,
+# audiobot ...). Every handler imports what it needs so that `--help` and
+# `--version` stay fast and work on headless machines.
 
 RESET = rs
 
 
-def CliInit():
+def _terminate(signum, frame):
+    # Unwind normally so scratch workspaces are removed on `kill`
+    raise SystemExit(128 + signum)
+
+
+# Operations that need the caller's interactive session (microphone, keyboard
+# hooks, daemon control) always run in-process
+_NO_FORWARD = {"serve", "-vt", "--voicetype", "--record"}
+
+
+def CliInit(argv=None):
     """Define main functions to create commandline arguments for different operations"""
+    argv = sys.argv[1:] if argv is None else list(argv)
+
+    if argv and argv[0] == "serve":
+        from .daemon import serve_cli
+
+        sys.exit(serve_cli(argv[1:]))
+
+    if not _NO_FORWARD.intersection(argv):
+        from .daemon import forward_to_daemon
+
+        code = forward_to_daemon(argv)
+        if code is not None:
+            sys.exit(code)
+
+    run_cli(argv)
+
+
+def run_cli(argv):
+    """Parse `argv` and execute the requested operation in this process"""
+    parser = create_parser()
+    # Use parse_known_args to allow unknown arguments (for later tunneling)
+    args, remaining_args = parser.parse_known_args(argv)
+    mapper = OperationMapper(parser, args, remaining_args)
+    mapper.run()
+
+
+def create_parser():
+    """Create the argument parser shared by the cli and the daemon"""
     parser = argparse.ArgumentParser(
         description="Filemac: A file management tool with audio effects. Supporting wide range of Multimedia Operations",
         add_help=False,
-        epilog=f"{fg.BLUE}When using {fg.MAGENTA}-SALI{fg.BLUE} long images have maximum height that can be processed{RESET}",
+        epilog=f"{fg.BLUE}When using {fg.MAGENTA}-SALI{fg.BLUE} or {fg.MAGENTA}--doc_long_image{fg.BLUE} long images are split into numbered segments past {fg.MAGENTA}--max-height{RESET}",
     )
 
     parser.add_argument(
@@ -233,10 +271,96 @@ def CliInit():
     parser.add_argument(
         "--t",
         "-threads",
+        dest="threads",
         type=int,
         default=3,
         help=f"Number of threads for text to speech  {fg.BYELLOW}filemac --convert_doc simpledir --no-resume -t 2{RESET}",
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help=f"Number of worker processes for batch conversions, 0 uses all cores {fg.BYELLOW}filemac --convert_doc simpledir -tf pdf --jobs 4{RESET}",
+    )
+    parser.add_argument(
+        "--memory-budget",
+        type=parse_size,
+        metavar="SIZE",
+        help=f"Memory the parallel jobs may use together, defaults to 70%% of the available memory {fg.BYELLOW}filemac --convert_doc dir -tf image --jobs 4 --memory-budget 2G{RESET}",
+    )
+    parser.add_argument(
+        "--pages",
+        metavar="RANGES",
+        help=f"Pages to extract text from or render, 1-based inclusive ranges {fg.BYELLOW}filemac --convert_doc book.pdf -tf txt --pages 1-20,40-{RESET}",
+    )
+    parser.add_argument(
+        "--dpi",
+        type=int,
+        help=f"Resolution of rendered pages, 200 by default {fg.BYELLOW}filemac --convert_doc2image book.pdf -tf jpg --dpi 100{RESET}",
+    )
+    parser.add_argument(
+        "--max-height",
+        type=int,
+        metavar="PIXELS",
+        help=f"Height at which long images are split into numbered segments, by default as tall as Pillow opens {fg.BYELLOW}filemac --doc_long_image book.pdf --max-height 20000{RESET}",
+    )
+    parser.add_argument(
+        "--pdf-backend",
+        choices=["auto", "pymupdf", "pypdf2"],
+        help="Library for pdf text, page and image operations, auto prefers PyMuPDF",
+    )
+    parser.add_argument(
+        "--max-rows",
+        type=int,
+        metavar="N",
+        help=f"Rows per word document or xlsx sheet of spreadsheet output, extra rows go to numbered documents/sheets {fg.BYELLOW}filemac --convert_doc book.xlsx -tf docx --max-rows 50000{RESET}",
+    )
+    parser.add_argument(
+        "--db",
+        metavar="FILE",
+        help=f"Sqlite database for spreadsheet to db conversion, all workbooks are loaded into it {fg.BYELLOW}filemac --convert_doc q1.xlsx q2.xlsx -tf db --db sales.db --table sales{RESET}",
+    )
+    parser.add_argument(
+        "--table",
+        metavar="NAME",
+        help="Table for spreadsheet to db conversion, defaults to the workbook name; workbooks with several sheets get NAME_<sheet>",
+    )
+    parser.add_argument(
+        "--index",
+        metavar="COLUMNS",
+        help="Comma separated columns to index after a spreadsheet to db conversion",
+    )
+    parser.add_argument(
+        "--scratch",
+        metavar="DIR",
+        help=f"Directory for the per-job scratch workspaces, defaults to the system temporary directory {fg.BYELLOW}filemac --convert_doc dir -tf audio --scratch /mnt/fast{RESET}",
+    )
+    parser.add_argument(
+        "--tmpfs",
+        action="store_true",
+        help="Keep scratch workspaces in memory (/dev/shm) when available",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="OUT.json",
+        help=f"Record per-stage timings as a Chrome trace with totals and peak memory {fg.BYELLOW}filemac --convert_doc dir -tf pdf --profile out.json{RESET}",
+    )
+    parser.add_argument(
+        "--explain",
+        action="store_true",
+        help=f"Print the conversion plan with estimated times instead of converting {fg.BYELLOW}filemac --convert_doc notes.doc -tf audio --explain{RESET}",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always convert, ignore the conversion cache and directory manifests",
+    )
+    parser.add_argument(
+        "--cache-stats",
+        action="store_true",
+        help=f"Show conversion cache size and hit ratio {fg.BYELLOW}filemac --cache-stats{RESET}",
+    )
     parser.add_argument(
         "-sep",
         "--separator",
@@ -312,10 +436,7 @@ def CliInit():
         "-h", "--help", action="store_true", help="Show this help message and exit."
     )
 
-    # Use parse_known_args to allow unknown arguments (for later tunneling)
-    args, remaining_args = parser.parse_known_args()
-    mapper = OperationMapper(parser, args, remaining_args)
-    mapper.run()
+    return parser
 
 
 class OperationMapper:
@@ -360,17 +481,33 @@ class OperationMapper:
         conv.convert_image()
 
     def doc_converter(self):
+        from ..core.document import DocConverter
         from ..utils.formats import SUPPORTED_AUDIO_FORMATS_DIRECT
-        from .converter import MethodMappingEngine, DirectoryConverter, Batch_Audiofy
+        from .converter import (
+            MethodMappingEngine,
+            DirectoryConverter,
+            Batch_Audiofy,
+            explain,
+        )
 
         if self.args.target_format is None:
             self.ensure_target_format()
             return
+        if self.args.explain:
+            explain(self.args.convert_doc, self.args.target_format, self.args.isolate)
+            return
         if self.args.use_extras:
             DocConverter.word2pdf_extra(self.args.convert_doc)
+        if self.args.target_format.lower() == "db":
+            # One loader for every workbook, the database takes one writer
+            index = self.args.index.split(",") if self.args.index else None
+            DocConverter(self.args.convert_doc).convert_xlsx_to_database(
+                self.args.db, self.args.table, index
+            )
+            return
+        # A single file is planned like any conversion, e.g. docx -> txt -> ogg
         if (
-            len(self.args.convert_doc) <= 1
-            and not os.path.isdir(self.args.convert_doc[0])
+            len(self.args.convert_doc) > 1
             and isinstance(self.args.convert_doc, list)
             and self.args.target_format in SUPPORTED_AUDIO_FORMATS_DIRECT
         ):
@@ -395,10 +532,14 @@ class OperationMapper:
 
     def handle_audio_help(self):
         if self.args.audio_help:
+            from audiobot.cli import cli as audiobot_cli
+
             audiobot_cli(["--help"])
         return
 
     def handle_audio_effect(self):
+        from audiobot.cli import cli as audiobot_cli
+
         audiobot_cli(self.remaining_args)
         return
 
@@ -456,6 +597,8 @@ class OperationMapper:
         res.resize_image(self.args.t_size)
 
     def handle_doc_to_image_conversion(self):
+        from ..core.document import DocConverter
+
         conv = DocConverter(self.args.convert_doc2image)
         conv.doc2image(self.args.target_format)
 
@@ -482,15 +625,21 @@ class OperationMapper:
         vi.moviepyextract()
 
     def handle_scan_pdf(self):
-        sc = PageExtractor(self.args.scan)
+        from ..core.pdf.core import Scanner
+
+        sc = Scanner(self.args.scan)
         sc.scanPDF()
 
     def handle_scan_images(self):
-        sc = PageExtractor(self.args.scanAsImg, self.args.no_strip)
+        from ..core.pdf.core import Scanner
+
+        sc = Scanner(self.args.scanAsImg, self.args.separator)
         sc.scanAsImgs()
 
     def handle_scan_long_image(self):
-        sc = PageExtractor(self.args.scanAsLong_Image, self.args.separator)
+        from ..core.pdf.core import Scanner
+
+        sc = Scanner(self.args.scanAsLong_Image, self.args.separator)
         sc.scanAsLongImg()
 
     def handle_doc_to_long_image(self):
@@ -526,7 +675,9 @@ class OperationMapper:
         init.text_to_word()
 
     def handle_extract_pages(self):
-        _entry_(self.args.extract_pages)
+        from ..core.pdf.core import PageExtractor
+
+        PageExtractor._entry_(self.args.extract_pages)
 
     def ImageExtractor(self):
         from ..core.image.extractor import process_files
@@ -586,6 +737,11 @@ class OperationMapper:
 
         return print(f"{fg.BLUE}filemac: V-{fg.BGREEN}{version}{RESET}")
 
+    def display_cache_stats(self):
+        from ..utils.cache import ConversionCache, format_stats
+
+        print(format_stats(ConversionCache().stats()))
+
     def voicetype(self):
         from voice.VoiceType import VoiceTypeEngine
 
@@ -643,6 +799,7 @@ class OperationMapper:
                 sys.exit(),
             ),
             args.version: self.display_version,
+            args.cache_stats: self.display_cache_stats,
             tuple(args.convert_doc or ()): self.doc_converter,
             args.convert_video: self.handle_video_conversion,
             args.convert_image: self.image_converter,
@@ -687,6 +844,58 @@ class OperationMapper:
         """Check for audio conversion help argument by calling help method"""
         self.handle_audio_conversion_help()
 
+        if self.args.jobs is not None:
+            set_jobs(self.args.jobs)
+        if self.args.memory_budget:
+            set_memory_budget(self.args.memory_budget)
+        if self.args.scratch or self.args.tmpfs:
+            from ..utils.workspace import set_scratch_root, use_tmpfs
+
+            if self.args.scratch:
+                set_scratch_root(self.args.scratch)
+            if self.args.tmpfs:
+                use_tmpfs()
+        if self.args.pages:
+            from ..core.pdf.text import set_pages
+
+            try:
+                set_pages(self.args.pages)
+            except ValueError as e:
+                logger.error(e)
+                sys.exit(2)
+        if self.args.dpi is not None:
+            from ..core.pdf.raster import set_dpi
+
+            try:
+                set_dpi(self.args.dpi)
+            except ValueError as e:
+                logger.error(e)
+                sys.exit(2)
+        if self.args.max_height is not None:
+            from ..core.pdf.longimage import set_max_height
+
+            try:
+                set_max_height(self.args.max_height)
+            except ValueError as e:
+                logger.error(e)
+                sys.exit(2)
+        if self.args.pdf_backend:
+            # Read by the pdf backends of this process and its workers
+            os.environ["FILEMAC_PDF_BACKEND"] = self.args.pdf_backend
+        if self.args.max_rows is not None:
+            from ..core.spreadsheet.word import set_max_rows
+
+            try:
+                set_max_rows(self.args.max_rows)
+            except ValueError as e:
+                logger.error(e)
+                sys.exit(2)
+        signal.signal(signal.SIGTERM, _terminate)
+        if self.args.no_cache:
+            set_cache_enabled(False)
+        if self.args.profile:
+            profiler.enable()
+
         # Find the first non-empty key in method_mapper and execute its corresponding method
         try:
             """
@@ -695,7 +904,8 @@ class OperationMapper:
             """
             method = self.get_method()
             if method:
-                method()
+                with profiler.span(f"cli.{method.__name__}"):
+                    method()
             else:
                 self.parser.print_help()
                 raise FilemacError("Invalid arguments")
@@ -710,6 +920,9 @@ class OperationMapper:
             raise
             # Handle any exceptions that occur during method execution
             logger.error(f"An error occurred: {e}")
+        finally:
+            if self.args.profile:
+                profiler.report_to(self.args.profile)
 
         return
 
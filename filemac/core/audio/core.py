@@ -4,10 +4,13 @@ import sys
 from typing import List, Tuple, Union
 from moviepy import VideoFileClip
 from pydub import AudioSegment
-from tqdm.auto import tqdm
 from .m4a_converter import m4a
 from rich.progress import Progress
 from ...utils.colors import fg, rs
+from ...utils.discovery import discover
+from ...utils.executor import run_batch
+from ...utils.memory import cost_of
+from ...utils.profiler import span, timed
 from ...utils.formats import SUPPORTED_AUDIO_FORMATS_DIRECT, SUPPORTED_AUDIO_FORMATS
 
 RESET = rs
@@ -21,62 +24,21 @@ class AudioConverter:
         self.out_format = out_format
 
     def preprocess(self):
-        files_to_process = []
-
-        if os.path.isfile(self.input_file):
-            files_to_process.append(self.input_file)
-        elif os.path.isdir(self.input_file):
-            if os.listdir(self.input_file) is None:
-                print(f"{fg.RED}Cannot work with empty folder{RESET}")
-                sys.exit(1)
-            for file in os.listdir(self.input_file):
-                file_path = os.path.join(self.input_file, file)
-                if os.path.isfile(file_path):
-                    files_to_process.append(file_path)
-
-        return files_to_process
+        return discover(self.input_file, extensions=SUPPORTED_AUDIO_FORMATS)
 
     def pydub_conv(self):
         try:
             input_list = self.preprocess()
             out_f = self.out_format
-            input_list = [
-                item
-                for item in input_list
-                if any(item.lower().endswith(ext) for ext in SUPPORTED_AUDIO_FORMATS)
-            ]
             print(f"{fg.BYELLOW}Initializing conversion..{RESET}")
 
-            def wav_redudancy():
-                # Load the mp3 file using Pydub
-                audio = AudioSegment.from_file(file, fmt)
-                # Export the audio to a temporary file in wav format (ffmpeg can convert from wav to m4a)
-                audio.export("temp.wav", format="wav")
-
-            for file in tqdm(input_list):
-                if out_f.lower() in SUPPORTED_AUDIO_FORMATS_DIRECT:
-                    _, ext = os.path.splitext(file)
-                    output_filename = _ + "." + out_f
-                    fmt = ext[1:]
-                    # print(fmt, out_f)
-                    audio = AudioSegment.from_file(file, fmt)
-                    print(f"{fg.BMAGENTA}Converting to {output_filename}{RESET}")
-                    audio.export(output_filename, format=out_f)
-                    # new_audio = pydub.AudioSegment.from_file('output_audio.')
-                    print(f"{fg.BGREEN}Done{RESET}")
-
-                elif file[-3:].lower() == "m4a" or out_f.lower() == "m4a":
-                    m4a(file, out_f)
-
-                elif (
-                    out_f.lower() in SUPPORTED_AUDIO_FORMATS
-                    and not SUPPORTED_AUDIO_FORMATS_DIRECT
-                ):
-                    print("Pending Implemantation For the format")
-
-                else:
-                    print(f"{fg.RED}Unsupported output format{RESET}")
-                    sys.exit(1)
+            run_batch(
+                self._convert_one,
+                input_list,
+                out_f,
+                desc="Converting audio",
+                cost=cost_of("audio"),
+            )
 
         except KeyboardInterrupt:
             print("\nQuit❕")
@@ -84,6 +46,31 @@ class AudioConverter:
         except Exception as e:
             print(f"{fg.RED}{e}{RESET}")
 
+    @staticmethod
+    def _convert_one(file, out_f):
+        if out_f.lower() in SUPPORTED_AUDIO_FORMATS_DIRECT:
+            _, ext = os.path.splitext(file)
+            output_filename = _ + "." + out_f
+            fmt = ext[1:]
+            audio = AudioSegment.from_file(file, fmt)
+            print(f"{fg.BMAGENTA}Converting to {output_filename}{RESET}")
+            audio.export(output_filename, format=out_f)
+            print(f"{fg.BGREEN}Done{RESET}")
+            return output_filename
+
+        elif file[-3:].lower() == "m4a" or out_f.lower() == "m4a":
+            return m4a(file, out_f)
+
+        elif (
+            out_f.lower() in SUPPORTED_AUDIO_FORMATS
+            and not SUPPORTED_AUDIO_FORMATS_DIRECT
+        ):
+            print("Pending Implemantation For the format")
+
+        else:
+            print(f"{fg.RED}Unsupported output format{RESET}")
+            sys.exit(1)
+
 
 class AudioJoiner:
     def __init__(self, obj: Union[list, tuple[str]], masterfile=None):
@@ -122,6 +109,7 @@ class AudioJoiner:
         else:
             return 0
 
+    @timed("audiojoin.worker")
     def worker(self):
         try:
             if len(self.files) == 0:
@@ -165,7 +153,8 @@ class AudioJoiner:
                 )
                 for i, filename in enumerate(sorted_filenames):
                     # print(f"{BWHITE}File {DCYAN}{filename}{RESET}")
-                    ogg_files.append(AudioSegment.from_file(filename))
+                    with span("audiojoin.decode", file=filename):
+                        ogg_files.append(AudioSegment.from_file(filename))
                     progress.update(task2, advance=i)
 
             # Concatenate the ogg files
@@ -174,12 +163,14 @@ class AudioJoiner:
                 task3 = progress.add_task(
                     "[magenta]Joining... ", total=len(sorted_filenames)
                 )
-                for i in range(1, len(sorted_filenames)):
-                    combined_ogg += ogg_files[i]
-                    progress.update(task3, advance=i)
+                with span("audiojoin.concat", files=len(sorted_filenames)):
+                    for i in range(1, len(sorted_filenames)):
+                        combined_ogg += ogg_files[i]
+                        progress.update(task3, advance=i)
 
             # Export the combined ogg to new mp3 file or ogg file
-            combined_ogg.export(masterfile, format=_format)
+            with span("audiojoin.encode", file=masterfile):
+                combined_ogg.export(masterfile, format=_format)
             print(f"{fg.BGREEN}Master file:Ok🤏")
             """
             if self.isdir:
@@ -200,26 +191,7 @@ class AudioExtracter:
         self.input_file = input_file
 
     def preprocess(self):
-        try:
-            files_to_process = []
-
-            if os.path.isfile(self.input_file):
-                files_to_process.append(self.input_file)
-            elif os.path.isdir(self.input_file):
-                if os.listdir(self.input_file) is None:
-                    print(f"{fg.RED}Cannot work with empty folder{RESET}")
-                    sys.exit(1)
-                for file in os.listdir(self.input_file):
-                    file_path = os.path.join(self.input_file, file)
-                    ls = ["mp4", "mkv"]
-                    if os.path.isfile(file_path) and any(
-                        file_path.lower().endswith(ext) for ext in ls
-                    ):
-                        files_to_process.append(file_path)
-
-            return files_to_process
-        except Exception as e:
-            print(e)
+        return discover(self.input_file, extensions=("mp4", "mkv"))
 
     def moviepyextract(self):
         try:
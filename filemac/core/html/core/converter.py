@@ -14,6 +14,7 @@ from docx.oxml import OxmlElement
 from .html_parser import HTMLParser
 from .style_manager import StyleManager
 from ..utils.validation import validate_html, validate_file_path
+from ....utils.profiler import span, timed
 
 
 class HTML2Word:
@@ -35,6 +36,7 @@ class HTML2Word:
     def __enter__(self):
         self.block_element = self.html_parser.block_elements.copy().add("ol").add("ul")
 
+    @timed("html.convert")
     def convert(self, html_content: str, output_path: str) -> Document:
         """
         Convert HTML content to DOCX document
@@ -60,13 +62,16 @@ class HTML2Word:
         self.style_manager.setup_document_styles(self.doc)
 
         # Parse HTML and extract styles
-        parsed_data = self.html_parser.parse(html_content)
+        with span("html.parse"):
+            parsed_data = self.html_parser.parse(html_content)
 
         # Convert to DOCX
-        self._convert_elements(parsed_data["elements"], parsed_data["styles"])
+        with span("html.render", elements=len(parsed_data["elements"])):
+            self._convert_elements(parsed_data["elements"], parsed_data["styles"])
 
         # Save document
-        self.doc.save(output_path)
+        with span("html.save", file=output_path):
+            self.doc.save(output_path)
         return self.doc
 
     def convert_file(self, html_file_path: str, output_path: str) -> Document:
@@ -82,7 +87,7 @@ class HTML2Word:
         """
         validate_file_path(html_file_path, "input")
 
-        with open(html_file_path, "r", encoding="utf-8") as f:
+        with open(html_file_path, "r", encoding="utf-8") as f, span("html.read"):
             html_content = f.read()
 
         return self.convert(html_content, output_path)
@@ -7,12 +7,14 @@ from docx.shared import Inches, Mm
 from docx import Document
 import os
 import sys
-from tqdm import tqdm
 from PIL import Image
 import cv2
 from typing import List, Tuple, Union, Optional
 from ...utils.simple import logger
-from ...utils.decorators import Decorators
+from ...utils.executor import run_batch
+from ...utils.memory import cost_of
+from ...utils.cache import cached_conversion
+from ...utils.discovery import discover
 from ...utils.formats import SUPPORTED_IMAGE_FORMATS
 from ...utils.file_utils import modify_filename_if_exists, DirectoryScanner
 from ...utils.colors import fg, rs
@@ -100,56 +102,30 @@ class ImageConverter:
         self.input_file = input_file
         self.out_format = out_format
 
-    def preprocess(self) -> list:
-        try:
-            files_to_process = []
-
-            if os.path.isfile(self.input_file):
-                files_to_process.append(self.input_file)
-            elif os.path.isdir(self.input_file):
-                if os.listdir(self.input_file) is None:
-                    print("Cannot work with empty folder")
-                    sys.exit(1)
-                for file in os.listdir(self.input_file):
-                    file_path = os.path.join(self.input_file, file)
-                    if os.path.isfile(file_path):
-                        files_to_process.append(file_path)
-
-            return files_to_process
-        except FileNotFoundError:
+    def preprocess(self):
+        """Yield the supported images of the input file or directory"""
+        if not os.path.exists(self.input_file):
             print("File not found❕")
             sys.exit(1)
+        return discover(self.input_file, extensions=SUPPORTED_IMAGE_FORMATS.values())
 
     def convert_image(self) -> os.PathLike:
         try:
             input_list = self.preprocess()
             out_f = self.out_format.upper()
             out_f = "JPEG" if out_f == "JPG" else out_f
-            input_list = [
-                item
-                for item in input_list
-                if any(
-                    item.lower().endswith(ext)
-                    for ext in SUPPORTED_IMAGE_FORMATS.values()
-                )
-            ]
-            for file in tqdm(input_list):
-                if out_f.upper() in SUPPORTED_IMAGE_FORMATS:
-                    _ = os.path.splitext(file)[0]
-                    output_filename = _ + SUPPORTED_IMAGE_FORMATS[out_f].lower()
-                else:
-                    print("Unsupported output format")
-                    sys.exit(1)
-                """Load the image using OpenCV: """
-                img = cv2.imread(file)
-                """Convert the OpenCV image to a PIL image: """
-                pil_img = Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
-
-                pil_img.save(output_filename, out_f)
-
-                print(f"Saved image as: {fg.DCYAN}{output_filename}{RESET}")
-
-            return output_filename
+            if out_f.upper() not in SUPPORTED_IMAGE_FORMATS:
+                print("Unsupported output format")
+                sys.exit(1)
+
+            converted = run_batch(
+                self._convert_one,
+                input_list,
+                out_f,
+                desc="Converting images",
+                cost=cost_of(),
+            )
+            return converted[-1] if converted else None
         except KeyboardInterrupt:
             print("\nQuit❕")
             sys.exit(1)
@@ -162,6 +138,33 @@ class ImageConverter:
         except Exception as e:
             print(f"{fg.RED}{e}{RESET}")
 
+    @staticmethod
+    def _convert_one(file, out_f) -> os.PathLike:
+        output_filename = (
+            os.path.splitext(file)[0] + SUPPORTED_IMAGE_FORMATS[out_f].lower()
+        )
+        outputs = cached_conversion(
+            file,
+            "image",
+            lambda: ImageConverter._write_image(file, out_f, output_filename),
+            params={"to": out_f},
+        )
+        return outputs[0] if outputs else output_filename
+
+    @staticmethod
+    def _write_image(file, out_f, output_filename):
+        """Load the image using OpenCV: """
+        img = cv2.imread(file)
+        if img is None:
+            raise ValueError(f"Could not read image: {file}")
+        """Convert the OpenCV image to a PIL image: """
+        pil_img = Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+
+        pil_img.save(output_filename, out_f)
+
+        print(f"Saved image as: {fg.DCYAN}{output_filename}{RESET}")
+        return output_filename
+
 
 class GrayscaleConverter:
     """
@@ -216,30 +219,23 @@ class GrayscaleConverter:
         """
         Runs the image to grayscale conversion operation on the input files.
 
-        Applies the for_loop_decorator to process each image in the input list.
+        Every image is submitted to the shared batch executor.
         """
         file_list = DirectoryScanner(self.input_obj).run()
+        run_batch(self.process_image, file_list, desc="Grayscale")
 
-        @Decorators().for_loop_decorator(file_list)
-        def process_image(self, image_path):
-            """Processes a single image, converting it to grayscale and saving."""
-            try:
-                logger.info(f"{fg.YELLOW}Processing {fg.CYAN}{image_path}{RESET}")
-                img = cv2.imread(image_path)
-                if img is None:
-                    raise FileNotFoundError(f"Could not read image: {image_path}")
-                gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-                _, thresh = cv2.threshold(
-                    gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU
-                )
-                self.save_pil_image(thresh, image_path)
-            except FileNotFoundError as e:
-                logger.error(f"{fg.RED}{e}{RESET}")
-            except Exception as e:
-                raise
-                logger.error(f"An unexpected error occurred: {fg.RED}{e}{RESET}")
-
-        process_image(self)
+    def process_image(self, image_path):
+        """Processes a single image, converting it to grayscale and saving."""
+        try:
+            logger.info(f"{fg.YELLOW}Processing {fg.CYAN}{image_path}{RESET}")
+            img = cv2.imread(image_path)
+            if img is None:
+                raise FileNotFoundError(f"Could not read image: {image_path}")
+            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+            self.save_pil_image(thresh, image_path)
+        except FileNotFoundError as e:
+            logger.error(f"{fg.RED}{e}{RESET}")
 
     def save_pil_image(self, thresh, image_path):
         """
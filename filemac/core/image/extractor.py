@@ -7,7 +7,7 @@ from typing import List, Union, Tuple
 from pathlib import Path
 import os
 from ...utils.colors import fg, rs
-from ...utils.file_utils import dirbuster
+from ...utils.discovery import discover
 
 RESET = rs
 
@@ -205,8 +205,11 @@ def process_files(
     try:
         for file_path in file_paths:
             if os.path.isdir(file_path):
-                files = dirbuster(file_path)
+                files = discover(
+                    file_path, extensions=("pdf", "doc", "docx"), recursive=True
+                )
                 process_files(files, tsize=tsize)
+                continue
             if file_path.lower().endswith(".pdf"):
                 extractor = PdfImageExtractor(output_path, tsize)
                 extractor.extract_and_save_images(file_path)
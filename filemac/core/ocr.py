@@ -6,11 +6,12 @@ from typing import Union, List, Optional
 import cv2
 import pytesseract
 from PIL import Image
-from rich.progress import Progress
+from ..utils.cache import cached_value
 from ..utils.colors import fg, bg, rs
+from ..utils.executor import run_batch
+from ..utils.profiler import span, timed
 from ..utils.file_utils import modify_filename_if_exists, DirectoryScanner
 
-
 RESET = rs
 
 # Define constants for better readability and maintainability
@@ -72,18 +73,10 @@ class ExtractText:
             self.sep = separator_map.get(self.sep, self.sep)
         """
 
-    def _process_image(self, image_path: str, output_file: str) -> str:
-        """
-        Extracts text from a single image and saves it to a file.
-
-        Args:
-            image_path: Path to the image file.
-            output_file: Path to the output text file.
-
-        Returns:
-            The extracted text.  Returns an empty string on error.
-        """
-        try:
+    @staticmethod
+    def _ocr(image_path: str) -> str:
+        """Preprocess an image and run tesseract over it"""
+        with span("ocr.decode", file=image_path):
             # Load image using OpenCV
             img = cv2.imread(image_path)
             if img is None:
@@ -94,7 +87,22 @@ class ExtractText:
             _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
             img_pil = Image.fromarray(thresh)
 
-            # Perform OCR using pytesseract
+        with span("ocr.tesseract", file=image_path):
+            return pytesseract.image_to_string(img_pil, config=DEFAULT_CONFIG)
+
+    @timed("ocr.image")
+    def _process_image(self, image_path: str, output_file: Optional[str]) -> str:
+        """
+        Extracts text from a single image and saves it to a file.
+
+        Args:
+            image_path: Path to the image file.
+            output_file: Path to the output text file, None to skip writing.
+
+        Returns:
+            The extracted text.  Returns an empty string on error.
+        """
+        try:
             self.sep = (
                 self.sep.replace("\r\n", "\n")
                 .replace("\\n", "\n")
@@ -103,15 +111,22 @@ class ExtractText:
                 .replace("\\t", "\t")
             )
 
-            text = pytesseract.image_to_string(img_pil, config=DEFAULT_CONFIG)
+            # Perform OCR, repeated images are served from the cache
+            text = cached_value(
+                image_path,
+                "ocr",
+                lambda: self._ocr(image_path),
+                params={"config": DEFAULT_CONFIG},
+            )
             text = self.sep.join(text.splitlines())  # handle empty lines
             logger.info("")
             logger.info(f"Extracted text from {image_path}")
             print(f"{fg.YELLOW}{text}{RESET}")
 
             # Save text to file
-            with open(output_file, "w", encoding="utf-8") as file:  # Specify encoding
-                file.write(text)
+            if output_file:
+                with open(output_file, "w", encoding="utf-8") as file:
+                    file.write(text)
             return text
 
         except FileNotFoundError as e:
@@ -129,6 +144,12 @@ class ExtractText:
 
         return ""  # Return empty string on error
 
+    def _process_to_file(self, image_path: str) -> str:
+        """Extract text from `image_path` into a sibling-named .txt file"""
+        _output_file = os.path.splitext(os.path.basename(image_path))[0] + ".txt"
+        _output_file = modify_filename_if_exists(_output_file)
+        return self._process_image(image_path, _output_file)
+
     def run(
         self, output_file: Optional[Union[list[str], str, os.PathLike]] = None
     ) -> Optional[List[str]]:
@@ -155,38 +176,21 @@ class ExtractText:
 
         try:
             if output_file:
-                # Process all images and concatenate text into one output file
-                all_text = ""
-                with Progress() as progress:
-                    task = progress.add_task(
-                        "[yellow]Extracting text...", total=num_images
-                    )
-                    for image_path in image_list:
-                        all_text += (
-                            self._process_image(
-                                image_path, os.path.splitext(output_file)[0] + ".txt"
-                            )
-                            + self.sep
-                        )
-                        progress.update(task, advance=1)
+                # Process all images and concatenate text into one output file,
+                # results come back in input order whatever --jobs is
+                texts = run_batch(
+                    self._process_image, image_list, None, desc="Extracting text"
+                )
+                all_text = "".join(text + self.sep for text in texts)
                 with open(output_file, "w", encoding="utf-8") as f:
                     f.write(all_text)
                 return [all_text]  # Return a list containing the combined text
 
             else:
                 # Process each image individually, creating separate output files
-                with Progress() as progress:
-                    task = progress.add_task(
-                        "[yellow]Extracting text...", total=num_images
-                    )
-                    for image_path in image_list:
-                        _output_file = (
-                            os.path.splitext(os.path.basename(image_path))[0] + ".txt"
-                        )
-                        _output_file = modify_filename_if_exists(_output_file)
-                        text = self._process_image(image_path, _output_file)
-                        extracted_texts.append(text)
-                        progress.update(task, advance=1)
+                extracted_texts = run_batch(
+                    self._process_to_file, image_list, desc="Extracting text"
+                )
                 return extracted_texts
 
         except KeyboardInterrupt:
@@ -0,0 +1,296 @@
+"""
+PDF backends for text extraction, page copy/merge and rasterization.
+
+PyMuPDF is the default, it is a compiled library and several times faster
+than pure-python PyPDF2 at all three. PyPDF2 (with pdf2image and poppler for
+rasterizing) stays available as a fallback:
+
+    backend = get_backend()
+    texts = backend.page_texts("book.pdf", range(10))
+    backend.write_pages("out.pdf", [("a.pdf", 0), ("b.pdf", 0)])
+
+The backend is chosen with `--pdf-backend` / FILEMAC_PDF_BACKEND (`auto`,
+`pymupdf`, `pypdf2`), see PDF_BACKEND in utils/config.py. `auto` picks
+PyMuPDF when it is installed.
+"""
+
+import os
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from ...utils.config import PDF_BACKEND
+from ...utils.simple import logger
+
+# Resolution of rasterized pages, pdf2image's default
+DEFAULT_DPI = 200
+
+# Pages rendered per pdftoppm call by the PyPDF2 backend
+_RASTER_BATCH = 8
+
+# Image formats the renderers encode themselves, others go through Pillow
+_MUPDF_FORMATS = ("png", "pnm", "ppm", "pam", "psd", "ps", "jpg", "jpeg")
+_POPPLER_FORMATS = ("png", "ppm", "jpg", "jpeg", "tif", "tiff")
+
+# (pdf path, 0-based page index)
+PageRef = Tuple[str, int]
+
+
+class PdfBackend:
+    """Operations every backend implements."""
+
+    name = "base"
+
+    def __init__(self):
+        # Documents of the last file opened, parsing the cross reference table
+        # again for every call would dominate page-wise work
+        self._cache = {}
+        self._pid = os.getpid()
+
+    def _load(self, path: str):
+        raise NotImplementedError
+
+    def open(self, path: os.PathLike):
+        """Return the parsed document, reused while the file is unchanged."""
+        path = os.fspath(path)
+        if self._pid != os.getpid():
+            # Forked worker: the parent's handles share file offsets with it
+            self._cache = {}
+            self._pid = os.getpid()
+        stat = os.stat(path)
+        key = (path, stat.st_size, stat.st_mtime_ns)
+        if key not in self._cache:
+            self.release()
+            self._cache[key] = self._load(path)
+        return self._cache[key]
+
+    def release(self) -> None:
+        """Forget the cached document."""
+        self._cache.clear()
+
+    def page_count(self, path: os.PathLike) -> int:
+        raise NotImplementedError
+
+    def page_texts(self, path: os.PathLike, pages: Iterable[int]) -> List[str]:
+        """Text of the given 0-based pages."""
+        raise NotImplementedError
+
+    def write_pages(self, output: os.PathLike, pages: Sequence[PageRef]) -> str:
+        """Write the referenced pages, in order, as a new pdf."""
+        raise NotImplementedError
+
+    def rasterize(
+        self,
+        path: os.PathLike,
+        pages: Optional[Iterable[int]] = None,
+        dpi: int = DEFAULT_DPI,
+    ) -> Iterator:
+        """Yield the pages (all by default) as RGB PIL images, one at a time."""
+        raise NotImplementedError
+
+    def save_pages(
+        self,
+        path: os.PathLike,
+        pages: Sequence[int],
+        targets: Sequence[str],
+        dpi: int = DEFAULT_DPI,
+    ) -> List[str]:
+        """
+        Render the given 0-based pages straight to the `targets` image files,
+        the format follows their extension.
+        """
+        for image, target in zip(self.rasterize(path, pages, dpi), targets):
+            image.save(target)
+        return list(targets)
+
+
+def _extension(target: str) -> str:
+    return os.path.splitext(target)[1].lstrip(".").lower()
+
+
+def _pymupdf():
+    try:
+        import pymupdf
+    except ImportError:  # PyMuPDF < 1.24.3 only has the fitz name
+        import fitz as pymupdf
+    return pymupdf
+
+
+class PyMuPDFBackend(PdfBackend):
+    name = "pymupdf"
+
+    def _load(self, path):
+        return _pymupdf().open(path)
+
+    def release(self):
+        for doc in self._cache.values():
+            doc.close()
+        super().release()
+
+    def page_count(self, path):
+        return self.open(path).page_count
+
+    def page_texts(self, path, pages):
+        doc = self.open(path)
+        return [doc[index].get_text() for index in pages]
+
+    def write_pages(self, output, pages):
+        pymupdf = _pymupdf()
+        out = pymupdf.open()
+        sources = {}
+        try:
+            # Consecutive pages of one file are copied in a single call
+            run = None
+            for path, index in list(pages) + [(None, None)]:
+                if run and path == run[0] and index == run[2] + 1:
+                    run[2] = index
+                    continue
+                if run:
+                    src = sources.get(run[0])
+                    if src is None:
+                        src = sources[run[0]] = pymupdf.open(run[0])
+                    out.insert_pdf(src, from_page=run[1], to_page=run[2])
+                run = [path, index, index]
+            out.save(os.fspath(output), garbage=3, deflate=True)
+        finally:
+            out.close()
+            for src in sources.values():
+                src.close()
+        return os.fspath(output)
+
+    def rasterize(self, path, pages=None, dpi=DEFAULT_DPI):
+        from PIL import Image
+
+        doc = self.open(path)
+        for index in range(doc.page_count) if pages is None else pages:
+            pix = doc[index].get_pixmap(dpi=dpi, alpha=False)
+            yield Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+
+    def save_pages(self, path, pages, targets, dpi=DEFAULT_DPI):
+        from PIL import Image
+
+        doc = self.open(path)
+        for index, target in zip(pages, targets):
+            pix = doc[index].get_pixmap(dpi=dpi, alpha=False)
+            if _extension(target) in _MUPDF_FORMATS:
+                # Encoded by MuPDF, no PIL copy of the pixels
+                pix.save(target)
+            else:
+                Image.frombytes("RGB", (pix.width, pix.height), pix.samples).save(
+                    target
+                )
+        return list(targets)
+
+
+class PyPDF2Backend(PdfBackend):
+    name = "pypdf2"
+
+    def _load(self, path):
+        from PyPDF2 import PdfReader
+
+        return PdfReader(path)
+
+    def page_count(self, path):
+        return len(self.open(path).pages)
+
+    def page_texts(self, path, pages):
+        reader = self.open(path)
+        return [reader.pages[index].extract_text() or "" for index in pages]
+
+    def write_pages(self, output, pages):
+        from PyPDF2 import PdfReader, PdfWriter
+
+        writer = PdfWriter()
+        readers = {}
+        for path, index in pages:
+            if path not in readers:
+                readers[path] = PdfReader(path)
+            writer.add_page(readers[path].pages[index])
+        with open(output, "wb") as f:
+            writer.write(f)
+        return os.fspath(output)
+
+    def rasterize(self, path, pages=None, dpi=DEFAULT_DPI):
+        from pdf2image import convert_from_path
+
+        path = os.fspath(path)
+        if pages is None:
+            # A few pages per poppler call keeps memory flat without paying
+            # a process launch per page
+            total = self.page_count(path)
+            for first in range(1, total + 1, _RASTER_BATCH):
+                last = min(first + _RASTER_BATCH - 1, total)
+                yield from convert_from_path(
+                    path, dpi=dpi, first_page=first, last_page=last
+                )
+            return
+        for index in pages:
+            # pdf2image pages are 1-based
+            yield from convert_from_path(
+                path, dpi=dpi, first_page=index + 1, last_page=index + 1
+            )
+
+    def save_pages(self, path, pages, targets, dpi=DEFAULT_DPI):
+        import tempfile
+
+        from pdf2image import convert_from_path
+
+        path = os.fspath(path)
+        pages, targets = list(pages), list(targets)
+        saved = []
+        # pdftoppm writes the files itself, consecutive pages in one call
+        start = 0
+        while start < len(pages):
+            end = start + 1
+            while end < len(pages) and pages[end] == pages[end - 1] + 1:
+                end += 1
+            ext = _extension(targets[start])
+            if ext not in _POPPLER_FORMATS:
+                images = self.rasterize(path, pages[start:end], dpi)
+                for image, target in zip(images, targets[start:end]):
+                    image.save(target)
+                    saved.append(target)
+                start = end
+                continue
+            outdir = os.path.dirname(os.path.abspath(targets[start]))
+            with tempfile.TemporaryDirectory(dir=outdir) as tmp:
+                rendered = convert_from_path(
+                    path,
+                    dpi=dpi,
+                    first_page=pages[start] + 1,
+                    last_page=pages[end - 1] + 1,
+                    output_folder=tmp,
+                    paths_only=True,
+                    fmt="jpeg" if ext in ("jpg", "jpeg") else ext,
+                )
+                for source, target in zip(sorted(rendered), targets[start:end]):
+                    os.replace(source, target)
+                    saved.append(target)
+            start = end
+        return saved
+
+
+BACKENDS = {backend.name: backend for backend in (PyMuPDFBackend, PyPDF2Backend)}
+
+_instances = {}
+
+
+def backend_name(name: Optional[str] = None) -> str:
+    """Resolve `name` (default: the configured backend) to an available one."""
+    name = (name or os.environ.get("FILEMAC_PDF_BACKEND") or PDF_BACKEND).lower()
+    if name not in ("auto", *BACKENDS):
+        raise ValueError(f"Unknown pdf backend {name!r}")
+    if name in ("auto", "pymupdf"):
+        try:
+            _pymupdf()
+            return "pymupdf"
+        except ImportError:
+            if name == "pymupdf":
+                logger.warning("PyMuPDF is not installed, using PyPDF2")
+    return "pypdf2"
+
+
+def get_backend(name: Optional[str] = None) -> PdfBackend:
+    """The backend instance for `name`, shared within the process."""
+    name = backend_name(name)
+    if name not in _instances:
+        _instances[name] = BACKENDS[name]()
+    return _instances[name]
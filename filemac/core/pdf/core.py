@@ -1,17 +1,18 @@
 import os
-import subprocess
 import sys
 
-import PyPDF2
-from pdf2image import convert_from_path
-from PIL import Image  # ImageSequence
 from tqdm.auto import tqdm
 from ...utils.simple import logger
 from ..document import DocConverter
 from ..exceptions import FilemacError, FileSystemError
+from ...utils import office
 from ...utils.colors import fg, bg, rs
+from ...utils.discovery import discover
+from ...utils.profiler import span, timed
 from ..ocr import ExtractText
-
+from .backend import get_backend
+from .longimage import write_long_image
+from .text import iter_pages
 
 RESET = rs
 DEFAULT_SEPARATOR = "\n"
@@ -22,12 +23,12 @@ class PDF2LongImageConverter:
         self.document = doc
 
     def preprocess(self):
-        ext = self.doc.split(".")[-1].lower()
+        ext = self.document.split(".")[-1].lower()
         if ext == "pdf":
-            long_image = self.convert(self.doc)
+            long_image = self.convert(self.document)
             return long_image
         if ext == "doc" or ext == "docx":
-            conv = DocConverter(self.doc)
+            conv = DocConverter(self.document)
 
             path = conv.word_to_pdf()
             long_image = self.convert(path)
@@ -38,47 +39,28 @@ class PDF2LongImageConverter:
     def subprocess_executor(self):
         # pdf_file = ext = doc.split('.')[0] + 'docx'
         logger.info(f"{fg.DCYAN}Invoked soffice ..{RESET}")
-        subprocess.call(
-            [
-                "soffice",
-                "--convert-to",
-                "pdf",
-                self.document,
-                "--outdir",
-                os.path.dirname(self.document),
-            ]
-        )
-        pdf_file = os.path.abspath(
-            os.path.dirname(self.document)
-            + "/"
-            + (self.document.split("/")[-1].split(".")[0])
-            + ".pdf"
-        )
+        with span("longimage.soffice", file=self.document):
+            pdf_file = office.convert(self.document, "pdf")
         long_image = self.convert(pdf_file)
         return long_image
 
     @staticmethod
+    @timed("longimage.convert")
     def convert(pdf_file):
+        """
+        Render the pdf as one long png, split into numbered segments past
+        `--max-height`, see core/pdf/longimage.py.
+
+        Returns:
+            The image paths.
+        """
         try:
             logger.info(f"{fg.BYELLOW}Read pdf{RESET}")
-            images = convert_from_path(pdf_file)
-            out_img = pdf_file[:-4] + ".png"
-            heights = [img.size[1] for img in images]
-            total_height = sum(heights)
-            max_width = max([img.size[0] for img in images])
-
-            logger.info(f"{fg.DCYAN}Draw image ..{RESET}")
-            new_im = Image.new("RGB", (max_width, total_height))
-
-            y_offset = 0
-            for i, img in enumerate(images):
-                logger.info(f"{fg.BBLUE}{i}{RESET}", end="\r")
-                new_im.paste(img, (0, y_offset))
-                y_offset += img.size[1]
-            logger.info(f"{fg.BYELLOW}Save dest: {fg.BMAGENTA}{out_img}{RESET}")
-            new_im.save(out_img)
+            images = write_long_image(pdf_file, os.path.splitext(pdf_file)[0])
+            for image in images:
+                logger.info(f"{fg.BYELLOW}Save dest: {fg.BMAGENTA}{image}{RESET}")
             logger.info(f"{fg.BGREEN}Success😇✅{RESET}")
-            return out_img
+            return images
         except FileNotFoundError:
             raise FileSystemError(f"{fg.RED}File not found!{RESET}")
         except KeyboardInterrupt:
@@ -124,23 +106,17 @@ class PageExtractor:
         if self.stop (Ulimit) == -1 all pages are extracted from the Llimit to the last Page
         """
         try:
-            reader = PyPDF2.PdfReader(self.pdf)
-
+            backend = get_backend()
             if self.stop == -1:
-                self.stop = len(reader.pages)
-
-            pdf_writer = PyPDF2.PdfWriter()
-            print(f"{fg.BBLUE}[🤖]{fg.BBLUE} Extracting:{RESET}")
-            for page_num in range(self.start, self.stop):
-                print(
-                    f"{fg.BBLUE}[📄]{RESET}{fg.DCYAN}Page {page_num + 1}{RESET}"
-                )
-                page = reader.pages[page_num]
-                pdf_writer.add_page(page)
+                self.stop = backend.page_count(self.pdf)
 
-            # Write the merged PDF to the output file
-            with open(self.outf, "wb") as out_file:
-                pdf_writer.write(out_file)
+            print(
+                f"{fg.BBLUE}[🤖]{fg.BBLUE} Extracting:{RESET}{fg.DCYAN} pages {self.start + 1}-{self.stop}{RESET}"
+            )
+            # Write the extracted pages to the output file
+            backend.write_pages(
+                self.outf, [(self.pdf, page) for page in range(self.start, self.stop)]
+            )
             print(
                 f"{fg.BBLUE}[+]{RESET} {fg.BWHITE}File {fg.BMAGENTA}{self.outf}{RESET}"
             )
@@ -206,28 +182,19 @@ class PDFCombine:
 
     def combine_pdfs_ABA_interleave(self):
         try:
-            pdf_writer = PyPDF2.PdfWriter()
-            # Create PdfReader objects for each input PDF file
-            pdf_readers = [PyPDF2.PdfReader(file) for file in self.obj1]
-
-            max_pages = max(len(reader.pages) for reader in pdf_readers)
-            # pdf_readers = [PyPDF2.PdfReader(pdf) for pdf in pdf_files]
-
-            for page_num in range(max_pages):
-                for reader in pdf_readers:
-                    if page_num < len(reader.pages):
-                        print(
-                            f"{fg.CYAN}Page {fg.BBLUE}{page_num + 1}/{len(reader.pages)}{RESET}",
-                            end="\r",
-                        )
-                        # Order pages in terms of page1-pd1, page2-pd2
-                        page = reader.pages[page_num]
-                        pdf_writer.add_page(page)
-
-            with open(self.outf, "wb") as self.outf:
-                pdf_writer.write(self.outf)
+            backend = get_backend()
+            counts = {file: backend.page_count(file) for file in self.obj1}
+
+            # Order pages in terms of page1-pd1, page2-pd2
+            pages = [
+                (file, page_num)
+                for page_num in range(max(counts.values()))
+                for file in self.obj1
+                if page_num < counts[file]
+            ]
+            backend.write_pages(self.outf, pages)
             print(
-                f"\n{fg.FCYAN}PDFs combined with specified page order into{RESET}{fg.BBLUE} {self.outf.name}{RESET}"
+                f"\n{fg.FCYAN}PDFs combined with specified page order into{RESET}{fg.BBLUE} {self.outf}{RESET}"
             )
         except KeyboardInterrupt:
             print("\nQuit!")
@@ -237,28 +204,16 @@ class PDFCombine:
 
     def combine_pdfs_AAB_order(self):
         try:
-            pdf_writer = PyPDF2.PdfWriter()
-            reader1 = PyPDF2.PdfReader(self.obj1)
-            reader2 = PyPDF2.PdfReader(self.obj2)
-            # pdf_readers = [PyPDF2.PdfReader(pdf) for pdf in pdf_files]
-
-            print(f"{fg.CYAN}File A{RESET}")
-            for p1_num in range(len(reader1.pages)):
-                print(f"Page {p1_num + 1}/{len(reader1.pages)}", end="\r")
-                p1 = reader1.pages[p1_num]
-                # Order pages in terms of page1-pd1, page2-pd2
-                pdf_writer.add_page(p1)
-
-            print(f"\n{fg.CYAN}File B{RESET}")
-            for p2_num in range(len(reader2.pages)):
-                print(f"Page {p2_num + 1}/{len(reader2.pages)}", end="\r")
-                p2 = reader2.pages[p2_num]
-                pdf_writer.add_page(p2)
-
-            with open(self.outf, "wb") as self.outf:
-                pdf_writer.write(self.outf)
+            backend = get_backend()
+            # All pages of file A followed by all pages of file B
+            pages = [
+                (file, page_num)
+                for file in (self.obj1, self.obj2)
+                for page_num in range(backend.page_count(file))
+            ]
+            backend.write_pages(self.outf, pages)
             print(
-                f"\n{fg.FCYAN}PDFs combined with specified page order into{RESET}{fg.BBLUE} {self.outf.name}{RESET}"
+                f"\n{fg.FCYAN}PDFs combined with specified page order into{RESET}{fg.BBLUE} {self.outf}{RESET}"
             )
         except KeyboardInterrupt:
             print("\nQuit!")
@@ -268,25 +223,14 @@ class PDFCombine:
 
     def merge_All_AAB(self):
         try:
-            pdf_writer = PyPDF2.PdfWriter()
-
-            # List to store the reader objects
-            pdf_readers = [PyPDF2.PdfReader(file) for file in self.obj1]
-
-            # max_pages = max(len(reader.pages) for reader in pdf_readers)
-
-            for reader in pdf_readers:
-                for page_num in range(len(reader.pages)):
-                    print(
-                        f"{fg.BWHITE}Page {fg.CYAN}{page_num + 1}/{len(reader.pages)}{RESET}",
-                        end="\r",
-                    )
-                    page = reader.pages[page_num]
-                    pdf_writer.add_page(page)
-
+            backend = get_backend()
+            pages = [
+                (file, page_num)
+                for file in self.obj1
+                for page_num in range(backend.page_count(file))
+            ]
             # Write the merged PDF to the output file
-            with open(self.outf, "wb") as out_file:
-                pdf_writer.write(out_file)
+            backend.write_pages(self.outf, pages)
             print(
                 f"\n{fg.FCYAN}PDFs combined with specified page order into{RESET}{fg.BBLUE} {self.outf}{RESET}"
             )
@@ -310,47 +254,23 @@ class Scanner:
         self.input_file = input_file
         self.sep = sep
 
-    def preprocess(self):
-        files_to_process = []
-
-        if os.path.isfile(self.input_file):
-            files_to_process.append(self.input_file)
-        elif os.path.isdir(self.input_file):
-            for file in os.listdir(self.input_file):
-                file_path = os.path.join(self.input_file, file)
-                if os.path.isfile(file_path):
-                    files_to_process.append(file_path)
-
-        return files_to_process
+    def preprocess(self, extensions=None):
+        return discover(self.input_file, extensions=extensions)
 
     def scanPDF(self, obj=None):
         """Obj - object for scanning where the object is not a list"""
-        pdf_list = self.preprocess()
-        pdf_list = [item for item in pdf_list if item.lower().endswith("pdf")]
-        if obj:
-            pdf_list = [obj]
+        pdf_list = [obj] if obj else self.preprocess(("pdf",))
 
         for pdf in pdf_list:
             out_f = pdf[:-3] + "txt"
             print(f"{fg.YELLOW}Read pdf ..{RESET}")
 
-            with open(pdf, "rb") as f:
-                reader = PyPDF2.PdfReader(f)
-                text = ""
-
-                pg = 0
-                for page_num in range(len(reader.pages)):
-                    pg += 1
-
-                    print(f"{fg.BYELLOW}Progress:{RESET}", end="")
-                    print(f"{fg.CYAN}{pg}/{len(reader.pages)}{RESET}", end="\r")
-                    page = reader.pages[page_num]
-                    text += page.extract_text()
-
-            print(f"\n{text}")
             print(f"\n{fg.YELLOW}Write text to {fg.GREEN}{out_f}{RESET}")
-            with open(out_f, "w") as f:
-                f.write(text)
+            # Pages are shown and written as they are extracted
+            with open(out_f, "w", encoding="utf-8") as f:
+                for text in iter_pages(pdf, progress=False):
+                    print(text)
+                    f.write(text)
 
             print(f"\n{fg.BGREEN}Ok{RESET}")
 
@@ -397,19 +317,17 @@ class Scanner:
         """Convert the pdf to long image for scanning - text extraction"""
 
         try:
-            pdf_list = self.preprocess()
-            pdf_list = [item for item in pdf_list if item.lower().endswith("pdf")]
+            pdf_list = self.preprocess(("pdf",))
             from ..pdf.core import PDF2LongImageConverter
 
             for file in pdf_list:
                 converter = PDF2LongImageConverter(file)
-                file = converter.preprocess()
-
-                tx = ExtractText(file, self.sep)
-                text = tx.OCR()
-                if text is not None:
-                    # print(text)
-                    print(f"{fg.GREEN}Ok{RESET}")
+                for image in converter.preprocess():
+                    tx = ExtractText(image, self.sep)
+                    text = tx.OCR()
+                    if text is not None:
+                        # print(text)
+                        print(f"{fg.GREEN}Ok{RESET}")
             return True
         except Exception as e:
             print(e)
@@ -0,0 +1,214 @@
+"""
+Streaming long image writer.
+
+Used by doc to long image. Pages are rendered one at a time and their
+scanlines appended to a png as they come, so memory stays at about one page
+however long the document is; stitching every page onto one canvas held the
+whole document twice and ran into Pillow's decompression bomb limit.
+
+The image is split into numbered segments at page boundaries: a segment ends
+before a page that would take it past the maximum height (`--max-height`,
+FILEMAC_MAX_HEIGHT) or that is wider than its first page. A single page
+taller than the maximum is cut across segments. By default segments stay
+within Pillow's pixel limit, so they open and OCR like any image:
+
+    write_long_image("book.pdf", "book")   # book.png, or book_long_1.png, ...
+
+Segments are written to `.part` files and renamed once the last page is in,
+so a failed run leaves nothing behind and never touches the pages of doc to
+image (`book_1.png`, ...).
+"""
+
+import os
+import struct
+import zlib
+from typing import IO, List, Optional
+
+from ...utils.executor import item_progress
+from ...utils.profiler import span
+from .backend import get_backend
+from .raster import get_dpi
+from .text import get_pages, parse_pages
+
+# Heights accepted by --max-height, the upper bound is the png limit
+MIN_HEIGHT, MAX_HEIGHT = 100, 2**31 - 1
+# Pixels of a segment when no maximum height is set, Pillow's own limit
+DEFAULT_MAX_PIXELS = 89_478_485
+# zlib level of the scanlines, rendered pages are mostly blank
+COMPRESSION = 6
+
+_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+_WHITE = b"\xff"
+
+
+def set_max_height(height: Optional[int]) -> None:
+    """Set the global segment height, inherited by worker processes."""
+    if height is None:
+        os.environ.pop("FILEMAC_MAX_HEIGHT", None)
+    elif not MIN_HEIGHT <= height <= MAX_HEIGHT:
+        raise ValueError(f"max height must be between {MIN_HEIGHT} and {MAX_HEIGHT}")
+    else:
+        os.environ["FILEMAC_MAX_HEIGHT"] = str(height)
+
+
+def get_max_height() -> Optional[int]:
+    """The global segment height, None to fit Pillow's pixel limit."""
+    height = os.environ.get("FILEMAC_MAX_HEIGHT")
+    return int(height) if height else None
+
+
+def _chunk(kind: bytes, data: bytes = b"") -> bytes:
+    crc = zlib.crc32(data, zlib.crc32(kind))
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", crc)
+
+
+def _ihdr(width: int, height: int) -> bytes:
+    # 8 bit RGB, deflate, adaptive filtering, not interlaced
+    return _chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+
+
+class _Segment:
+    """A png written row by row, its height filled in when it is closed."""
+
+    def __init__(self, path: str, width: int):
+        self.path = path
+        # Renamed to `path` when the whole image is written
+        self.part = path + ".part"
+        self.width = width
+        self.height = 0
+        self.f: IO[bytes] = open(self.part, "wb")
+        self.f.write(_SIGNATURE)
+        self.f.write(_ihdr(width, 0))
+        self.compressor = zlib.compressobj(COMPRESSION)
+
+    def write(self, rows: memoryview, width: int) -> None:
+        """Append RGB `rows` `width` pixels wide, padded with white."""
+        stride = width * 3
+        count = len(rows) // stride
+        # Filter type 0 ahead of every row, none of them is filtered
+        white = _WHITE * ((self.width - width) * 3)
+        data = (white + b"\x00").join(
+            rows[i : i + stride] for i in range(0, count * stride, stride)
+        )
+        for part in (b"\x00", data, white):
+            self._idat(self.compressor.compress(part))
+        self.height += count
+
+    def _idat(self, data: bytes) -> None:
+        if data:
+            self.f.write(_chunk(b"IDAT", data))
+
+    def close(self) -> None:
+        self._idat(self.compressor.flush())
+        self.f.write(_chunk(b"IEND"))
+        self.f.seek(len(_SIGNATURE))
+        self.f.write(_ihdr(self.width, self.height))
+        self.f.close()
+
+
+class _LongImage:
+    """The segments of one long image, pages are added in order."""
+
+    def __init__(self, stem: str, max_height: Optional[int]):
+        self.stem = stem
+        self.max_height = max_height
+        self.segments: List[_Segment] = []
+        # Rows of the current segment
+        self.limit = 0
+
+    def _start(self, width: int) -> _Segment:
+        if self.segments:
+            self.segments[-1].close()
+        segment = _Segment(f"{self.stem}_long_{len(self.segments) + 1}.png", width)
+        self.segments.append(segment)
+        self.limit = self.max_height or max(1, DEFAULT_MAX_PIXELS // width)
+        return segment
+
+    def add(self, image) -> None:
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        width, height = image.size
+        stride = width * 3
+        rows = memoryview(image.tobytes())
+        segment = self.segments[-1] if self.segments else None
+        # Whole pages move on to a new segment when they do not fit
+        if (
+            segment is None
+            or width > segment.width
+            or (segment.height and segment.height + height > self.limit)
+        ):
+            segment = self._start(width)
+        row = 0
+        while row < height:
+            # Only a page taller than a segment is cut where it is full
+            if segment.height >= self.limit:
+                segment = self._start(width)
+            count = min(height - row, self.limit - segment.height)
+            segment.write(rows[row * stride : (row + count) * stride], width)
+            row += count
+
+    def close(self) -> List[str]:
+        if self.segments:
+            self.segments[-1].close()
+        if len(self.segments) == 1:
+            self.segments[0].path = f"{self.stem}.png"
+        for segment in self.segments:
+            os.replace(segment.part, segment.path)
+        return [segment.path for segment in self.segments]
+
+    def discard(self) -> None:
+        for segment in self.segments:
+            segment.f.close()
+            if os.path.exists(segment.part):
+                os.remove(segment.part)
+
+
+def write_long_image(
+    path: os.PathLike,
+    stem: str,
+    max_height: Optional[int] = None,
+    pages: Optional[str] = None,
+    dpi: Optional[int] = None,
+    progress: bool = True,
+) -> List[str]:
+    """
+    Render the selected pages of `path` one below the other.
+
+    Args:
+        path: the pdf file.
+        stem: output path without the segment number and extension.
+        max_height: segment height in pixels, defaults to the global
+            `--max-height`, then to Pillow's pixel limit.
+        pages: page selection, defaults to the global `--pages`.
+        dpi: resolution, defaults to the global `--dpi`.
+        progress: show a page progress bar.
+
+    Returns:
+        `<stem>.png`, or `<stem>_long_1.png`, `<stem>_long_2.png`, ... when
+        the image took several segments.
+    """
+    path = os.fspath(path)
+    max_height = get_max_height() if max_height is None else max_height
+    pages = get_pages() if pages is None else pages
+    dpi = get_dpi() if dpi is None else dpi
+    backend = get_backend()
+    indexes = parse_pages(pages, backend.page_count(path))
+
+    image = _LongImage(stem, max_height)
+    desc = f"Long image of {os.path.basename(path)}"
+    try:
+        with item_progress(desc, len(indexes), enabled=progress) as advance:
+            # Every page in one go lets a backend batch the rendering
+            selection = indexes if pages else None
+            for page in backend.rasterize(path, selection, dpi):
+                with span("longimage.encode", rows=page.size[1]):
+                    image.add(page)
+                # Not held while the next page renders
+                del page
+                advance()
+        return image.close()
+    except BaseException:
+        image.discard()
+        raise
+    finally:
+        backend.release()
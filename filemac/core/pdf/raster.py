@@ -0,0 +1,112 @@
+"""
+Page-windowed pdf rasterization.
+
+Used by doc to image. The selected pages are split into windows rendered by
+worker processes, each page is written to disk as soon as it is rendered, so
+memory stays bounded by the windows in flight rather than the page count.
+Only the image paths travel back to the parent.
+
+The resolution comes from `--dpi` (FILEMAC_DPI), the page selection from
+`--pages` as for text extraction:
+
+    render("book.pdf", "book", "png")   # book_1.png, book_2.png, ...
+"""
+
+import os
+from typing import Iterator, List, Optional, Tuple
+
+from ...utils.executor import fan_out_jobs, item_progress, ordered_map
+from ...utils.profiler import span
+from .backend import DEFAULT_DPI, get_backend
+from .text import get_pages, parse_pages
+
+# Pages rendered per worker task
+PAGES_PER_WINDOW = 8
+# Documents shorter than this are rendered inline unless --jobs is given
+PARALLEL_MIN_PAGES = 16
+# Resolutions accepted by --dpi
+MIN_DPI, MAX_DPI = 10, 2400
+
+
+def set_dpi(dpi: Optional[int]) -> None:
+    """Set the global rendering resolution, inherited by worker processes."""
+    if dpi is None:
+        os.environ.pop("FILEMAC_DPI", None)
+    elif not MIN_DPI <= dpi <= MAX_DPI:
+        raise ValueError(f"dpi must be between {MIN_DPI} and {MAX_DPI}")
+    else:
+        os.environ["FILEMAC_DPI"] = str(dpi)
+
+
+def get_dpi() -> int:
+    """The global rendering resolution."""
+    dpi = os.environ.get("FILEMAC_DPI")
+    return int(dpi) if dpi else DEFAULT_DPI
+
+
+def _render_window(job: Tuple[str, str, List[int], List[str], int]) -> List[str]:
+    """Render some pages of one pdf to their files, runs in a worker process."""
+    backend, path, pages, targets, dpi = job
+    with span("pdf.raster", pages=f"{pages[0] + 1}-{pages[-1] + 1}"):
+        return get_backend(backend).save_pages(path, pages, targets, dpi)
+
+
+def iter_render(
+    path: os.PathLike,
+    stem: str,
+    fmt: str = "png",
+    pages: Optional[str] = None,
+    dpi: Optional[int] = None,
+    jobs: Optional[int] = None,
+    progress: bool = True,
+) -> Iterator[str]:
+    """
+    Render the selected pages of `path` to `<stem>_<page>.<fmt>` and yield
+    the image paths in page order as they are written.
+
+    Args:
+        path: the pdf file.
+        stem: output path without the page number and extension.
+        fmt: image format, `png` or `jpg`.
+        pages: page selection such as `1-20,40-`, defaults to the global
+            `--pages` selection, every page when neither is set.
+        dpi: resolution, defaults to the global `--dpi`.
+        jobs: worker processes, chosen from `--jobs` and the page count
+            when None.
+        progress: show a page progress bar.
+    """
+    path = os.fspath(path)
+    pages = get_pages() if pages is None else pages
+    dpi = get_dpi() if dpi is None else dpi
+    backend = get_backend()
+    indexes = parse_pages(pages, backend.page_count(path))
+    windows = [
+        (
+            backend.name,
+            path,
+            window,
+            [f"{stem}_{index + 1}.{fmt}" for index in window],
+            dpi,
+        )
+        for window in (
+            indexes[i : i + PAGES_PER_WINDOW]
+            for i in range(0, len(indexes), PAGES_PER_WINDOW)
+        )
+    ]
+    if jobs is None:
+        jobs = fan_out_jobs(len(indexes), PARALLEL_MIN_PAGES)
+    jobs = min(jobs, len(windows))
+
+    desc = f"Pages ({max(jobs, 1)} jobs)"
+    with item_progress(desc, len(indexes), enabled=progress) as advance:
+        try:
+            for paths in ordered_map(_render_window, windows, jobs):
+                yield from paths
+                advance(len(paths))
+        finally:
+            backend.release()
+
+
+def render(path: os.PathLike, stem: str, fmt: str = "png", **kwargs) -> List[str]:
+    """Render a pdf to images, see `iter_render` for the arguments."""
+    return list(iter_render(path, stem, fmt, **kwargs))
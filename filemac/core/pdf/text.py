@@ -0,0 +1,149 @@
+"""
+Page-parallel pdf text extraction.
+
+Shared by pdf to text, pdf scanning and text to speech. Pages are split into
+chunks extracted by worker processes and handed back in page order, so the
+output file is written as the extraction progresses and memory stays bounded
+by the chunks in flight rather than the size of the document.
+
+A page selection like `1-20,40-` (`--pages`) restricts the extraction:
+
+    >>> parse_pages("1-3,8-", 10)
+    [0, 1, 2, 7, 8, 9]
+"""
+
+import os
+import re
+from typing import Iterator, List, Optional, Tuple
+
+from ...utils.executor import fan_out_jobs, item_progress, ordered_map
+from ...utils.profiler import span
+from .backend import get_backend
+
+# Pages extracted per worker task
+PAGES_PER_CHUNK = 16
+# Documents shorter than this are extracted inline unless --jobs is given
+PARALLEL_MIN_PAGES = 64
+
+_RANGE = re.compile(r"^(\d*)\s*(-?)\s*(\d*)$")
+
+
+def set_pages(spec: Optional[str]) -> None:
+    """Set the global page selection, inherited by worker processes."""
+    if spec is None:
+        os.environ.pop("FILEMAC_PAGES", None)
+        return
+    _parse_spec(spec)
+    os.environ["FILEMAC_PAGES"] = spec
+
+
+def get_pages() -> Optional[str]:
+    """The global page selection, None for every page."""
+    return os.environ.get("FILEMAC_PAGES") or None
+
+
+def _parse_spec(spec: str) -> List[Tuple[int, Optional[int]]]:
+    """Parse `1-20,40-` into 1-based (first, last) pairs, last None = to the end."""
+    ranges = []
+    for part in spec.split(","):
+        match = _RANGE.match(part.strip())
+        if not part.strip() or not match or not (match.group(1) or match.group(3)):
+            raise ValueError(f"Invalid page range {part!r} in {spec!r}")
+        first, dash, last = match.groups()
+        first = int(first) if first else 1
+        if not dash:
+            last = first
+        else:
+            last = int(last) if last else None
+        if first < 1 or (last is not None and last < first):
+            raise ValueError(f"Invalid page range {part!r} in {spec!r}")
+        ranges.append((first, last))
+    return ranges
+
+
+def parse_pages(spec: Optional[str], total: int) -> List[int]:
+    """0-based indexes of the selected pages of a `total` page document."""
+    if not spec:
+        return list(range(total))
+    selected = set()
+    for first, last in _parse_spec(spec):
+        last = total if last is None else min(last, total)
+        selected.update(range(first - 1, last))
+    return sorted(selected)
+
+
+def _extract_chunk(job: Tuple[str, str, List[int]]) -> List[str]:
+    """Text of some pages of one pdf, runs in a worker process."""
+    backend, path, pages = job
+    with span("pdf.extract", pages=f"{pages[0] + 1}-{pages[-1] + 1}"):
+        return get_backend(backend).page_texts(path, pages)
+
+
+def iter_pages(
+    path: os.PathLike,
+    pages: Optional[str] = None,
+    jobs: Optional[int] = None,
+    progress: bool = True,
+) -> Iterator[str]:
+    """
+    Yield the text of the selected pages of `path` in page order.
+
+    Args:
+        path: the pdf file.
+        pages: page selection such as `1-20,40-`, defaults to the global
+            `--pages` selection, every page when neither is set.
+        jobs: worker processes, chosen from `--jobs` and the page count
+            when None.
+        progress: show a page progress bar.
+    """
+    path = os.fspath(path)
+    pages = get_pages() if pages is None else pages
+    backend = get_backend()
+    indexes = parse_pages(pages, backend.page_count(path))
+    chunks = [
+        (backend.name, path, indexes[i : i + PAGES_PER_CHUNK])
+        for i in range(0, len(indexes), PAGES_PER_CHUNK)
+    ]
+    if jobs is None:
+        jobs = fan_out_jobs(len(indexes), PARALLEL_MIN_PAGES)
+    jobs = min(jobs, len(chunks))
+
+    desc = f"Pages ({jobs} jobs)"
+    with item_progress(desc, len(indexes), enabled=progress) as advance:
+        try:
+            for texts in ordered_map(_extract_chunk, chunks, jobs):
+                yield from texts
+                advance(len(texts))
+        finally:
+            backend.release()
+
+
+def extract_text(
+    path: os.PathLike,
+    output: Optional[os.PathLike] = None,
+    pages: Optional[str] = None,
+    jobs: Optional[int] = None,
+    progress: bool = True,
+):
+    """
+    Extract the text of a pdf, see `iter_pages` for the arguments.
+
+    Returns:
+        The text, or with `output` the path of the file it was streamed to.
+        The file is only replaced once the extraction succeeded.
+    """
+    if output is None:
+        return "".join(iter_pages(path, pages, jobs, progress))
+
+    output = os.fspath(output)
+    partial = f"{output}.part"
+    try:
+        with open(partial, "w", encoding="utf-8") as f, span("doc.write"):
+            for text in iter_pages(path, pages, jobs, progress):
+                f.write(text)
+        os.replace(partial, output)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    return output
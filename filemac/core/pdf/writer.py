@@ -0,0 +1,210 @@
+"""
+Streaming text to pdf writer.
+
+Used by text to pdf. Lines are laid out in a monospace font, wrapped at the
+page width, and every page is compressed and written to the file as soon as
+it is full: only the byte offsets of the written objects are kept, so memory
+stays flat however large the text is. reportlab's canvas would hold every page
+until the document is saved.
+
+The pdf uses the standard Courier font, which needs no embedding; characters
+outside Windows-1252 come out as `?`:
+
+    write_text("server.log", "server.pdf")
+"""
+
+import io
+import os
+import zlib
+from typing import IO, Iterable, Iterator, List, Optional, Union
+
+from ...utils.executor import counted, item_progress
+from ...utils.profiler import span
+
+# Letter, in points
+PAGE_WIDTH, PAGE_HEIGHT = 612, 792
+MARGIN = 72
+FONT_SIZE = 10
+LEADING = 12
+# Courier glyphs are all 600/1000 of the font size wide
+COLUMNS = int((PAGE_WIDTH - 2 * MARGIN) // (FONT_SIZE * 0.6))
+LINES_PER_PAGE = int((PAGE_HEIGHT - 2 * MARGIN) // LEADING)
+TAB_SIZE = 8
+# zlib level of the page streams, 3 is twice as fast as the default and
+# only a few percent larger on text
+COMPRESSION = 3
+
+# Object numbers fixed ahead of the pages
+_CATALOG, _PAGES, _FONT = 1, 2, 3
+# Control characters a text object cannot show, the line feed separates lines
+_CONTROL = bytes(c for c in range(32) if c != 10)
+
+
+def layout(lines: Iterable[str], columns: int = COLUMNS) -> Iterator[str]:
+    """Yield `lines` as printed: tabs expanded, wrapped at `columns`."""
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if "\t" in line:
+            line = line.expandtabs(TAB_SIZE)
+        # Break at the last space that fits, mid-word when there is none;
+        # textwrap is several times slower on long lines
+        while len(line) > columns:
+            cut = line.rfind(" ", 0, columns + 1)
+            if cut <= 0:
+                yield line[:columns]
+                line = line[columns:]
+            else:
+                yield line[:cut]
+                line = line[cut + 1 :]
+        yield line
+
+
+class _PdfFile:
+    """Numbered pdf objects written in sequence, with their offsets for xref."""
+
+    def __init__(self, f: IO[bytes]):
+        self.f = f
+        self.position = 0
+        # Offsets by object number - 1, None until written
+        self.offsets: List[Optional[int]] = []
+
+    def write(self, data: bytes) -> None:
+        self.f.write(data)
+        self.position += len(data)
+
+    def reserve(self) -> int:
+        self.offsets.append(None)
+        return len(self.offsets)
+
+    def put(self, number: int, body: bytes, stream: Optional[bytes] = None) -> None:
+        self.offsets[number - 1] = self.position
+        self.write(b"%d 0 obj\n" % number)
+        self.write(body)
+        if stream is not None:
+            self.write(b"\nstream\n")
+            self.write(stream)
+            self.write(b"\nendstream")
+        self.write(b"\nendobj\n")
+
+    def close(self) -> None:
+        xref = self.position
+        self.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(self.offsets) + 1))
+        self.write(b"".join(b"%010d 00000 n \n" % offset for offset in self.offsets))
+        self.write(
+            b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+            % (len(self.offsets) + 1, _CATALOG, xref)
+        )
+
+
+def _page_stream(lines: List[str]) -> bytes:
+    # `'` moves down one line before showing, start a line above the first
+    top = PAGE_HEIGHT - MARGIN - FONT_SIZE + LEADING
+    # Laid out lines hold no line breaks, encode and escape them in one go
+    text = "\n".join(lines).encode("cp1252", "replace").translate(None, _CONTROL)
+    text = text.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+    text = text.replace(b"\n", b") '\n(")
+    return zlib.compress(
+        b"BT\n/F1 %d Tf\n%d TL\n%d %d Td\n(%s) '\nET\n"
+        % (FONT_SIZE, LEADING, MARGIN, top, text),
+        COMPRESSION,
+    )
+
+
+def _write_pages(lines: Iterable[str], f: IO[bytes]) -> int:
+    pdf = _PdfFile(f)
+    for _ in (_CATALOG, _PAGES, _FONT):
+        pdf.reserve()
+    pdf.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    pdf.put(_CATALOG, b"<< /Type /Catalog /Pages %d 0 R >>" % _PAGES)
+    pdf.put(
+        _FONT,
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier "
+        b"/Encoding /WinAnsiEncoding >>",
+    )
+    page_refs = []
+    page: List[str] = []
+
+    def flush():
+        stream = _page_stream(page)
+        contents = pdf.reserve()
+        pdf.put(
+            contents,
+            b"<< /Length %d /Filter /FlateDecode >>" % len(stream),
+            stream,
+        )
+        number = pdf.reserve()
+        pdf.put(
+            number,
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>"
+            % (_PAGES, PAGE_WIDTH, PAGE_HEIGHT, _FONT, contents),
+        )
+        page_refs.append(b"%d 0 R" % number)
+        page.clear()
+
+    for line in layout(lines):
+        page.append(line)
+        if len(page) == LINES_PER_PAGE:
+            flush()
+    if page or not page_refs:
+        flush()
+
+    pdf.put(
+        _PAGES,
+        b"<< /Type /Pages /Kids [%s] /Count %d >>"
+        % (b" ".join(page_refs), len(page_refs)),
+    )
+    pdf.close()
+    return len(page_refs)
+
+
+def write_lines(lines: Iterable[str], output: Union[os.PathLike, IO[bytes]]) -> int:
+    """
+    Lay `lines` out as a pdf.
+
+    Args:
+        output: pdf path, only replaced once the document is complete, or a
+            binary file object.
+
+    Returns:
+        The number of pages.
+    """
+    if not isinstance(output, (str, os.PathLike)):
+        return _write_pages(lines, output)
+    output = os.fspath(output)
+    partial = f"{output}.part"
+    try:
+        with open(partial, "wb") as f, span("doc.write"):
+            pages = _write_pages(lines, f)
+        os.replace(partial, output)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    return pages
+
+
+def write_text(
+    path: Union[os.PathLike, IO[bytes]],
+    output: Union[os.PathLike, IO[bytes]],
+    progress: bool = True,
+) -> int:
+    """
+    Write the utf-8 text file `path`, or a binary file object, as a pdf.
+
+    Returns:
+        The number of pages, see `write_lines` for `output`.
+    """
+    owned = isinstance(path, (str, os.PathLike))
+    if owned:
+        name, size = os.path.basename(path), os.path.getsize(path)
+        f = open(path, "r", encoding="utf-8", errors="replace")
+    else:
+        name, size = "text", None
+        f = io.TextIOWrapper(path, encoding="utf-8", errors="replace")
+    try:
+        with item_progress(f"Pdf of {name}", size, enabled=progress) as advance:
+            return write_lines(counted(f, advance), output)
+    finally:
+        # The caller's file stays open
+        f.close() if owned else f.detach()
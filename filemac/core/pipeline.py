@@ -0,0 +1,502 @@
+"""
+In-memory conversion pipelines.
+
+The Python face of the document conversions. A `Source` is a document given
+as a path, bytes, a binary file object or an iterable of text chunks, plus its
+format. `to()` chains conversions lazily, nothing is read until the result is
+consumed:
+
+    text = Source("deck.pptx").to("txt").text()
+    Source(data, "docx").to("txt").save("report.txt")
+    for chunk in Source("book.pdf").to("txt", pages="1-10"):
+        ...
+    xlsx = Source("book.xlsx").to("csv", sheet="Q1").to("xlsx").bytes()
+
+Between hops text stays an iterator and binary documents stay in memory, no
+sibling file is written unless `save()` asks for it. Only steps that need a
+real file (LibreOffice, the pdf backends) spill their input to a scratch
+workspace. A text iterator can only be consumed once.
+
+Targets without a direct converter go through intermediate formats, e.g.
+`Source("notes.doc").to("txt")` runs doc -> docx -> txt. The chain is the
+cheapest one `plan()` finds with the measured converter costs, see
+`filemac.core.planner`. `register` adds converters.
+"""
+
+import codecs
+import contextlib
+import io
+import os
+import shutil
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from ..utils.workspace import Workspace
+from .planner import Cost, Plan
+from .planner import plan as _plan
+
+# Formats read and produced as text, utf-8 on disk
+TEXT_FORMATS = {"txt", "csv"}
+# Characters read per chunk from text files
+READ_CHUNK = 1 << 20
+# Spreadsheet rows written per csv chunk
+CSV_CHUNK_ROWS = 5000
+
+_ALIASES = {"text": "txt", "word": "docx", "excel": "xlsx", "audio": "ogg"}
+# Targets a document may be flattened to text for
+FLAT_TARGETS = TEXT_FORMATS | {"ogg"}
+# Starting or reusing a LibreOffice instance dominates small documents
+OFFICE_COST = Cost(3.0, 2.0)
+# One Google TTS request per 1000 characters
+SPEECH_COST = Cost(1.0, 500.0)
+
+
+class Converter(NamedTuple):
+    # text: func(source, **options) yields str chunks
+    # binary: func(source, output, **options) writes a path or binary file
+    func: Callable
+    kind: str
+    # Estimate for edges the benchmark suite does not measure
+    cost: Optional[Cost] = None
+
+
+CONVERTERS: Dict[Tuple[str, str], Converter] = {}
+
+
+def _format(fmt: str) -> str:
+    fmt = fmt.lower().lstrip(".")
+    return _ALIASES.get(fmt, fmt)
+
+
+def register(
+    source: str, target: str, kind: str = "binary", cost: Optional[Cost] = None
+):
+    """
+    Register the decorated function as the `source` to `target` converter.
+
+    Args:
+        cost: estimated cost, used until the benchmark suite measures the edge.
+    """
+    if kind not in ("text", "binary"):
+        raise ValueError(f"Unknown converter kind {kind!r}")
+
+    def decorator(func):
+        CONVERTERS[_format(source), _format(target)] = Converter(func, kind, cost)
+        return func
+
+    return decorator
+
+
+def plan(source: str, target: str, size: int = 0) -> Plan:
+    """
+    The cheapest chain of converters from `source` to `target` for an input
+    of `size` bytes.
+
+    A document is only flattened to text on the way to text or speech,
+    never to reach another document: pdf to docx is slower than pdf to txt
+    to docx but keeps the layout.
+
+    Raises:
+        ValueError: no chain of converters reaches `target`.
+    """
+    source, target = _format(source), _format(target)
+    edges = {
+        (src, dst): converter.cost
+        for (src, dst), converter in CONVERTERS.items()
+        if target in FLAT_TARGETS or dst not in TEXT_FORMATS
+    }
+    return _plan(edges, source, target, size)
+
+
+def route(source: str, target: str, size: int = 0) -> List[str]:
+    """Formats visited by `plan()`, `source` and `target` included."""
+    return plan(source, target, size).formats
+
+
+def _is_path(data) -> bool:
+    return isinstance(data, (str, os.PathLike))
+
+
+def _is_file(data) -> bool:
+    return hasattr(data, "read")
+
+
+def _replace(output: str, write: Callable[[str], None]) -> str:
+    """Run `write(file)` on a temporary file, then move it over `output`."""
+    partial = f"{output}.part"
+    try:
+        write(partial)
+        os.replace(partial, output)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    return output
+
+
+class _ChunkStream(io.RawIOBase):
+    """Binary file encoding text chunks as they are read."""
+
+    def __init__(self, chunks: Iterable[str]):
+        self._chunks = iter(chunks)
+        self._buffer = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while not self._buffer:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self._buffer = chunk.encode("utf-8")
+        n = min(len(b), len(self._buffer))
+        b[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        return n
+
+
+class Source:
+    """
+    A document and its format, the input or result of a conversion.
+
+    Args:
+        data: path, bytes, binary file object or iterable of text chunks.
+            A `str` is always a path, see `from_text` for literal text.
+        fmt: format such as `docx` or `txt`, taken from the extension of a
+            path when not given.
+    """
+
+    def __init__(self, data, fmt: Optional[str] = None):
+        if fmt is None:
+            if not _is_path(data):
+                raise ValueError("The format of data that is not a path is required")
+            fmt = os.path.splitext(os.fspath(data))[1]
+            if not fmt:
+                raise ValueError(f"Cannot tell the format of {data}")
+        self.format = _format(fmt)
+        self._data = os.fspath(data) if _is_path(data) else data
+        # (converter, input Source, options) of a conversion not run yet
+        self._pending = None
+
+    @classmethod
+    def from_text(cls, text: str, fmt: str = "txt") -> "Source":
+        return cls([text], fmt)
+
+    def __repr__(self):
+        if self._pending is not None:
+            return f"Source(<{self._pending[1].format} -> {self.format}>)"
+        data = self._data if _is_path(self._data) else type(self._data).__name__
+        return f"Source({data!r}, {self.format!r})"
+
+    def to(self, fmt: str, **options) -> "Source":
+        """
+        The document converted to `fmt`, computed when it is consumed.
+
+        Args:
+            options: passed to the last converter of the chain, e.g. `pages`
+                for pdf text, `sheet` for spreadsheet csv or `max_rows`.
+        """
+        formats = route(self.format, fmt, self.size())
+        result = self
+        for number, target in enumerate(formats[1:], 2):
+            step = Source(None, target)
+            step._pending = (
+                CONVERTERS[result.format, target],
+                result,
+                options if number == len(formats) else {},
+            )
+            result = step
+        return result
+
+    def size(self) -> int:
+        """Bytes of the original input, 0 when unknown, for planning."""
+        if self._pending is not None:
+            return self._pending[1].size()
+        if _is_path(self._data):
+            return os.path.getsize(self._data)
+        if isinstance(self._data, (bytes, bytearray)):
+            return len(self._data)
+        return 0
+
+    # Consumers
+
+    def chunks(self) -> Iterator[str]:
+        """Yield the text of a text format in chunks."""
+        if self._pending is not None:
+            converter, source, options = self._pending
+            if converter.kind == "text":
+                yield from converter.func(source, **options)
+                return
+            yield self.bytes().decode("utf-8", "replace")
+            return
+        if self.format not in TEXT_FORMATS and (
+            _is_path(self._data) or isinstance(self._data, (bytes, bytearray))
+        ):
+            raise ValueError(f"{self.format} is not text, convert it with to()")
+        data = self._data
+        if _is_path(data):
+            with open(data, "r", encoding="utf-8", errors="replace") as f:
+                yield from iter(lambda: f.read(READ_CHUNK), "")
+        elif isinstance(data, (bytes, bytearray)):
+            yield bytes(data).decode("utf-8", "replace")
+        elif _is_file(data):
+            # Characters may straddle two reads of a binary file
+            decoder = codecs.getincrementaldecoder("utf-8")("replace")
+            while True:
+                chunk = data.read(READ_CHUNK)
+                if not chunk:
+                    break
+                yield chunk if isinstance(chunk, str) else decoder.decode(chunk)
+            yield decoder.decode(b"", final=True)
+        else:
+            yield from data
+
+    __iter__ = chunks
+
+    def lines(self) -> Iterator[str]:
+        """Yield the lines of a text format, without line endings."""
+        pending = ""
+        for chunk in self.chunks():
+            pending += chunk
+            *complete, pending = pending.split("\n")
+            for line in complete:
+                yield line.rstrip("\r")
+        if pending:
+            yield pending
+
+    def text(self) -> str:
+        return "".join(self.chunks())
+
+    def bytes(self) -> bytes:
+        buffer = io.BytesIO()
+        self.write(buffer)
+        return buffer.getvalue()
+
+    def write(self, output) -> None:
+        """Write the document to a binary file object."""
+        if self._pending is not None and self._pending[0].kind == "binary":
+            converter, source, options = self._pending
+            converter.func(source, output, **options)
+        elif self._pending is not None or not (
+            _is_path(self._data)
+            or _is_file(self._data)
+            or isinstance(self._data, (bytes, bytearray))
+        ):
+            for chunk in self.chunks():
+                output.write(chunk.encode("utf-8"))
+        elif _is_path(self._data):
+            with open(self._data, "rb") as f:
+                shutil.copyfileobj(f, output)
+        elif _is_file(self._data):
+            shutil.copyfileobj(self._data, output)
+        else:
+            output.write(self._data)
+
+    def save(self, path: os.PathLike) -> str:
+        """
+        Write the document to `path`, replaced only once it is complete.
+
+        Returns:
+            The path.
+        """
+        path = os.fspath(path)
+        if self._pending is not None and self._pending[0].kind == "binary":
+            # Binary converters write straight to the path
+            converter, source, options = self._pending
+            converter.func(source, path, **options)
+            return path
+
+        def write(partial):
+            with open(partial, "wb") as f:
+                self.write(f)
+
+        return _replace(path, write)
+
+    # Inputs of converters
+
+    def open(self):
+        """The document as a path or a binary file object, for readers taking either."""
+        if self._pending is None:
+            if _is_path(self._data) or _is_file(self._data):
+                return self._data
+            if isinstance(self._data, (bytes, bytearray)):
+                return io.BytesIO(self._data)
+            return io.BufferedReader(_ChunkStream(self._data))
+        if self._pending[0].kind == "text":
+            return io.BufferedReader(_ChunkStream(self.chunks()))
+        # Zip based readers seek, the intermediate is kept in memory
+        return io.BytesIO(self.bytes())
+
+    @contextlib.contextmanager
+    def path(self) -> Iterator[str]:
+        """A file holding the document, spilled to a workspace when needed."""
+        if self._pending is None and _is_path(self._data):
+            yield self._data
+            return
+        with Workspace("pipeline") as ws:
+            path = os.fspath(ws.file(f"input.{self.format}"))
+            self.save(path)
+            yield path
+
+
+def _copy(path: str, output) -> None:
+    """Write the file `path` to a path or binary file object."""
+    if _is_path(output):
+        _replace(os.fspath(output), lambda partial: shutil.copyfile(path, partial))
+    else:
+        with open(path, "rb") as f:
+            shutil.copyfileobj(f, output)
+
+
+# Converters
+
+
+@register("docx", "txt", "text")
+def _docx_to_txt(source: Source) -> Iterator[str]:
+    from .word.text import iter_blocks
+
+    for block in iter_blocks(source.open(), progress=False):
+        yield f"{block}\n"
+
+
+@register("pptx", "txt", "text")
+def _pptx_to_txt(source: Source, jobs: Optional[int] = None) -> Iterator[str]:
+    from .presentation.text import iter_lines
+
+    for line in iter_lines(source.open(), jobs, progress=False):
+        yield f"{line}\n"
+
+
+@register("pdf", "txt", "text")
+def _pdf_to_txt(
+    source: Source, pages: Optional[str] = None, jobs: Optional[int] = None
+):
+    from .pdf.text import iter_pages
+
+    with source.path() as path:
+        yield from iter_pages(path, pages, jobs, progress=False)
+
+
+@register("xlsx", "csv", "text")
+@register("xls", "csv", "text")
+def _sheet_to_csv(source: Source, sheet: Optional[str] = None) -> Iterator[str]:
+    """One sheet as csv, the first one unless `sheet` names another."""
+    import csv
+    from itertools import islice
+
+    from .spreadsheet.reader import open_workbook
+
+    data = source.open()
+    with open_workbook(data) as workbook:
+        name = workbook.sheet_names[0] if sheet is None else sheet
+        if name not in workbook.sheet_names:
+            raise ValueError(
+                f"No sheet {name!r}, the workbook has {workbook.sheet_names}"
+            )
+        rows = next(s for s in workbook.sheets() if s.name == name).rows
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for chunk in iter(lambda: list(islice(rows, CSV_CHUNK_ROWS)), []):
+            writer.writerows(chunk)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+
+@register("csv", "xlsx")
+def _csv_to_xlsx(source: Source, output, max_rows: Optional[int] = None) -> None:
+    from .spreadsheet.writer import write_xlsx
+
+    write_xlsx(source.open(), output, max_rows)
+
+
+@register("pdf", "docx")
+def _pdf_to_docx(source: Source, output) -> None:
+    from pdf2docx import parse
+
+    with source.path() as path, Workspace("pipeline") as ws:
+        docx = os.fspath(ws.file("output.docx"))
+        parse(path, docx)
+        _copy(docx, output)
+
+
+@register("txt", "ogg", cost=SPEECH_COST)
+def _txt_to_speech(source: Source, output) -> None:
+    """Synthesise with Google TTS, which needs the whole text."""
+    from .tts.gtts import GoogleTTS
+
+    text = " ".join(source.lines())
+    if _is_path(output):
+        output = os.fspath(output)
+        GoogleTTS(output).Synthesise(text, output)
+        return
+    with Workspace("pipeline") as ws:
+        speech = os.fspath(ws.file("speech.ogg"))
+        GoogleTTS(speech, resume=False).Synthesise(text, speech)
+        _copy(speech, output)
+
+
+@register("txt", "docx")
+def _txt_to_docx(source: Source, output) -> None:
+    from .word.writer import Run, write_paragraphs
+
+    write_paragraphs(([Run(line)] for line in source.lines()), output)
+
+
+@register("txt", "pdf")
+def _txt_to_pdf(source: Source, output) -> None:
+    from .pdf.writer import write_lines
+
+    write_lines(source.lines(), output)
+
+
+@register("pptx", "docx")
+def _pptx_to_docx(source: Source, output, jobs: Optional[int] = None) -> None:
+    from .presentation.text import write_docx
+
+    write_docx(source.open(), output, jobs, progress=False)
+
+
+def _office(target: str):
+    def convert(source: Source, output) -> None:
+        from ..utils import office
+
+        with source.path() as path, Workspace("pipeline") as ws:
+            _copy(office.convert(path, target, ws.path), output)
+
+    convert.__name__ = f"_office_to_{target}"
+    return convert
+
+
+# Conversions only LibreOffice does
+for _source, _target in (
+    ("doc", "docx"),
+    ("doc", "pdf"),
+    ("docx", "pdf"),
+    ("odt", "docx"),
+    ("odt", "pdf"),
+    ("ppt", "pdf"),
+    ("ppt", "pptx"),
+    ("pptx", "pdf"),
+    ("xls", "pdf"),
+    ("xls", "xlsx"),
+    ("xlsx", "pdf"),
+):
+    register(_source, _target, cost=OFFICE_COST)(_office(_target))
+
+
+def convert(
+    data,
+    target: str,
+    output: Optional[os.PathLike] = None,
+    fmt: Optional[str] = None,
+    **options,
+):
+    """
+    Convert in one call: `convert("deck.pptx", "txt")` returns a Source,
+    with `output` the document is saved and its path returned.
+    """
+    result = Source(data, fmt).to(target, **options)
+    if output is None:
+        return result
+    return result.save(output)
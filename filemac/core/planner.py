@@ -0,0 +1,204 @@
+"""
+Cost based conversion planning.
+
+Every converter is an edge between two formats. An edge costs a fixed time,
+such as starting LibreOffice, plus seconds per MB of input, and `plan()` picks
+the cheapest chain of edges with Dijkstra: a doc reaches text through docx
+rather than a pdf, and a large input prefers edges that are cheap per MB over
+ones that are cheap to start. Each edge also has the ratio of its output size
+to its input size, which sizes the input of the next step: speech costs per MB
+of text, not per MB of the docx the text came from.
+
+The costs come from the benchmark suite. `COSTS` holds the figures of a
+reference run, `python -m filemac.benchmarks.suite --save-costs` measures this
+machine and stores its own in FILEMAC_COSTS, which take precedence. Edges no
+benchmark covers use the estimate they were registered with:
+
+    print(plan(edges, "doc", "txt", os.path.getsize("notes.doc")).describe())
+"""
+
+import functools
+import heapq
+import json
+import os
+from typing import Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+from ..utils.config import COSTS_FILE
+
+Edge = Tuple[str, str]
+
+
+class Cost(NamedTuple):
+    # Seconds per conversion whatever the input
+    fixed: float = 0.0
+    # Seconds per MB of input
+    per_mb: float = 1.0
+    # Output bytes per input byte
+    ratio: float = 1.0
+
+    def seconds(self, size: int) -> float:
+        return self.fixed + self.per_mb * size / 1e6
+
+
+# Edges neither measured nor estimated
+DEFAULT_COST = Cost(0.1, 1.0)
+
+# Reference run of the benchmark suite: scale 1, one job, warm disk cache
+COSTS: Dict[Edge, Cost] = {
+    ("csv", "xlsx"): Cost(per_mb=1.09, ratio=0.67),
+    ("docx", "txt"): Cost(per_mb=0.41, ratio=1.47),
+    ("pdf", "docx"): Cost(per_mb=150.3, ratio=1.38),
+    ("pdf", "txt"): Cost(per_mb=1.69, ratio=1.92),
+    ("pptx", "docx"): Cost(per_mb=0.88, ratio=0.61),
+    ("pptx", "txt"): Cost(per_mb=0.29, ratio=0.23),
+    ("txt", "pdf"): Cost(per_mb=0.067, ratio=0.44),
+    ("txt", "docx"): Cost(per_mb=0.35, ratio=0.24),
+    ("xlsx", "csv"): Cost(per_mb=2.08, ratio=1.07),
+    ("xlsx", "db"): Cost(per_mb=2.56, ratio=0.91),
+    ("xlsx", "docx"): Cost(per_mb=3.33, ratio=0.72),
+}
+
+
+class Step(NamedTuple):
+    source: str
+    target: str
+    # Estimated for the input size
+    seconds: float
+    # Where the cost comes from: measured, reference, estimate or default
+    origin: str
+    # Input bytes, estimated from the ratios of the steps before
+    size: int = 0
+
+
+class Plan(NamedTuple):
+    source: str
+    steps: List[Step]
+    # Input bytes the estimates are for
+    size: int
+
+    @property
+    def formats(self) -> List[str]:
+        """Formats visited, the source and the target included."""
+        return [self.source] + [step.target for step in self.steps]
+
+    @property
+    def seconds(self) -> float:
+        return sum(step.seconds for step in self.steps)
+
+    def describe(self) -> str:
+        """The plan as printed by `--explain`."""
+        if not self.steps:
+            return f"{self.source}: nothing to convert"
+        lines = [
+            f"{' -> '.join(self.formats)}: about {_duration(self.seconds)} "
+            f"for {self.size / 1e6:.2f} MB"
+        ]
+        for number, step in enumerate(self.steps, 1):
+            lines.append(
+                f"  {number}. {step.source} -> {step.target}  "
+                f"{_duration(step.seconds)} for {step.size / 1e6:.2f} MB "
+                f"({step.origin})"
+            )
+        return "\n".join(lines)
+
+
+def _duration(seconds: float) -> str:
+    if seconds < 1:
+        return f"{seconds * 1000:.0f}ms"
+    if seconds < 120:
+        return f"{seconds:.1f}s"
+    return f"{seconds / 60:.1f}min"
+
+
+def _key(edge: Edge) -> str:
+    return f"{edge[0]}->{edge[1]}"
+
+
+@functools.lru_cache(maxsize=None)
+def measured_costs() -> Dict[Edge, Cost]:
+    """Costs measured on this machine, empty until the suite saved some."""
+    try:
+        with open(COSTS_FILE, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    costs = {}
+    for key, value in data.items():
+        source, _, target = key.partition("->")
+        try:
+            costs[source, target] = Cost(*value)
+        except TypeError:
+            continue
+    return costs
+
+
+def save_costs(costs: Mapping[Edge, Cost]) -> str:
+    """
+    Store measured costs in FILEMAC_COSTS, over the ones of the same edges.
+
+    Returns:
+        The costs file.
+    """
+    merged = {**measured_costs(), **costs}
+    path = os.fspath(COSTS_FILE)
+    partial = f"{path}.part"
+    with open(partial, "w", encoding="utf-8") as f:
+        json.dump({_key(edge): list(cost) for edge, cost in sorted(merged.items())}, f)
+    os.replace(partial, path)
+    measured_costs.cache_clear()
+    return path
+
+
+def edge_cost(edge: Edge, declared: Optional[Cost] = None) -> Tuple[Cost, str]:
+    """The cost of `edge` and its origin, see `Step`."""
+    measured = measured_costs().get(edge)
+    if measured is not None:
+        return measured, "measured"
+    if edge in COSTS:
+        return COSTS[edge], "reference"
+    if declared is not None:
+        return declared, "estimate"
+    return DEFAULT_COST, "default"
+
+
+def plan(
+    edges: Mapping[Edge, Optional[Cost]], source: str, target: str, size: int = 0
+) -> Plan:
+    """
+    The cheapest chain of `edges` from `source` to `target` for an input of
+    `size` bytes, the one with the fewest steps among equally cheap ones.
+
+    Args:
+        edges: the available conversions and the cost they were declared
+            with, None for none.
+
+    Raises:
+        ValueError: no chain of edges reaches `target`.
+    """
+    costs = {edge: edge_cost(edge, declared) for edge, declared in edges.items()}
+    best = {source: (0.0, 0)}
+    # Input size of the next step along the best chain to each format
+    sizes = {source: size}
+    previous: Dict[str, Step] = {}
+    heap = [(0.0, 0, source)]
+    while heap:
+        seconds, hops, fmt = heapq.heappop(heap)
+        if (seconds, hops) > best[fmt]:
+            continue
+        if fmt == target:
+            steps = []
+            while fmt != source:
+                steps.append(previous[fmt])
+                fmt = previous[fmt].source
+            return Plan(source, steps[::-1], size)
+        for (src, dst), (cost, origin) in costs.items():
+            if src != fmt:
+                continue
+            step = Step(src, dst, cost.seconds(sizes[fmt]), origin, sizes[fmt])
+            candidate = (seconds + step.seconds, hops + 1)
+            if dst not in best or candidate < best[dst]:
+                best[dst] = candidate
+                previous[dst] = step
+                sizes[dst] = int(sizes[fmt] * cost.ratio)
+                heapq.heappush(heap, (*candidate, dst))
+    raise ValueError(f"No conversion from {source} to {target}")
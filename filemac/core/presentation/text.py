@@ -0,0 +1,234 @@
+"""
+Slide-parallel pptx text extraction.
+
+Shared by ppt to text, ppt to word and text to speech. Slides are read
+straight from the pptx zip in presentation order, chunks of them parsed by
+worker processes and handed back in order to a single writer, which builds
+the whole output in one buffered pass and replaces the target file only once
+it succeeded.
+
+Every paragraph of the slide, text boxes, grouped shapes and table cells
+included, is kept with the formatting of its runs so ppt to word can carry
+bold, italic, underline, font and colour over:
+
+    for slide in iter_slides("deck.pptx"):
+        for paragraph in slide:
+            print("".join(run.text for run in paragraph))
+"""
+
+import os
+import posixpath
+import zipfile
+from typing import IO, Iterator, List, Optional, Tuple, Union
+
+from ...utils.executor import fan_out_jobs, item_progress, ordered_map
+from ...utils.profiler import span
+from ..word.writer import Paragraph, Run, write_paragraphs
+
+# Slides parsed per worker task
+SLIDES_PER_CHUNK = 32
+# Decks shorter than this are extracted inline unless --jobs is given
+PARALLEL_MIN_SLIDES = 128
+# Word paragraphs: justified, 6pt before and after, 1.15 line spacing
+PARAGRAPH_PROPS = (
+    '<w:pPr><w:spacing w:before="120" w:after="120" w:line="276" '
+    'w:lineRule="auto"/><w:jc w:val="both"/></w:pPr>'
+)
+
+PRESENTATION_XML = "ppt/presentation.xml"
+
+_A = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+_P = "{http://schemas.openxmlformats.org/presentationml/2006/main}"
+_R = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+# pptx underline styles Word knows under another name, the rest map to single
+_UNDERLINE = {"sng": "single", "dbl": "double", "none": "none"}
+
+
+Slide = List[Paragraph]
+
+
+def _flag(value: Optional[str]) -> Optional[bool]:
+    if value is None:
+        return None
+    return value in ("1", "true")
+
+
+def _run(element) -> Run:
+    text = element.findtext(f"{_A}t") or ""
+    props = element.find(f"{_A}rPr")
+    if props is None:
+        return Run(text)
+    underline = props.get("u")
+    if underline is not None:
+        underline = _UNDERLINE.get(underline, "single")
+    size = props.get("sz")
+    latin = props.find(f"{_A}latin")
+    color = props.find(f"{_A}solidFill/{_A}srgbClr")
+    return Run(
+        text,
+        _flag(props.get("b")),
+        _flag(props.get("i")),
+        underline,
+        latin.get("typeface") if latin is not None else None,
+        int(size) / 100 if size else None,
+        color.get("val").upper() if color is not None else None,
+    )
+
+
+def _slide_parts(archive: zipfile.ZipFile) -> List[str]:
+    """Zip names of the slides in presentation order."""
+    from lxml import etree
+
+    rels_name = "ppt/_rels/presentation.xml.rels"
+    targets = {
+        rel.get("Id"): rel.get("Target")
+        for rel in etree.fromstring(archive.read(rels_name)).iter(f"{_REL}Relationship")
+    }
+    presentation = etree.fromstring(archive.read(PRESENTATION_XML))
+    parts = []
+    for slide in presentation.iter(f"{_P}sldId"):
+        target = targets.get(slide.get(f"{_R}id"))
+        if target is None:
+            continue
+        if target.startswith("/"):
+            parts.append(target.lstrip("/"))
+        else:
+            parts.append(posixpath.normpath(posixpath.join("ppt", target)))
+    return parts
+
+
+def _read_slides(archive: zipfile.ZipFile, parts: List[str]) -> List[Slide]:
+    from lxml import etree
+
+    parser = etree.XMLParser(huge_tree=True)
+    slides = []
+    with span("pptx.extract", slides=len(parts)):
+        for part in parts:
+            root = etree.fromstring(archive.read(part), parser)
+            paragraphs = []
+            for paragraph in root.iter(f"{_A}p"):
+                runs = [_run(run) for run in paragraph.iter(f"{_A}r")]
+                if any(run.text.strip() for run in runs):
+                    paragraphs.append(runs)
+            slides.append(paragraphs)
+    return slides
+
+
+def _extract_chunk(job: Tuple[str, List[str]]) -> List[Slide]:
+    """Paragraphs of some slides of one deck, runs in a worker process."""
+    path, parts = job
+    with zipfile.ZipFile(path) as archive:
+        return _read_slides(archive, parts)
+
+
+def iter_slides(
+    path: Union[os.PathLike, IO[bytes]],
+    jobs: Optional[int] = None,
+    progress: bool = True,
+) -> Iterator[Slide]:
+    """
+    Yield the paragraphs of every slide of `path` in presentation order.
+
+    Args:
+        path: the pptx file, or a binary file object.
+        jobs: worker processes, chosen from `--jobs` and the slide count
+            when None.
+        progress: show a slide progress bar.
+    """
+    if isinstance(path, (str, os.PathLike)):
+        path = os.fspath(path)
+    else:
+        # Worker processes open the deck by name, a file object stays here
+        jobs = 1
+    with zipfile.ZipFile(path) as archive:
+        parts = _slide_parts(archive)
+        if jobs is None:
+            jobs = fan_out_jobs(len(parts), PARALLEL_MIN_SLIDES)
+        # Reading the zip directory of a big deck is not free, workers get
+        # a few large chunks each rather than many small ones
+        size = SLIDES_PER_CHUNK
+        if jobs > 1:
+            size = max(size, -(-len(parts) // (jobs * 4)))
+        chunks = [parts[i : i + size] for i in range(0, len(parts), size)]
+        jobs = min(jobs, len(chunks))
+
+        desc = f"Slides ({max(jobs, 1)} jobs)"
+        with item_progress(desc, len(parts), enabled=progress) as advance:
+            if jobs <= 1:
+                results = (_read_slides(archive, chunk) for chunk in chunks)
+            else:
+                tasks = [(path, chunk) for chunk in chunks]
+                results = ordered_map(_extract_chunk, tasks, jobs)
+            for slides in results:
+                yield from slides
+                advance(len(slides))
+
+
+def iter_lines(
+    path: Union[os.PathLike, IO[bytes]],
+    jobs: Optional[int] = None,
+    progress: bool = True,
+) -> Iterator[str]:
+    """Yield the text of every paragraph, see `iter_slides` for the arguments."""
+    for slide in iter_slides(path, jobs, progress):
+        for paragraph in slide:
+            yield "".join(run.text for run in paragraph).strip()
+
+
+def _replace(output: str, write) -> str:
+    """Run `write(file)` on a temporary file, then move it over `output`."""
+    partial = f"{output}.part"
+    try:
+        with span("doc.write"):
+            write(partial)
+        os.replace(partial, output)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    return output
+
+
+def extract_text(
+    path: Union[os.PathLike, IO[bytes]],
+    output: Optional[os.PathLike] = None,
+    jobs: Optional[int] = None,
+    progress: bool = True,
+):
+    """
+    Extract the text of a pptx, one line per paragraph.
+
+    Returns:
+        The text, or with `output` the path of the file it was written to.
+        The file is only replaced once the extraction succeeded.
+    """
+    lines = iter_lines(path, jobs, progress)
+    if output is None:
+        return "\n".join(lines)
+
+    def write(partial):
+        with open(partial, "w", encoding="utf-8") as f:
+            f.writelines(f"{line}\n" for line in lines)
+
+    return _replace(os.fspath(output), write)
+
+
+def write_docx(
+    path: Union[os.PathLike, IO[bytes]],
+    output: Union[os.PathLike, IO[bytes]],
+    jobs: Optional[int] = None,
+    progress: bool = True,
+):
+    """
+    Write the paragraphs of a pptx to the Word document `output`, keeping
+    the formatting of the runs. See `iter_slides` for the arguments.
+
+    Returns:
+        `output`, a path is only replaced once the document is complete.
+    """
+    paragraphs = (
+        paragraph for slide in iter_slides(path, jobs, progress) for paragraph in slide
+    )
+    return write_paragraphs(paragraphs, output, PARAGRAPH_PROPS)
@@ -0,0 +1,254 @@
+"""
+Spreadsheet to SQLite loader.
+
+Every sheet of every workbook is imported into a table without prompting:
+
+    load_workbooks(["q1.xlsx", "q2.xlsx"], "sales.db", table="sales")
+
+Rows are inserted in chunks with `executemany`, one transaction per chunk,
+on a WAL journal with synchronous=NORMAL. Column types (INTEGER, REAL, TEXT)
+are inferred from the first chunk, and indexes are built after the data is
+in. With several workbooks and `--jobs`, worker processes read the workbooks
+while this process is the only writer, SQLite allows no more.
+
+Tables are named after `table`, or the workbook when it is not given, with
+the sheet name appended when a workbook has several sheets. A table is
+replaced the first time a run writes to it and appended to afterwards, so
+workbooks sharing a table name are combined and reruns do not duplicate rows.
+"""
+
+import datetime
+import os
+import re
+import sqlite3
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from ...utils.executor import get_jobs, item_progress, merge_streams
+from .reader import open_workbook
+
+# Rows per executemany call and transaction
+CHUNK_ROWS = 5000
+
+_ADAPT = {
+    datetime.datetime: lambda value: value.isoformat(sep=" "),
+    datetime.date: datetime.date.isoformat,
+    datetime.time: datetime.time.isoformat,
+    datetime.timedelta: str,
+}
+
+
+def _identifier(name) -> str:
+    """Readable table or column name, quoted when used in sql."""
+    return re.sub(r"\W+", "_", str(name)).strip("_")
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _columns(header: Sequence) -> List[str]:
+    """Unique column names from a header row, blank ones numbered."""
+    columns = []
+    for position, value in enumerate(header, 1):
+        name = _identifier(value) if value is not None else ""
+        name = name or f"column_{position}"
+        base, n = name, 2
+        while name.lower() in (column.lower() for column in columns):
+            name, n = f"{base}_{n}", n + 1
+        columns.append(name)
+    return columns
+
+
+def _sql_type(values: Iterable) -> str:
+    values = [value for value in values if value is not None]
+    if not values:
+        return "TEXT"
+    if all(isinstance(value, int) for value in values):
+        return "INTEGER"
+    if all(isinstance(value, (int, float)) for value in values):
+        return "REAL"
+    return "TEXT"
+
+
+def _rows(chunk: List[Sequence], width: int) -> List[tuple]:
+    """Rows padded or cut to `width`, dates as ISO 8601 text."""
+    adapted = []
+    for row in chunk:
+        row = tuple(row[:width]) + (None,) * (width - len(row))
+        if any(type(value) in _ADAPT for value in row):
+            row = tuple(
+                _ADAPT[type(value)](value) if type(value) in _ADAPT else value
+                for value in row
+            )
+        adapted.append(row)
+    return adapted
+
+
+def read_workbook(path: str):
+    """
+    Messages describing a workbook for the writer: `("sheet", name, count,
+    header)` before the rows of each sheet, then `("rows", name, chunk)`.
+    A workbook that cannot be read ends with `("error", message)`.
+    """
+    try:
+        with open_workbook(path) as workbook:
+            count = len(workbook.sheet_names)
+            for sheet in workbook.sheets():
+                header = next(sheet.rows, None)
+                # Without any column there is no table to create
+                if not header:
+                    continue
+                yield ("sheet", sheet.name, count, tuple(header))
+                while True:
+                    chunk = list(islice(sheet.rows, CHUNK_ROWS))
+                    if not chunk:
+                        break
+                    yield ("rows", sheet.name, chunk)
+    except Exception as e:
+        yield ("error", f"{type(e).__name__}: {e}")
+
+
+class _Writer:
+    """The single connection all rows go through."""
+
+    def __init__(self, db: str, table: Optional[str]):
+        self.conn = sqlite3.connect(db)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.table = table
+        # (workbook, sheet) -> [table, columns, prepared] of sheets being read
+        self.sheets = {}
+        # table -> columns, for the tables written by this run
+        self.tables: Dict[str, List[str]] = {}
+        # table name as given -> its identifier
+        self.names: Dict[str, str] = {}
+        self.counts: Dict[str, int] = {}
+
+    def sheet(self, path: str, name: str, count: int, header: Sequence) -> None:
+        table = self.table or os.path.splitext(os.path.basename(path))[0]
+        if count > 1:
+            table = f"{table}_{name}"
+        self.sheets[path, name] = [self._table_name(table), _columns(header), False]
+
+    def _table_name(self, table: str) -> str:
+        """
+        Identifier of `table`, numbered when another name has it: "Q1 Sales"
+        and "Q1-Sales" are different sheets, not one table.
+        """
+        if table not in self.names:
+            taken = {name.lower() for name in self.names.values()}
+            name = _identifier(table) or "sheet"
+            base, n = name, 2
+            while name.lower() in taken:
+                name, n = f"{base}_{n}", n + 1
+            self.names[table] = name
+        return self.names[table]
+
+    def _prepare(self, table: str, columns: List[str], rows: List[tuple]) -> None:
+        # A sheet without data rows gets TEXT columns
+        types = [_sql_type(row[i] for row in rows) for i in range(len(columns))]
+        known = self.tables.get(table)
+        with self.conn:
+            if known is None:
+                # First write of this run replaces what an earlier run left
+                self.conn.execute(f"DROP TABLE IF EXISTS {_quote(table)}")
+                spec = ", ".join(
+                    f"{_quote(column)} {kind}" for column, kind in zip(columns, types)
+                )
+                self.conn.execute(f"CREATE TABLE {_quote(table)} ({spec})")
+                self.tables[table] = list(columns)
+                self.counts[table] = 0
+                return
+            # Another workbook appending with columns the table lacks
+            for column, kind in zip(columns, types):
+                if column.lower() not in (name.lower() for name in known):
+                    self.conn.execute(
+                        f"ALTER TABLE {_quote(table)} ADD COLUMN {_quote(column)} {kind}"
+                    )
+                    known.append(column)
+
+    def rows(self, path: str, name: str, chunk: List[Sequence]) -> int:
+        state = self.sheets[path, name]
+        table, columns, prepared = state
+        rows = _rows(chunk, len(columns))
+        if not prepared:
+            self._prepare(table, columns, rows)
+            state[2] = True
+        names = ", ".join(_quote(column) for column in columns)
+        marks = ", ".join("?" * len(columns))
+        with self.conn:
+            self.conn.executemany(
+                f"INSERT INTO {_quote(table)} ({names}) VALUES ({marks})", rows
+            )
+        self.counts[table] += len(rows)
+        return len(rows)
+
+    def finish(self, failed: Iterable[str] = ()) -> None:
+        """Create the tables of the sheets that had a header but no rows."""
+        failed = set(failed)
+        for (path, _name), state in self.sheets.items():
+            table, columns, prepared = state
+            if not prepared and path not in failed:
+                self._prepare(table, columns, [])
+                state[2] = True
+
+    def index(self, columns: Sequence[str]) -> None:
+        """Index the given columns of every table of this run having them."""
+        wanted = [_identifier(column) for column in columns]
+        for table, known in self.tables.items():
+            for column in wanted:
+                if column.lower() not in (name.lower() for name in known):
+                    continue
+                index = _quote(f"idx_{table}_{column}")
+                with self.conn:
+                    self.conn.execute(
+                        f"CREATE INDEX IF NOT EXISTS {index} "
+                        f"ON {_quote(table)} ({_quote(column)})"
+                    )
+
+    def close(self) -> None:
+        self.conn.execute("PRAGMA optimize")
+        self.conn.close()
+
+
+def load_workbooks(
+    paths: Iterable[os.PathLike],
+    db: os.PathLike,
+    table: Optional[str] = None,
+    index: Optional[Sequence[str]] = None,
+    jobs: Optional[int] = None,
+) -> Tuple[Dict[str, int], Dict[str, str]]:
+    """
+    Import every sheet of `paths` into the SQLite database `db`.
+
+    Args:
+        table: table name, defaults to the workbook name. Workbooks with
+            several sheets get one table per sheet, `<table>_<sheet>`.
+        index: columns to index in every table that has them.
+        jobs: reader processes, defaults to `--jobs`.
+
+    Returns:
+        Rows inserted per table, and the error of every workbook that could
+        not be read, the others are loaded regardless.
+    """
+    paths = [os.fspath(path) for path in paths]
+    jobs = get_jobs() if jobs is None else jobs
+    writer = _Writer(os.fspath(db), table)
+    errors = {}
+    try:
+        with item_progress(f"Rows into {os.path.basename(db)}") as advance:
+            for path, message in merge_streams(read_workbook, paths, jobs):
+                kind = message[0]
+                if kind == "sheet":
+                    writer.sheet(path, *message[1:])
+                elif kind == "rows":
+                    advance(writer.rows(path, *message[1:]))
+                else:
+                    errors[path] = message[1]
+        writer.finish(errors)
+        if index:
+            writer.index(index)
+    finally:
+        writer.close()
+    return writer.counts, errors
@@ -0,0 +1,119 @@
+"""
+Streaming spreadsheet reader.
+
+Converters read workbooks row by row through `open_workbook` instead of
+loading whole sheets into DataFrames, so memory stays flat however large the
+file:
+
+    with open_workbook("book.xlsx") as workbook:
+        for sheet in workbook.sheets():
+            for row in sheet.rows:
+                ...
+
+python-calamine (a compiled reader, several times faster) is used when
+installed, openpyxl in read-only mode otherwise. Legacy .xls files without
+calamine go through pandas/xlrd one sheet at a time; the format is capped at
+65,536 rows per sheet so this stays bounded.
+"""
+
+import os
+from typing import IO, Iterator, List, NamedTuple, Optional, Sequence, Union
+
+
+class Sheet(NamedTuple):
+    name: str
+    # Iterator of row tuples, empty cells are None
+    rows: Iterator[Sequence]
+    # Row count declared by the file, None when unknown
+    total: Optional[int]
+
+
+def _calamine():
+    try:
+        from python_calamine import CalamineWorkbook
+    except ImportError:
+        return None
+    return CalamineWorkbook
+
+
+def _calamine_rows(sheet) -> Iterator[tuple]:
+    for row in sheet.iter_rows():
+        # calamine reports empty cells as ""
+        yield tuple(None if value == "" else value for value in row)
+
+
+def _openpyxl_rows(sheet) -> Iterator[tuple]:
+    # Trailing empty cells are left out by some writers, pad to the widest
+    # row seen so the columns stay aligned
+    width = sheet.max_column or 0
+    for row in sheet.iter_rows(values_only=True):
+        if len(row) < width:
+            row = row + (None,) * (width - len(row))
+        width = len(row)
+        yield row
+
+
+class Workbook:
+    """A workbook opened for streaming, see `open_workbook`."""
+
+    def __init__(self, path: Union[os.PathLike, IO[bytes]]):
+        if isinstance(path, (str, os.PathLike)):
+            self.path = os.fspath(path)
+        else:
+            # A file object, only read as xlsx without calamine
+            self.path = path
+        if _calamine() is not None:
+            self.kind = "calamine"
+            if isinstance(self.path, str):
+                self._book = _calamine().from_path(self.path)
+            else:
+                self._book = _calamine().from_filelike(self.path)
+            self.sheet_names: List[str] = list(self._book.sheet_names)
+        elif isinstance(self.path, str) and self.path.lower().endswith(".xls"):
+            import pandas as pd
+
+            self.kind = "pandas"
+            self._book = pd.ExcelFile(self.path)
+            self.sheet_names = list(self._book.sheet_names)
+        else:
+            from openpyxl import load_workbook
+
+            self.kind = "openpyxl"
+            self._book = load_workbook(self.path, read_only=True, data_only=True)
+            self.sheet_names = [sheet.title for sheet in self._book.worksheets]
+
+    def _sheet(self, name: str) -> Sheet:
+        if self.kind == "calamine":
+            sheet = self._book.get_sheet_by_name(name)
+            return Sheet(name, _calamine_rows(sheet), sheet.height)
+        if self.kind == "pandas":
+            df = self._book.parse(name, header=None)
+            df = df.astype(object).where(df.notna(), None)
+            return Sheet(name, df.itertuples(index=False, name=None), len(df))
+        sheet = self._book[name]
+        return Sheet(name, _openpyxl_rows(sheet), sheet.max_row)
+
+    def sheets(self) -> Iterator[Sheet]:
+        """
+        Yield the worksheets in workbook order.
+
+        A sheet's rows must be consumed before moving to the next sheet.
+        """
+        for name in self.sheet_names:
+            yield self._sheet(name)
+
+    def close(self) -> None:
+        if self.kind != "calamine":
+            self._book.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def open_workbook(path: Union[os.PathLike, IO[bytes]]) -> Workbook:
+    """Open `path` (xlsx, xlsm or xls, or an xlsx file object) for streaming."""
+    return Workbook(path)
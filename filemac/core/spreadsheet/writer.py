@@ -0,0 +1,182 @@
+"""
+Streaming csv to xlsx writer.
+
+The csv is read in chunks and every row is written as soon as its chunk is
+parsed, so a conversion is one read and one write with memory bounded by the
+chunk size. Column widths are tracked while the rows pass instead of
+reloading the finished workbook to measure them.
+
+XlsxWriter is used in constant memory mode when installed, it also sets the
+exact widths once the sheet is complete. Otherwise openpyxl's write-only mode
+is used; it writes the column widths before the first row, so they are sized
+from the first chunk.
+
+Sheets hold at most 1,048,576 rows (or `--max-rows` data rows); longer files
+continue on `Sheet2`, `Sheet3`, ... with the header repeated.
+"""
+
+import contextlib
+import os
+from typing import IO, List, Optional, Union
+
+from ...utils.executor import item_progress
+
+# Rows per sheet allowed by the xlsx format, header included
+EXCEL_MAX_ROWS = 1_048_576
+# Rows parsed per chunk
+CHUNK_ROWS = 20_000
+# Widest column Excel accepts, in characters
+MAX_WIDTH = 255
+
+
+def _xlsxwriter():
+    try:
+        import xlsxwriter
+    except ImportError:
+        return None
+    return xlsxwriter
+
+
+def _chunk_widths(chunk) -> List[int]:
+    """Longest rendered value of each column of a DataFrame chunk."""
+    lengths = chunk.astype(str).where(chunk.notna(), "").apply(lambda c: c.str.len())
+    return [int(width) for width in lengths.max().fillna(0)]
+
+
+def _merge(widths: List[int], more: List[int]) -> List[int]:
+    return [max(a, b) for a, b in zip(widths, more)]
+
+
+class _XlsxWriterBook:
+    def __init__(self, path: str):
+        self.book = _xlsxwriter().Workbook(
+            path,
+            {
+                "constant_memory": True,
+                # Keep cell text as written, like the pandas/openpyxl export
+                "strings_to_urls": False,
+                "nan_inf_to_errors": True,
+            },
+        )
+        self.sheet = None
+        self.widths = []
+
+    def add_sheet(self, name: str, header: list, widths: List[int]) -> None:
+        self.close_sheet()
+        self.sheet = self.book.add_worksheet(name)
+        self.sheet.write_row(0, 0, header)
+        self.widths = widths
+        self.row = 1
+
+    def write(self, rows, widths: List[int]) -> None:
+        write_row = self.sheet.write_row
+        for row in rows:
+            write_row(self.row, 0, row)
+            self.row += 1
+        self.widths = _merge(self.widths, widths)
+
+    def close_sheet(self) -> None:
+        if self.sheet is not None:
+            for col, width in enumerate(self.widths):
+                self.sheet.set_column(col, col, min(width + 2, MAX_WIDTH))
+
+    def close(self) -> None:
+        self.close_sheet()
+        self.book.close()
+
+
+class _OpenpyxlBook:
+    def __init__(self, path: str):
+        from openpyxl import Workbook
+
+        self.path = path
+        self.book = Workbook(write_only=True)
+        self.sheet = None
+
+    def add_sheet(self, name: str, header: list, widths: List[int]) -> None:
+        from openpyxl.utils import get_column_letter
+
+        self.sheet = self.book.create_sheet(name)
+        # Must be set before the first row is written
+        for col, width in enumerate(widths, 1):
+            self.sheet.column_dimensions[get_column_letter(col)].width = min(
+                width + 2, MAX_WIDTH
+            )
+        self.sheet.append(header)
+
+    def write(self, rows, widths: List[int]) -> None:
+        append = self.sheet.append
+        for row in rows:
+            append(row)
+
+    def close(self) -> None:
+        self.book.save(self.path)
+
+
+def write_xlsx(
+    path: Union[os.PathLike, IO[bytes]],
+    output: Union[os.PathLike, IO[bytes]],
+    max_rows: Optional[int] = None,
+):
+    """
+    Convert the csv file `path` to the xlsx workbook `output`.
+
+    Args:
+        path: csv path or binary file object.
+        output: xlsx path, only replaced once the workbook is complete, or a
+            binary file object.
+        max_rows: data rows per sheet, as many as the xlsx format allows by
+            default.
+
+    Returns:
+        `output`.
+    """
+    import pandas as pd
+
+    per_sheet = min(max_rows or EXCEL_MAX_ROWS, EXCEL_MAX_ROWS - 1)
+    partial = None
+    if isinstance(output, (str, os.PathLike)):
+        output = os.fspath(output)
+        partial = f"{output}.part"
+    book = (_XlsxWriterBook if _xlsxwriter() else _OpenpyxlBook)(partial or output)
+    if isinstance(path, (str, os.PathLike)):
+        source = open(path, "rb")
+        label, size = os.path.basename(path), os.path.getsize(path)
+    else:
+        # Caller's file object, left open; position unknown for streams
+        source = contextlib.nullcontext(path)
+        label, size = "csv", None
+    try:
+        with source as f, item_progress(f"Bytes of {label}", size) as advance:
+            header, sheets, room, read = None, 0, 0, 0
+            for chunk in pd.read_csv(f, chunksize=CHUNK_ROWS):
+                if header is None:
+                    header = [str(name) for name in chunk.columns]
+                    header_widths = [len(name) for name in header]
+                widths = _chunk_widths(chunk)
+                rows = chunk.astype(object).where(chunk.notna(), None)
+                rows = list(rows.itertuples(index=False, name=None))
+                while rows:
+                    if room == 0:
+                        sheets += 1
+                        book.add_sheet(
+                            f"Sheet{sheets}", header, _merge(header_widths, widths)
+                        )
+                        room = per_sheet
+                    part, rows = rows[:room], rows[room:]
+                    book.write(part, widths)
+                    room -= len(part)
+                if size is not None:
+                    advance(f.tell() - read)
+                    read = f.tell()
+        if sheets == 0 and header is not None:
+            # Header only, the chunk has no rows
+            book.add_sheet("Sheet1", header, header_widths)
+        book.close()
+        if partial:
+            os.replace(partial, output)
+    except BaseException:
+        if partial and os.path.exists(partial):
+            os.remove(partial)
+        raise
+    return output
@@ -1,12 +1,35 @@
-"""Create a word document directly from a text file."""
+"""
+Create a word document directly from a text file.
+
+The text is streamed line by line into the bulk paragraph writer, and the
+heading and body formatting is set once on the document styles that every
+paragraph refers to, rather than repeated on each run.
+"""
+
+import os
 
 from docx import Document
+from docx.oxml.ns import qn
 from docx.shared import Pt, RGBColor
 
 from ...utils.colors import fg, rs
+from ...utils.executor import counted, item_progress
+from ...utils.profiler import span
+from ..word.writer import Run, Styled, write_paragraphs
 
 RESET = rs
 
+# Heading level: font size in points, colour
+HEADINGS = {
+    1: (18, RGBColor(126, 153, 184)),
+    2: (16, RGBColor(0, 120, 212)),
+    3: (14, RGBColor(0, 120, 212)),
+}
+BODY_COLOR = RGBColor(0, 0, 0)
+
+# Theme fonts of the default template, they win over an explicit font name
+_THEME_FONTS = ("w:asciiTheme", "w:hAnsiTheme", "w:eastAsiaTheme", "w:cstheme")
+
 
 class StyledText:
     """
@@ -34,74 +57,68 @@ class StyledText:
         self.fsize = fsize
         self.fstyle = fstyle
         if self.out_obj is None:
-            self.out_obj = f"{self.obj.split('.')[0]}_filemac.docx"
+            self.out_obj = f"{os.path.splitext(self.obj)[0]}_filemac.docx"
+
+    def _set_font(self, style, size: int, color: RGBColor) -> None:
+        style.font.name = self.fstyle
+        style.font.size = Pt(size)
+        style.font.color.rgb = color
+        fonts = style.element.rPr.rFonts
+        for attribute in _THEME_FONTS:
+            fonts.attrib.pop(qn(attribute), None)
+
+    def _set_styles(self, document) -> dict:
+        """
+        Format the body and heading styles of `document`.
+
+        Returns:
+            The style id of every heading level.
+        """
+        self._set_font(document.styles["Normal"], self.fsize, BODY_COLOR)
+        ids = {}
+        for level, (size, color) in HEADINGS.items():
+            style = document.styles[f"Heading {level}"]
+            self._set_font(style, size, color)
+            ids[level] = style.style_id
+        return ids
+
+    @staticmethod
+    def _paragraphs(lines, headings: dict):
+        """Yield a paragraph per line, `#` marks make it a heading."""
+        for line in lines:
+            marks = len(line) - len(line.lstrip("#"))
+            if marks:
+                level = min(marks, len(headings))
+                yield Styled(headings[level], [Run(line[marks:].strip())])
+            else:
+                yield [Run(line.strip())]
 
     def text_to_word(self):
         """
         Create new document,
-        heading_styles -> define formating
-        Open the text file and read it line by line.
-        For every line check whether it starts with '#' format specify , ommit the specifier and formart the line.
-        Strip empty spaces from every line.
-        Set body font to fstyle and font size to fsize.
+        Set the heading styles and the body style (fstyle, fsize) once.
+        Stream the text file line by line: a line starting with '#' becomes a
+        heading of that level without the specifier, any other line a body
+        paragraph. Strip empty spaces from every line.
         """
 
         print(f"{fg.BWHITE}Set Font: {fg.CYAN}{self.fsize}{RESET}")
         print(f"{fg.BWHITE}Set Style: {fg.CYAN}{self.fstyle}{RESET}")
-        # Create a new Document
-        doc = Document()
-
-        # Define formatting for headings and body text
-        head_font_name = self.fstyle
-        heading_styles = {
-            # Heading 1
-            1: {"font_size": Pt(18), "font_color": RGBColor(126, 153, 184)},
-            # Heading 2
-            2: {"font_size": Pt(16), "font_color": RGBColor(0, 120, 212)},
-            # Heading 3
-            3: {"font_size": Pt(14), "font_color": RGBColor(0, 120, 212)},
-            # Heading 4
-            4: {"font_size": Pt(13), "font_color": RGBColor(0, 120, 212)},
-        }
-
-        body_font_name = "Times New Roman"
-        body_font_size = Pt(self.fsize)
-        body_font_color = RGBColor(0, 0, 0)  # Black color
-
-        # Open the text file and read content
-        with open(self.obj, "r") as file:
-            lines = file.readlines()
-
-        for i, line in enumerate(lines):
-            print(
-                f"{fg.BWHITE}Line: {fg.DCYAN}{i}{fg.YELLOW} of {fg.BLUE}{len(lines)}{RESET}",
-                end="\r",
-            )
-            # Determine heading level or body text
-            if line.startswith("#"):
-                level = line.count("#")
-                level = min(level, 3)  # Support up to 3 levels of headings
-                style = heading_styles.get(level, heading_styles[1])
-                p = doc.add_paragraph()
-                # Remove '#' and extra space
-                run = p.add_run(line[level + 1 :].strip())
-                run.font.size = style["font_size"]
-                run.font.name = head_font_name
-                run.font.color.rgb = style["font_color"]
-                p.style = f"Heading{level}"
-            else:
-                p = doc.add_paragraph()
-                run = p.add_run(line.strip())
-                run.font.name = body_font_name
-                run.font.size = body_font_size
-                run.font.color.rgb = body_font_color
-
-        # Save the document
-        print("\n")
-        doc.save(self.out_obj)
+        document = Document()
+        headings = self._set_styles(document)
+
+        name = os.path.basename(self.obj)
+        size = os.path.getsize(self.obj)
+        with open(self.obj, "r", encoding="utf-8", errors="replace") as file, span(
+            "doc.styled_text", file=name
+        ), item_progress(f"Lines of {name}", size) as advance:
+            paragraphs = self._paragraphs(counted(file, advance), headings)
+            write_paragraphs(paragraphs, self.out_obj, document=document)
+
         print(
             f"{fg.BWHITE}Text file converted to Word document: {fg.MAGENTA}{self.out_obj}{RESET}"
         )
+        return self.out_obj
 
 
 if __name__ == "__main__":
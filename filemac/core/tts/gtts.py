@@ -1,24 +1,26 @@
 import json
 import math
 import os
-import PyPDF2
-import shutil
 import sys
-from docx import Document
-from threading import Lock, Thread
+from threading import Thread
 from typing import List, Union
 import requests
 from gtts import gTTS
 from pydub import AudioSegment
 from rich.errors import MarkupError
-from ..document import DocConverter
+from ..pipeline import Source
 from ...utils.colors import fg, rs
+from ...utils.profiler import span, timed
 from ...utils.simple import logger
+from ...utils.workspace import Workspace, job_key
 
 RESET = rs
 
 _ext_word = ["doc", "docx"]
 
+# Resume state of a synthesis job, inside its workspace
+CONFIG_NAME = "filemac_config.json"
+
 
 class GoogleTTS:
     """Definition of audiofying class"""
@@ -32,6 +34,7 @@ class GoogleTTS:
         self.resume = resume
 
     @staticmethod
+    @timed("tts.join")
     def join_audios(files, output_file):
         masterfile = output_file + "_master.mp3"
         print(
@@ -58,51 +61,49 @@ class GoogleTTS:
             f"{fg.BGREEN}Master file:Ok                                                                             {RESET}"
         )
 
+    @timed("tts.synthesise")
     def Synthesise(
         self,
         text: str,
         output_file: str,
         CHUNK_SIZE: int = 1_000,
-        _tmp_folder_: str = "tmp_dir",
         thread_name: str = None,
         max_retries: int = 30,
     ) -> None:
         """Converts given text to speech using Google Text-to-Speech API."""
         # from rich.progress import (BarColumn, Progress, SpinnerColumn,TextColumn)
 
-        config = ConfigManager()
-        # Define directories and other useful variables for genrating output_file and checkpoint_file
-        out_dir = os.path.split(output_file)[0]
-
         thread_name = f"thread_{os.path.split(output_file.split('.')[0])[-1]}"
         _file_ = os.path.split(output_file)[1]
 
-        _tmp_folder_ = os.path.join(out_dir, _tmp_folder_)
-
-        # Remove temporary dir if it exists, rare-cases since file names are mostly unique
-        if os.path.exists(_tmp_folder_) and self.resume is False:
-            # query = input(f"{fg.BBLUE}Remove the {os.path.join(out_dir, _tmp_folder_)} directory (y/n)?{RESET} ").lower() in ('y', 'yes')
-            shutil.rmtree(_tmp_folder_)
-
-        # Create temporary folder to house chunks
-        if not os.path.exists(_tmp_folder_):
+        # Chunks and resume state live in a workspace keyed on the output
+        # file, kept after a failure when resuming is enabled
+        with Workspace(
+            "tts",
+            key=job_key(os.path.abspath(output_file)),
+            keep_on_error=self.resume,
+            fresh=not self.resume,
+        ) as workspace:
             logger.info(
-                f"{fg.BYELLOW}Create temporary directory = {fg.BBLUE}{_tmp_folder_}{RESET}"
+                f"{fg.BYELLOW}Temporary directory = {fg.BBLUE}{workspace.path}{RESET}"
             )
-            os.mkdir(_tmp_folder_)
+            config = ConfigManager(workspace.file(CONFIG_NAME))
+            if not os.path.exists(config.config_path):
+                config.add_config_entry(
+                    thread_name, output_file, str(workspace.path), 0
+                )
 
-        _full_output_path_ = os.path.join(_tmp_folder_, _file_)
+            _full_output_path_ = os.path.join(workspace.path, _file_)
 
-        # Read reume chunk from the configuration file
-        start_chunk = int(config.read_config_file(thread_name)) * 1_000
-        start_chunk = 0 if start_chunk is None else start_chunk
+            # Read reume chunk from the configuration file
+            start_chunk = int(config.read_config_file(thread_name)) * 1_000
+            start_chunk = 0 if start_chunk is None else start_chunk
 
-        """ If chunk is not 0 multiply the chunk by the highest decimal value of the chunk size
-        else set it to 0 meaning file is being operated on for the first time
-        """
-        resume_chunk_pos = start_chunk * 1_000 if start_chunk != 0 else start_chunk
+            """ If chunk is not 0 multiply the chunk by the highest decimal value of the chunk size
+            else set it to 0 meaning file is being operated on for the first time
+            """
+            resume_chunk_pos = start_chunk * 1_000 if start_chunk != 0 else start_chunk
 
-        try:
             print(f"{fg.BYELLOW}Start thread:: {thread_name}{RESET}")
 
             total_chunks = math.ceil(len(text) / CHUNK_SIZE)
@@ -148,9 +149,10 @@ class GoogleTTS:
                         else:
                             output_filename = f"{_full_output_path_}_{counter}.ogg"
 
-                        tts = gTTS(text=chunk, lang="en", slow=False)
+                        with span("tts.request", chunk=counter):
+                            tts = gTTS(text=chunk, lang="en", slow=False)
 
-                        tts.save(output_filename)
+                            tts.save(output_filename)
 
                         # Update current_chunk in the configuration
                         config.update_config_entry(thread_name, current_chunk=counter)
@@ -241,15 +243,14 @@ class GoogleTTS:
                         f"{fg.BMAGENTA}Conversion success✅. \n  {fg.CYAN}INFO\t Create masterfile{RESET}"
                     )
 
-                    if (
-                        len(os.listdir(_tmp_folder_)) > 2
-                    ):  # Combine generated gTTS objects
-                        from .JoinAudios import JoinAudios
+                    chunks = workspace.files("*.ogg")
+                    if chunks:  # Combine generated gTTS objects
+                        from ..audio.core import AudioJoiner
 
-                        joiner = JoinAudios(_tmp_folder_, masterfile=output_file)
+                        joiner = AudioJoiner(
+                            [str(chunk) for chunk in chunks], masterfile=output_file
+                        )
                         joiner.worker()
-                        # Remove temporary files
-                        shutil.rmtree(_tmp_folder_)
 
                     break  # Exit the retry loop if successfull
 
@@ -259,27 +260,17 @@ class GoogleTTS:
                 )
                 sys.exit(2)
 
-        finally:
-            pass
-
     @staticmethod
     def pdf_to_text(pdf_path):
         logger.info(f"{fg.GREEN} Initializing pdf to text conversion{RESET}")
         try:
-            with open(pdf_path, "rb") as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                text = ""
-                _pg_ = 0
-                print(f"{fg.YELLOW}Convert pages..{RESET}")
-                for page_num in range(len(pdf_reader.pages)):
-                    _pg_ += 1
-                    logger.info(
-                        f"Page {fg.BBLUE}{_pg_}{RESET}/{len(pdf_reader.pages)}"
-                    )
-                    page = pdf_reader.pages[page_num]
-                    text += page.extract_text()
-                print(f"{fg.BGREEN}Ok{RESET}\n")
-                return text
+            from ..pdf.text import extract_text
+
+            print(f"{fg.YELLOW}Convert pages..{RESET}")
+            # Synthesis needs the whole text, it is kept in memory
+            text = extract_text(pdf_path)
+            print(f"{fg.BGREEN}Ok{RESET}\n")
+            return text
         except Exception as e:
             logger.error(
                 f"{fg.RED}Failed to extract text from '{fg.YELLOW}{pdf_path}'{RESET}:\n {e}"
@@ -299,10 +290,10 @@ class GoogleTTS:
     @staticmethod
     def docx_to_text(docx_path):
         try:
+            from ..word.text import extract_text
+
             logger.info(f"{fg.BLUE} Converting {docx_path} to text{RESET}")
-            doc = Document(docx_path)
-            paragraphs = [paragraph.text for paragraph in doc.paragraphs]
-            return "\n".join(paragraphs)
+            return extract_text(docx_path)
         except FileNotFoundError:
             logger.error(f"File '{docx_path}' was not found.📁")
         except Exception as e:
@@ -313,27 +304,15 @@ class GoogleTTS:
     class ThreadClient:
         def __init__(self, instance):
             self.instance = instance
-            self.lock = Lock()
-            self.config = ConfigManager()
 
         def audiofy(self, num_threads=3):
             ls = ("pdf", "docx", "doc", "txt", "ppt", "pptx")
 
             def create_thread(item, thread_name):
-                # Create a unique temp dir for each file
-                temp_dir = f"tmp_dir_{os.path.split(item.split('.')[0])[-1]}"
-
-                # Ensure proper locking when adding config entry
-                with self.lock:
-                    # Record config entry for each item
-                    self.config.add_config_entry(
-                        thread_name, f"{item.split('.')[0]}", temp_dir, 0
-                    )
-
-                # Create and return the thread
+                # Each file is synthesised in its own workspace, see Synthesise
                 return Thread(
                     target=self.worker,
-                    args=(item, temp_dir, thread_name),
+                    args=(item, thread_name),
                     name=thread_name,
                 )
 
@@ -393,32 +372,26 @@ class GoogleTTS:
                 if threads:
                     process_batch()
 
-        def worker(self, input_file, _temp_dir_, thread_name):
+        def worker(self, input_file, thread_name):
             output_file = os.path.split(input_file)[-1].split(".")[0] + ".ogg"
             print(f"Thread {thread_name} processing file: {input_file}")
 
             try:
                 # Extract text based on file type
-                if input_file.endswith(".pdf"):
-                    text = GoogleTTS.pdf_to_text(input_file)
-                elif input_file.lower().endswith(tuple(_ext_word)):
-                    text = GoogleTTS.docx_to_text(input_file)
-                elif input_file.endswith(".txt"):
+                if input_file.endswith(".txt"):
                     text = GoogleTTS.text_file(input_file)
-                elif input_file.split(".")[-1] in ("ppt", "pptx"):
-                    conv = DocConverter(input_file)
-                    word = conv.ppt_to_word()
-                    conv = DocConverter(word)
-                    text = GoogleTTS.text_file(conv.word_to_txt())
+                elif input_file.lower().endswith(
+                    (".pdf", ".ppt", ".pptx", *(f".{ext}" for ext in _ext_word))
+                ):
+                    # Straight to text in memory, no intermediate files
+                    text = Source(input_file).to("txt").text()
                 else:
                     raise ValueError(
                         "Unsupported file format. Please provide a PDF, txt, or Word document."
                     )
 
                 # Synthesize audio using the extracted text
-                self.instance.Synthesise(
-                    text, output_file, _tmp_folder_=_temp_dir_, thread_name=thread_name
-                )
+                self.instance.Synthesise(text, output_file, thread_name=thread_name)
                 print(f"Thread {thread_name} completed processing {input_file}")
 
             except Exception as e:
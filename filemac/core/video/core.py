@@ -11,10 +11,10 @@ from moviepy import VideoFileClip
 from pydub import AudioSegment
 from tqdm import tqdm
 
-from ...utils.colors import fg, bg, rs
+from ...utils.colors import fg, rs
+from ...utils.discovery import discover
 from ...utils.formats import SUPPORTED_VIDEO_FORMATS, Video_codecs
 
-
 RESET = rs
 
 
@@ -26,20 +26,7 @@ class VideoConverter:
     def preprocess(self):
         if self.out_format is None:
             return None
-        files_to_process = []
-
-        if os.path.isfile(self.input_file):
-            files_to_process.append(self.input_file)
-        elif os.path.isdir(self.input_file):
-            if os.listdir(self.input_file) is None:
-                print(f"{bg.RED}Cannot work with empty folder{RESET}")
-                sys.exit(1)
-            for file in os.listdir(self.input_file):
-                file_path = os.path.join(self.input_file, file)
-                if os.path.isfile(file_path):
-                    files_to_process.append(file_path)
-
-        return files_to_process
+        return list(discover(self.input_file))
 
     def ffmpeg_merger(self, obj: list = None):
         video_list = self.preprocess(), obj
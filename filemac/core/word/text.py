@@ -0,0 +1,179 @@
+"""
+Streaming docx text extraction.
+
+Shared by word to text and text to speech. `word/document.xml` is parsed
+straight from the zip with iterparse and every finished paragraph is yielded
+and dropped from the tree, so memory stays flat however long the document is,
+unlike loading the python-docx object model.
+
+Paragraphs and tables come out in document order. A table row becomes one
+line with its cells separated by tabs; nested tables are flattened into the
+cell holding them:
+
+    for block in iter_blocks("report.docx"):
+        ...
+"""
+
+import os
+import zipfile
+from typing import IO, Iterator, List, Optional, Union
+
+from ...utils.executor import item_progress
+from ...utils.profiler import span
+
+DOCUMENT_XML = "word/document.xml"
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_MC = "{http://schemas.openxmlformats.org/markup-compatibility/2006}"
+
+_P, _T, _TBL, _TR, _TC = (f"{_W}{tag}" for tag in ("p", "t", "tbl", "tr", "tc"))
+# Run content other than plain text
+_SPECIAL = {
+    f"{_W}tab": "\t",
+    f"{_W}br": "\n",
+    f"{_W}cr": "\n",
+    f"{_W}noBreakHyphen": "-",
+}
+# Alternative renderings of content already read from mc:Choice
+_FALLBACK = f"{_MC}Fallback"
+
+# Bytes of xml parsed between progress updates
+_PROGRESS_STEP = 1 << 20
+
+
+class _Counting:
+    """File wrapper counting the bytes read, for progress."""
+
+    def __init__(self, raw, advance):
+        self.raw = raw
+        self.advance = advance
+        self.pending = 0
+
+    def read(self, size=-1):
+        data = self.raw.read(size)
+        self.pending += len(data)
+        if self.pending >= _PROGRESS_STEP or not data:
+            self.advance(self.pending)
+            self.pending = 0
+        return data
+
+
+class _Table:
+    def __init__(self):
+        self.rows: List[str] = []
+        self.cells: List[str] = []
+        self.cell: List[str] = []
+
+
+def iter_blocks(
+    path: Union[os.PathLike, IO[bytes]], progress: bool = True
+) -> Iterator[str]:
+    """
+    Yield the text of each top level paragraph and table row of a docx.
+
+    Args:
+        path: the docx file, or a binary file object.
+        progress: show the bytes parsed.
+    """
+    from lxml import etree
+
+    if isinstance(path, (str, os.PathLike)):
+        name = os.path.basename(path)
+    else:
+        name = "document"
+    with zipfile.ZipFile(path) as archive:
+        size = archive.getinfo(DOCUMENT_XML).file_size
+        with archive.open(DOCUMENT_XML) as raw, item_progress(
+            f"Text of {name}", size, enabled=progress
+        ) as advance:
+            # Text of the open paragraphs, text boxes nest them
+            paragraphs: List[List[str]] = []
+            tables: List[_Table] = []
+            skip = 0
+            events = etree.iterparse(
+                _Counting(raw, advance), events=("start", "end"), huge_tree=True
+            )
+            for event, elem in events:
+                tag = elem.tag
+                if tag == _FALLBACK:
+                    skip += 1 if event == "start" else -1
+                    continue
+                if skip:
+                    continue
+                if event == "start":
+                    if tag == _P:
+                        paragraphs.append([])
+                    elif tag == _TBL:
+                        tables.append(_Table())
+                    continue
+
+                block = None
+                if tag == _T:
+                    if paragraphs:
+                        paragraphs[-1].append(elem.text or "")
+                elif tag in _SPECIAL:
+                    if paragraphs:
+                        paragraphs[-1].append(_SPECIAL[tag])
+                elif tag == _P:
+                    text = "".join(paragraphs.pop())
+                    if paragraphs:
+                        # Text box content ends up in its anchor paragraph
+                        paragraphs[-1].append(text)
+                    elif tables:
+                        tables[-1].cell.append(text)
+                    else:
+                        block = text
+                elif tag == _TC:
+                    table = tables[-1]
+                    table.cells.append(" ".join(filter(None, table.cell)))
+                    table.cell = []
+                elif tag == _TR:
+                    table = tables[-1]
+                    row = "\t".join(table.cells)
+                    table.cells = []
+                    if len(tables) > 1:
+                        tables[-2].cell.append(row)
+                    else:
+                        block = row
+                elif tag == _TBL:
+                    tables.pop()
+                else:
+                    continue
+
+                if not paragraphs and not tables:
+                    # Finished a body level element, drop what was parsed
+                    elem.clear()
+                    while elem.getprevious() is not None:
+                        del elem.getparent()[0]
+                if block is not None:
+                    yield block
+
+
+def extract_text(
+    path: Union[os.PathLike, IO[bytes]],
+    output: Optional[os.PathLike] = None,
+    progress: bool = True,
+):
+    """
+    Extract the text of a docx, one line per paragraph or table row.
+
+    Returns:
+        The text, or with `output` the path of the file it was streamed to.
+        The file is only replaced once the extraction succeeded.
+    """
+    if output is None:
+        return "\n".join(iter_blocks(path, progress))
+
+    output = os.fspath(output)
+    partial = f"{output}.part"
+    try:
+        with open(partial, "w", encoding="utf-8") as f, span("doc.write"):
+            for block in iter_blocks(path, progress):
+                f.write(block)
+                f.write("\n")
+        os.replace(partial, output)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    return output
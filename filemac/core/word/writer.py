@@ -0,0 +1,165 @@
+"""
+Bulk paragraph writer for Word documents.
+
+Adding paragraphs one by one through python-docx looks up the end of the body
+for every paragraph, which turns quadratic on long documents, and holds the
+whole tree until it is saved. Here paragraphs are rendered to WordprocessingML
+text a chunk at a time and streamed into `word/document.xml` of the package,
+the other parts are copied from the python-docx document, so memory stays flat
+however long the document is:
+
+    write_paragraphs([[Run("Hello "), Run("world", bold=True)]], "out.docx")
+
+A `Styled` paragraph refers to a style of the document instead, so the
+formatting is written once in the styles rather than on every run.
+"""
+
+import io
+import os
+import re
+import zipfile
+from typing import IO, Iterable, List, NamedTuple, Optional, Tuple, Union
+from xml.sax.saxutils import escape, quoteattr
+
+from ...utils.profiler import span
+
+# Paragraphs rendered per write
+PARAGRAPHS_PER_CHUNK = 2000
+
+# Characters XML 1.0 does not allow, they would make the document unreadable
+_INVALID_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+# White text is invisible on a Word page
+_WHITE, _BLACK = "FFFFFF", "000000"
+
+
+class Run(NamedTuple):
+    text: str
+    bold: Optional[bool] = None
+    italic: Optional[bool] = None
+    # Word underline style, e.g. `single`; None keeps the default
+    underline: Optional[str] = None
+    font: Optional[str] = None
+    # Points
+    size: Optional[float] = None
+    # RRGGBB
+    color: Optional[str] = None
+
+
+Paragraph = List[Run]
+
+
+class Styled(NamedTuple):
+    # Style id, e.g. `Heading1`
+    style: str
+    runs: Paragraph
+
+
+def _run_xml(run: Run) -> str:
+    props = []
+    if run.font:
+        font = quoteattr(run.font)
+        props.append(f"<w:rFonts w:ascii={font} w:hAnsi={font}/>")
+    if run.bold is not None:
+        props.append("<w:b/>" if run.bold else '<w:b w:val="0"/>')
+    if run.italic is not None:
+        props.append("<w:i/>" if run.italic else '<w:i w:val="0"/>')
+    if run.color:
+        color = _BLACK if run.color == _WHITE else run.color
+        props.append(f'<w:color w:val="{color}"/>')
+    if run.size:
+        # Word sizes are in half points
+        props.append(f'<w:sz w:val="{round(run.size * 2)}"/>')
+    if run.underline is not None:
+        props.append(f'<w:u w:val="{run.underline}"/>')
+    props = f"<w:rPr>{''.join(props)}</w:rPr>" if props else ""
+    text = escape(_INVALID_XML.sub("", run.text))
+    return f'<w:r>{props}<w:t xml:space="preserve">{text}</w:t></w:r>'
+
+
+def _paragraph_xml(paragraph: Union[Paragraph, Styled], props: str) -> str:
+    if isinstance(paragraph, Styled):
+        props = f"<w:pPr><w:pStyle w:val={quoteattr(paragraph.style)}/></w:pPr>"
+        paragraph = paragraph.runs
+    runs = "".join(_run_xml(run) for run in paragraph if run.text)
+    return f"<w:p>{props}{runs}</w:p>"
+
+
+def _document_xml(document) -> Tuple[bytes, bytes]:
+    """The main part of `document` split where paragraphs are appended."""
+    from lxml import etree
+
+    xml = etree.tostring(document.element, encoding="UTF-8", standalone=True)
+    # The section properties of the body close it, nested ones come before
+    end = xml.rfind(b"<w:sectPr")
+    if document.element.body.sectPr is None or end < 0:
+        end = xml.rfind(b"</w:body>")
+    return xml[:end], xml[end:]
+
+
+def _write_package(
+    document, paragraphs: Iterable[Union[Paragraph, Styled]], f: IO[bytes], props: str
+) -> None:
+    head, tail = _document_xml(document)
+    name = document.part.partname.lstrip("/")
+    template = io.BytesIO()
+    document.save(template)
+    with zipfile.ZipFile(template) as source, zipfile.ZipFile(
+        f, "w", zipfile.ZIP_DEFLATED
+    ) as package:
+        for info in source.infolist():
+            if info.filename != name:
+                package.writestr(info, source.read(info))
+                continue
+            part = zipfile.ZipInfo(name, info.date_time)
+            part.compress_type = zipfile.ZIP_DEFLATED
+            with package.open(part, "w") as stream:
+                stream.write(head)
+                pending: List[str] = []
+                for paragraph in paragraphs:
+                    pending.append(_paragraph_xml(paragraph, props))
+                    if len(pending) >= PARAGRAPHS_PER_CHUNK:
+                        stream.write("".join(pending).encode("utf-8"))
+                        pending = []
+                stream.write("".join(pending).encode("utf-8"))
+                stream.write(tail)
+
+
+def write_paragraphs(
+    paragraphs: Iterable[Union[Paragraph, Styled]],
+    output: Union[os.PathLike, IO[bytes]],
+    props: str = "",
+    document=None,
+):
+    """
+    Write `paragraphs` as a Word document.
+
+    Args:
+        output: docx path, only replaced once the document is complete, or a
+            binary file object.
+        props: `<w:pPr>` markup given to every paragraph that is not `Styled`.
+        document: python-docx Document the paragraphs are appended to, e.g.
+            one with its styles set up; a new one by default. It is left
+            unchanged.
+
+    Returns:
+        `output`.
+    """
+    if document is None:
+        from docx import Document
+
+        document = Document()
+    if not isinstance(output, (str, os.PathLike)):
+        with span("doc.write"):
+            _write_package(document, paragraphs, output, props)
+        return output
+    output = os.fspath(output)
+    partial = f"{output}.part"
+    try:
+        with open(partial, "wb") as f, span("doc.write"):
+            _write_package(document, paragraphs, f, props)
+        os.replace(partial, output)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    return output
@@ -0,0 +1,363 @@
+"""
+Content-addressed conversion cache.
+
+Entries are keyed by the sha256 of the input file content plus its extension,
+the operation name and its parameters, so renaming or copying an input still
+hits while any edit misses. An entry holds the produced files (named relative
+to the input's stem, so identical content under another name restores under
+that name) and an optional json value, e.g. OCR text.
+
+Layout::
+
+    CACHE_DIR/cache/<key[:2]>/<key>/meta.json
+    CACHE_DIR/cache/<key[:2]>/<key>/<output files>
+
+Outputs are served as copies (a reflink where the filesystem supports one), so
+editing a restored output never reaches the cache entry. Only the files a
+conversion returns are stored, nothing when it failed. The total size is
+capped (FILEMAC_CACHE_SIZE in MB, default 1024); least recently
+used entries, tracked by the entry directory mtime, are evicted first.
+
+The cache is disabled with `--no-cache` or FILEMAC_NO_CACHE=1.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+
+from .config import CACHE_DIR
+from .simple import logger
+
+CACHE_ROOT = Path(os.environ.get("FILEMAC_CACHE_ROOT", CACHE_DIR / "cache"))
+DEFAULT_MAX_SIZE = int(os.environ.get("FILEMAC_CACHE_SIZE", 1024)) * 1024 * 1024
+
+# Bumped whenever the entry layout changes
+_SCHEMA = 1
+_CHUNK = 1 << 20
+_META = "meta.json"
+_STATS = "stats.json"
+
+
+def set_cache_enabled(enabled: bool) -> None:
+    """Toggle the cache for this process and any worker it spawns."""
+    if enabled:
+        os.environ.pop("FILEMAC_NO_CACHE", None)
+    else:
+        os.environ["FILEMAC_NO_CACHE"] = "1"
+
+
+def cache_enabled() -> bool:
+    return os.environ.get("FILEMAC_NO_CACHE", "") in ("", "0")
+
+
+def file_digest(path: os.PathLike) -> str:
+    """Return the sha256 hex digest of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _stem_of(path: os.PathLike) -> str:
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+# ioctl cloning a whole file on Linux (btrfs, xfs), see ioctl_ficlone(2)
+_FICLONE = 0x40049409
+
+
+def _clone(src: os.PathLike, dest: os.PathLike) -> bool:
+    """Reflink `src` to the new file `dest`, False when it is not supported."""
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    try:
+        with open(src, "rb") as s, open(dest, "wb") as d:
+            fcntl.ioctl(d.fileno(), _FICLONE, s.fileno())
+    except OSError:
+        return False
+    shutil.copystat(src, dest)
+    return True
+
+
+def _restore(src: os.PathLike, dest: os.PathLike) -> None:
+    """
+    Atomically place a copy of `src` at `dest`. Never a hardlink: an edit of
+    the output would change the cache entry with it.
+    """
+    tmp = f"{dest}.{uuid.uuid4().hex[:8]}.tmp"
+    try:
+        if not _clone(src, tmp):
+            shutil.copy2(src, tmp)
+        os.replace(tmp, dest)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class ConversionCache:
+    """
+    Store and restore conversion outputs keyed by input content.
+
+    Args:
+        root: cache directory, defaults to CACHE_DIR/cache.
+        max_size: size cap in bytes, entries are evicted LRU beyond it.
+    """
+
+    def __init__(
+        self, root: Optional[os.PathLike] = None, max_size: int = DEFAULT_MAX_SIZE
+    ):
+        self.root = Path(root or CACHE_ROOT)
+        self.max_size = max_size
+
+    def key(self, source: os.PathLike, op: str, params: Optional[dict] = None) -> str:
+        """Build the cache key of running `op` with `params` over `source`."""
+        from .. import __version__
+
+        # The extension picks the converter: the same bytes as .txt and as
+        # .docx are different conversions
+        ext = os.path.splitext(source)[1].lower()
+        ident = json.dumps(
+            [_SCHEMA, __version__, op, params or {}, ext, file_digest(source)],
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(ident.encode()).hexdigest()
+
+    def _entry(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def lookup(self, key: str, source: os.PathLike) -> Optional[Tuple[Any, List[str]]]:
+        """
+        Restore the outputs of `key` next to `source`.
+
+        Returns:
+            (value, restored paths) on a hit, None on a miss.
+        """
+        entry = self._entry(key)
+        try:
+            with open(entry / _META, encoding="utf-8") as f:
+                meta = json.load(f)
+            stem = _stem_of(source)
+            dest_dir = os.path.dirname(os.path.abspath(source))
+            restored = []
+            for suffix, size in meta["files"]:
+                cached = entry / suffix
+                if cached.stat().st_size != size:
+                    raise OSError(f"corrupt cache entry {entry}")
+                dest = os.path.join(dest_dir, stem + suffix)
+                _restore(cached, dest)
+                restored.append(dest)
+            # Mark as recently used
+            os.utime(entry)
+        except FileNotFoundError:
+            self._count("misses")
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            logger.debug(f"cache: dropping {key}: {e}")
+            shutil.rmtree(entry, ignore_errors=True)
+            self._count("misses")
+            return None
+        self._count("hits")
+        return meta.get("value"), restored
+
+    def store(
+        self,
+        key: str,
+        source: os.PathLike,
+        outputs: Iterable[os.PathLike] = (),
+        value: Any = None,
+    ) -> None:
+        """Save `outputs` (files produced from `source`) and `value` under `key`."""
+        entry = self._entry(key)
+        if entry.exists():
+            return
+        stem = _stem_of(source)
+        tmp = self.root / f".tmp-{uuid.uuid4().hex}"
+        try:
+            tmp.mkdir(parents=True)
+            files = []
+            for output in outputs:
+                name = os.path.basename(output)
+                if not name.startswith(stem):
+                    continue
+                suffix = name[len(stem) :]
+                # Copy rather than link, later edits of the output must not
+                # leak into the cache
+                shutil.copy2(output, tmp / suffix)
+                files.append((suffix, os.path.getsize(tmp / suffix)))
+            with open(tmp / _META, "w", encoding="utf-8") as f:
+                json.dump({"files": files, "value": value, "created": time.time()}, f)
+            entry.parent.mkdir(parents=True, exist_ok=True)
+            os.rename(tmp, entry)
+        except OSError as e:
+            # Lost a race with another process storing the same key, or the
+            # disk is full; either way the conversion itself succeeded.
+            logger.debug(f"cache: not storing {key}: {e}")
+            shutil.rmtree(tmp, ignore_errors=True)
+            return
+        self.evict()
+
+    def _entries(self) -> List[Tuple[float, int, Path]]:
+        entries = []
+        if not self.root.exists():
+            return entries
+        for shard in os.scandir(self.root):
+            if not shard.is_dir() or shard.name.startswith("."):
+                continue
+            for entry in os.scandir(shard.path):
+                try:
+                    size = sum(f.stat().st_size for f in os.scandir(entry.path))
+                    entries.append((entry.stat().st_mtime, size, Path(entry.path)))
+                except OSError:
+                    continue
+        return entries
+
+    def evict(self) -> int:
+        """Remove least recently used entries beyond the size cap."""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            removed += 1
+        return removed
+
+    def clear(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def _count(self, field: str) -> None:
+        """Best effort hit/miss counters, shared by all processes."""
+        path = self.root / _STATS
+        try:
+            with open(path, encoding="utf-8") as f:
+                counters = json.load(f)
+        except (OSError, ValueError):
+            counters = {}
+        counters[field] = counters.get(field, 0) + 1
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(counters, f)
+            os.replace(tmp, path)
+        except OSError:
+            pass
+
+    def stats(self) -> dict:
+        entries = self._entries()
+        try:
+            with open(self.root / _STATS, encoding="utf-8") as f:
+                counters = json.load(f)
+        except (OSError, ValueError):
+            counters = {}
+        return {
+            "location": str(self.root),
+            "entries": len(entries),
+            "size": sum(size for _, size, _ in entries),
+            "max_size": self.max_size,
+            "hits": counters.get("hits", 0),
+            "misses": counters.get("misses", 0),
+        }
+
+
+def reported_outputs(value: Any) -> List[str]:
+    """
+    The files a converter returned, a path or a list of paths, that exist.
+    Converters log their failures and return None or an empty list.
+    """
+    if isinstance(value, (str, os.PathLike)):
+        value = [value]
+    elif not isinstance(value, (list, tuple)):
+        return []
+    return [
+        os.fspath(path)
+        for path in value
+        if isinstance(path, (str, os.PathLike)) and os.path.isfile(path)
+    ]
+
+
+def _belongs(source: os.PathLike, output: str) -> bool:
+    """True for an output restorable next to `source`, named after its stem."""
+    same_dir = os.path.dirname(os.path.abspath(output)) == os.path.dirname(
+        os.path.abspath(source)
+    )
+    return same_dir and os.path.basename(output).startswith(_stem_of(source))
+
+
+def cached_conversion(
+    source: os.PathLike, op: str, produce: Callable[[], Any], params: dict = None
+) -> List[str]:
+    """
+    Run `produce()`, which writes its outputs next to `source` and returns
+    them, through the cache. On a hit the previous outputs are restored
+    instead.
+
+    Returns:
+        The output paths, restored or freshly produced, [] when the
+        conversion failed.
+    """
+    if not cache_enabled():
+        return reported_outputs(produce())
+    cache = ConversionCache()
+    key = cache.key(source, op, params)
+    hit = cache.lookup(key, source)
+    if hit is not None:
+        logger.info(f"cache hit: {source}")
+        return hit[1]
+
+    # Only what the converter reports is stored: a sibling input converted
+    # at the same time writes next to this one under a similar name
+    outputs = reported_outputs(produce())
+    if outputs and all(_belongs(source, output) for output in outputs):
+        cache.store(key, source, outputs)
+    return outputs
+
+
+def cached_value(
+    source: os.PathLike, op: str, produce: Callable[[], Any], params: dict = None
+) -> Any:
+    """Cache the json serializable return value of `produce()` for `source`."""
+    if not cache_enabled():
+        return produce()
+    cache = ConversionCache()
+    key = cache.key(source, op, params)
+    hit = cache.lookup(key, source)
+    if hit is not None:
+        return hit[0]
+    value = produce()
+    if value:
+        cache.store(key, source, value=value)
+    return value
+
+
+def _human_size(size: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            break
+        size /= 1024
+    return f"{size:.1f} {unit}"
+
+
+def format_stats(stats: dict) -> str:
+    lookups = stats["hits"] + stats["misses"]
+    ratio = f"{stats['hits'] / lookups:.0%}" if lookups else "n/a"
+    return (
+        f"Location : {stats['location']}\n"
+        f"Entries  : {stats['entries']}\n"
+        f"Size     : {_human_size(stats['size'])} / {_human_size(stats['max_size'])}\n"
+        f"Hits     : {stats['hits']}\n"
+        f"Misses   : {stats['misses']}\n"
+        f"Hit ratio: {ratio}"
+    )
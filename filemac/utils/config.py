@@ -9,3 +9,12 @@ CACHE_DIR = BASE_DIR / "tmp/filemac"
 
 # Ensure cache dir exists
 os.makedirs(CACHE_DIR, exist_ok=True)
+
+# Unix socket used by the `filemac serve` worker daemon
+DAEMON_SOCKET = Path(os.environ.get("FILEMAC_SOCKET", CACHE_DIR / "filemac.sock"))
+
+# Pdf library used for text, page and raster operations: auto, pymupdf, pypdf2
+PDF_BACKEND = os.environ.get("FILEMAC_PDF_BACKEND", "auto")
+
+# Conversion costs measured by `python -m filemac.benchmarks.suite --save-costs`
+COSTS_FILE = Path(os.environ.get("FILEMAC_COSTS", CACHE_DIR / "costs.json"))
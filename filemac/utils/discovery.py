@@ -0,0 +1,202 @@
+"""
+Streaming file discovery shared by every directory input.
+
+`discover()` walks the given files and directories with `os.scandir`, so the
+file type comes from the directory entry instead of one stat call per file,
+and yields matching paths as soon as they are found. Conversion of the first
+file can start before a large tree has been fully listed.
+
+Example:
+    >>> for path in discover("docs", extensions=("docx", "pdf"), recursive=True):
+    ...     convert(path)
+"""
+
+import fnmatch
+import os
+from typing import Iterable, Iterator, Optional, Union
+
+from .simple import logger
+
+PathInput = Union[str, os.PathLike, Iterable[Union[str, os.PathLike]]]
+
+# Leading bytes identifying a file type, as (offset, signature) pairs.
+# Office formats share a container: zip for docx/xlsx/pptx/odt, OLE2 for the
+# legacy doc/xls/ppt.
+MAGIC_SIGNATURES = {
+    "pdf": ((0, b"%PDF"),),
+    "png": ((0, b"\x89PNG\r\n\x1a\n"),),
+    "jpeg": ((0, b"\xff\xd8\xff"),),
+    "gif": ((0, b"GIF87a"), (0, b"GIF89a")),
+    "bmp": ((0, b"BM"),),
+    "tiff": ((0, b"II*\x00"), (0, b"MM\x00*")),
+    "webp": ((8, b"WEBP"),),
+    "zip": ((0, b"PK\x03\x04"),),
+    "ole": ((0, b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"),),
+    "wav": ((8, b"WAVE"),),
+    "mp3": ((0, b"ID3"), (0, b"\xff\xfb"), (0, b"\xff\xf3"), (0, b"\xff\xf2")),
+    "ogg": ((0, b"OggS"),),
+    "flac": ((0, b"fLaC"),),
+    "mp4": ((4, b"ftyp"),),
+    "mkv": ((0, b"\x1a\x45\xdf\xa3"),),
+}
+
+# Aliases so callers can ask for the format they think in
+MAGIC_ALIASES = {
+    "jpg": "jpeg",
+    "tif": "tiff",
+    "docx": "zip",
+    "xlsx": "zip",
+    "pptx": "zip",
+    "odt": "zip",
+    "doc": "ole",
+    "xls": "ole",
+    "ppt": "ole",
+    "m4a": "mp4",
+    "mov": "mp4",
+    "webm": "mkv",
+}
+
+_SNIFF_SIZE = 16
+
+
+def _normalize_extensions(extensions: Optional[Iterable[str]]) -> Optional[set]:
+    if extensions is None:
+        return None
+    if isinstance(extensions, str):
+        extensions = (extensions,)
+    return {ext.lower().lstrip(".") for ext in extensions}
+
+
+def _normalize_magic(kinds: Optional[Iterable[str]]) -> Optional[set]:
+    if kinds is None:
+        return None
+    if isinstance(kinds, str):
+        kinds = (kinds,)
+    normalized = set()
+    for kind in kinds:
+        kind = MAGIC_ALIASES.get(kind.lower(), kind.lower())
+        if kind not in MAGIC_SIGNATURES:
+            raise ValueError(f"Unknown file signature: {kind}")
+        normalized.add(kind)
+    return normalized
+
+
+def sniff(path: Union[str, os.PathLike]) -> Optional[str]:
+    """Identify a file from its leading bytes, None when unknown."""
+    try:
+        with open(path, "rb") as f:
+            head = f.read(_SNIFF_SIZE)
+    except OSError:
+        return None
+    for kind, signatures in MAGIC_SIGNATURES.items():
+        for offset, signature in signatures:
+            if head[offset : offset + len(signature)] == signature:
+                return kind
+    return None
+
+
+class _Filter:
+    """Decide whether a file is wanted, cheapest checks first."""
+
+    def __init__(self, extensions, magic, patterns, ignore):
+        self.extensions = _normalize_extensions(extensions)
+        self.magic = _normalize_magic(magic)
+        self.patterns = tuple(patterns or ())
+        self.ignore = tuple(ignore or ())
+
+    def ignored(self, name: str, relpath: str) -> bool:
+        return any(
+            fnmatch.fnmatch(name, pat) or fnmatch.fnmatch(relpath, pat)
+            for pat in self.ignore
+        )
+
+    def wanted(self, name: str, path: str) -> bool:
+        if self.patterns and not any(
+            fnmatch.fnmatch(name, pat) for pat in self.patterns
+        ):
+            return False
+        if self.extensions is None and self.magic is None:
+            return True
+        if self.extensions is not None:
+            ext = name.rsplit(".", 1)[-1].lower() if "." in name else ""
+            if ext in self.extensions:
+                return True
+        # Only open the file when the extension did not already decide
+        return self.magic is not None and sniff(path) in self.magic
+
+
+def _as_list(paths: PathInput) -> list:
+    if isinstance(paths, (str, os.PathLike)):
+        return [paths]
+    return list(paths)
+
+
+def discover(
+    paths: PathInput,
+    extensions: Optional[Iterable[str]] = None,
+    magic: Optional[Iterable[str]] = None,
+    patterns: Optional[Iterable[str]] = None,
+    recursive: bool = False,
+    ignore: Optional[Iterable[str]] = None,
+    follow_symlinks: bool = False,
+) -> Iterator[str]:
+    """
+    Yield the files found under `paths`.
+
+    Args:
+        paths: a file, a directory or a list of them. Files are checked
+            against the filters like discovered ones.
+        extensions: accepted extensions, case insensitive, dot optional.
+        magic: accepted file signatures (see MAGIC_SIGNATURES), a file
+            passes when either its extension or its leading bytes match.
+        patterns: fnmatch patterns the file name must match.
+        recursive: descend into sub directories.
+        ignore: fnmatch patterns matched against names and paths relative to
+            the walked directory; matching directories are not entered.
+        follow_symlinks: descend into symlinked directories.
+
+    Yields:
+        Paths as strings, in directory order.
+    """
+    filters = _Filter(extensions, magic, patterns, ignore)
+
+    for path in _as_list(paths):
+        path = os.fspath(path)
+        if os.path.isdir(path):
+            yield from _scan(path, filters, recursive, follow_symlinks)
+        elif os.path.isfile(path):
+            if filters.wanted(os.path.basename(path), path):
+                yield path
+        else:
+            logger.warning(f"No such file or directory: {path}")
+
+
+def _scan(root: str, filters: _Filter, recursive: bool, follow_symlinks: bool):
+    # Explicit stack, deep trees must not hit the recursion limit
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                subdirs = []
+                for entry in entries:
+                    if filters.ignore and filters.ignored(
+                        entry.name, os.path.relpath(entry.path, root)
+                    ):
+                        continue
+                    try:
+                        if entry.is_file():
+                            if filters.wanted(entry.name, entry.path):
+                                yield entry.path
+                        elif recursive and entry.is_dir(
+                            follow_symlinks=follow_symlinks
+                        ):
+                            subdirs.append(entry.path)
+                    except OSError:
+                        # Vanished or unreadable entry, keep walking
+                        continue
+        except (PermissionError, FileNotFoundError, NotADirectoryError) as e:
+            logger.warning(f"Skipping {directory}: {e}")
+            continue
+        # Reversed so sub directories are visited in directory order
+        stack.extend(reversed(subdirs))
@@ -0,0 +1,556 @@
+"""
+Shared batch executor for per-file operations.
+
+Every converter that loops over a list of files submits its per-file work
+here instead of iterating itself. The number of worker processes is a global
+setting driven by the `--jobs` cli flag (or FILEMAC_JOBS); with one job the
+work runs inline, exactly like a plain for loop.
+
+Guarantees:
+    - results are returned in input order whatever the completion order
+    - a failure (exception or sys.exit) in one file never aborts the others
+    - a single combined progress bar is shown for the whole batch, work
+      inside an item can add a line to it with `item_progress`
+    - with a `cost` estimator, jobs are only admitted while their estimated
+      memory fits the budget (`--memory-budget`); lighter jobs queued behind
+      a heavy one still fill idle workers
+"""
+
+import contextlib
+import itertools
+import os
+import pickle
+import queue
+import traceback
+from collections import deque
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+
+from rich.progress import Progress
+
+from . import profiler
+from .colors import fg, rs
+from .simple import logger
+
+RESET = rs
+
+_settings = {"jobs": None, "in_worker": False, "memory_budget": None}
+
+# Seconds merge_streams waits on its queue before checking the workers
+_POLL_S = 1.0
+
+# Batches currently running in this process. Nested batches (a directory
+# batch calling a converter that batches again) run inline and silently.
+_active = []
+
+
+def set_jobs(jobs: Optional[int]) -> None:
+    """Set the global worker count. 0 means one worker per cpu core."""
+    if jobs is not None and jobs < 0:
+        raise ValueError("jobs must be >= 0")
+    _settings["jobs"] = jobs
+
+
+def get_jobs() -> int:
+    """Return the effective worker count."""
+    if _settings["in_worker"]:
+        # Nested batches inside a worker run inline, the pool is already busy
+        return 1
+    jobs = _settings["jobs"]
+    if jobs is None:
+        jobs = int(os.environ.get("FILEMAC_JOBS", 1) or 1)
+    return jobs or os.cpu_count() or 1
+
+
+def set_memory_budget(budget: Optional[int]) -> None:
+    """Set the memory budget in bytes for batches with a cost estimator."""
+    if budget is not None and budget <= 0:
+        raise ValueError("memory budget must be > 0")
+    _settings["memory_budget"] = budget
+
+
+def get_memory_budget() -> Optional[int]:
+    """Return the effective memory budget in bytes, None when unknown."""
+    if _settings["memory_budget"] is not None:
+        return _settings["memory_budget"]
+    from .memory import default_budget
+
+    return default_budget()
+
+
+def in_batch() -> bool:
+    """True while running as an item of a batch, in this or a worker process."""
+    return bool(_active) or _settings["in_worker"]
+
+
+@contextlib.contextmanager
+def item_progress(desc: str, total: Optional[int] = None, enabled: bool = True):
+    """
+    Progress of the work inside one item, e.g. the rows of a spreadsheet.
+
+    Shown as an extra line under the bar of the running batch, or as a bar of
+    its own outside a batch. Nothing is shown in worker processes. Yields an
+    `advance(n)` callable; call it for chunks of work rather than every unit,
+    each call redraws the bar.
+    """
+    bar = own = None
+    if enabled and not _settings["in_worker"]:
+        if not _active:
+            bar = own = Progress(auto_refresh=False, transient=True)
+        elif not any(batch.parallel for batch in _active):
+            bar = next((batch.bar for batch in _active if batch.bar), None)
+    if bar is None:
+        yield lambda n=1: None
+        return
+
+    task = bar.add_task(f"[cyan]{desc}", total=total)
+
+    def advance(n: int = 1) -> None:
+        bar.update(task, advance=n)
+        bar.refresh()
+
+    if own:
+        bar.start()
+    try:
+        yield advance
+    finally:
+        if own:
+            bar.stop()
+        else:
+            bar.remove_task(task)
+            bar.refresh()
+
+
+def counted(
+    lines: Iterable[str], advance: Callable[[int], None], step: int = 1 << 20
+) -> Iterator[str]:
+    """
+    Yield `lines`, reporting their characters to an `item_progress` advance
+    once every `step` characters rather than for every line.
+    """
+    pending = 0
+    for line in lines:
+        pending += len(line)
+        if pending >= step:
+            advance(pending)
+            pending = 0
+        yield line
+    advance(pending)
+
+
+def fan_out_jobs(work: int, threshold: int) -> int:
+    """
+    Workers for splitting the work of a single item, e.g. the pages of a pdf.
+
+    Inside a parallel batch the cores are already busy and the item runs
+    inline. Otherwise an explicit `--jobs` is honoured, and without one
+    `work` units of at least `threshold` use every core.
+    """
+    if _settings["in_worker"] or any(batch.parallel for batch in _active):
+        return 1
+    if _settings["jobs"] is not None or os.environ.get("FILEMAC_JOBS"):
+        return get_jobs()
+    if work < threshold:
+        return 1
+    return os.cpu_count() or 1
+
+
+def _worker_init(settings: dict) -> None:
+    from multiprocessing.util import Finalize
+
+    _settings.update(settings, in_worker=True)
+    # Forked workers inherit the parent's recorded spans, start empty
+    profiler.drain()
+    Finalize(None, _worker_exit, exitpriority=0)
+
+
+def _worker_exit() -> None:
+    # Pool workers leave through os._exit and skip the atexit hooks, still
+    # stop their LibreOffice instances and remove their workspaces
+    from . import office, workspace
+
+    office.shutdown()
+    workspace.cleanup_live()
+
+
+class JobResult:
+    """Outcome of one item in a batch."""
+
+    __slots__ = ("item", "value", "error")
+
+    def __init__(self, item, value=None, error: Optional[str] = None):
+        self.item = item
+        self.value = value
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def __repr__(self):
+        state = "ok" if self.ok else f"error={self.error!r}"
+        return f"JobResult({self.item!r}, {state})"
+
+
+def _interrupted(exc: Optional[BaseException]) -> bool:
+    """Whether `exc` was raised while handling Ctrl+C."""
+    while exc is not None:
+        if isinstance(exc, KeyboardInterrupt):
+            return True
+        exc = exc.__context__
+    return False
+
+
+def _invoke(func: Callable, item, args: tuple, kwargs: dict):
+    """
+    Run one item, converting failures into data so siblings keep going.
+
+    Ctrl+C aborts the whole batch instead, also when the converter turned
+    it into `sys.exit()`.
+    """
+    try:
+        with profiler.span("batch.item", item=item):
+            return func(item, *args, **kwargs), None
+    except KeyboardInterrupt:
+        raise
+    except SystemExit as e:
+        if _interrupted(e.__context__):
+            raise KeyboardInterrupt from e
+        if e.code in (None, 0):
+            return None, None
+        return None, f"exited with status {e.code}"
+    except Exception as e:
+        logger.debug(traceback.format_exc())
+        return None, f"{type(e).__name__}: {e}"
+
+
+def _call_in_worker(func: Callable, item):
+    return func(item), profiler.drain() if profiler.enabled() else None
+
+
+def _invoke_in_worker(func: Callable, item, args: tuple, kwargs: dict):
+    """`_invoke` plus the spans recorded in the worker, merged by the parent."""
+    value, error = _invoke(func, item, args, kwargs)
+    return value, error, profiler.drain() if profiler.enabled() else None
+
+
+class BatchExecutor:
+    """
+    Run a function over many items, in parallel when `--jobs` > 1.
+
+    Args:
+        jobs: worker processes, defaults to the global `--jobs` setting.
+        desc: label of the progress bar.
+        progress: show the combined progress bar.
+        on_result: called with each JobResult as soon as it completes, in
+            completion order, e.g. to checkpoint progress.
+        cost: estimate in bytes of the memory one item needs, see
+            `memory.cost_of`. Without it every item is assumed to fit.
+        memory_budget: bytes the running items may use together, defaults to
+            the global `--memory-budget` setting.
+    """
+
+    def __init__(
+        self,
+        jobs: Optional[int] = None,
+        desc: str = "Processing",
+        progress: bool = True,
+        on_result: Optional[Callable[[JobResult], None]] = None,
+        cost: Optional[Callable[[Any], int]] = None,
+        memory_budget: Optional[int] = None,
+    ):
+        self.jobs = jobs if jobs is not None else get_jobs()
+        self.desc = desc
+        self.progress = progress
+        self.on_result = on_result
+        self.cost = cost
+        self.memory_budget = memory_budget
+        # Set while items run in worker processes
+        self.parallel = False
+        # The displayed progress bar, items running inline may add a line
+        self.bar = None
+
+    def map(
+        self, func: Callable, items: Iterable[Any], *args, **kwargs
+    ) -> List[JobResult]:
+        """
+        Apply `func(item, *args, **kwargs)` to every item.
+
+        `func` must be picklable (module level function or bound method) when
+        more than one job is used. `items` may be a lazy iterable, work is
+        submitted as items are produced.
+        """
+        total = len(items) if hasattr(items, "__len__") else None
+        nested = bool(_active) or _settings["in_worker"]
+        show = self.progress and not nested
+
+        _active.append(self)
+        try:
+            with Progress(auto_refresh=False, disable=not show) as progress:
+                task = progress.add_task(f"[cyan]{self.desc}", total=total)
+                self.bar = progress if show else None
+
+                def advance(result):
+                    if self.on_result is not None:
+                        self.on_result(result)
+                    progress.update(task, advance=1)
+                    progress.refresh()
+
+                if self.jobs <= 1 or total == 1 or nested:
+                    results = self._run_inline(func, items, args, kwargs, advance)
+                else:
+                    self.parallel = True
+                    results = self._run_pool(func, items, args, kwargs, advance)
+        finally:
+            self.parallel = False
+            self.bar = None
+            _active.remove(self)
+
+        self._report(results)
+        return results
+
+    @staticmethod
+    def _run_inline(func, items, args, kwargs, advance) -> List[JobResult]:
+        results = []
+        for item in items:
+            value, error = _invoke(func, item, args, kwargs)
+            results.append(JobResult(item, value, error))
+            advance(results[-1])
+        return results
+
+    def _estimate(self, item) -> int:
+        try:
+            return max(0, int(self.cost(item)))
+        except Exception as e:
+            logger.debug(f"Memory estimate failed for {item}: {e}")
+            return 0
+
+    def _run_pool(self, func, items, args, kwargs, advance) -> List[JobResult]:
+        from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+        results = {}
+        # Bound the number of queued items so huge or lazy inputs stream
+        window = self.jobs * 2
+        source = iter(enumerate(items))
+        budget = None
+        if self.cost is not None:
+            budget = self.memory_budget or get_memory_budget()
+        # (index, item, estimated bytes) waiting for a worker and the budget
+        waiting = deque()
+        in_use = 0
+        # Times the head of the waiting list was overtaken by a lighter item
+        skipped = 0
+
+        def fill():
+            for index, item in itertools.islice(source, window - len(waiting)):
+                size = self._estimate(item) if budget else 0
+                waiting.append((index, item, size))
+
+        def admit():
+            nonlocal in_use, skipped
+            fill()
+            while waiting and len(pending) < self.jobs:
+                if budget is None:
+                    chosen = 0
+                else:
+                    # A heavy head must not starve forever, after a window of
+                    # lighter items overtook it nothing else is admitted
+                    candidates = range(1 if skipped >= window else len(waiting))
+                    chosen = next(
+                        (
+                            i
+                            for i in candidates
+                            # An idle pool always takes the job, even when
+                            # it alone exceeds the budget
+                            if not pending or in_use + waiting[i][2] <= budget
+                        ),
+                        None,
+                    )
+                    if chosen is None:
+                        return
+                    skipped = skipped + 1 if chosen else 0
+                index, item, size = waiting[chosen]
+                del waiting[chosen]
+                in_use += size
+                future = pool.submit(_invoke_in_worker, func, item, args, kwargs)
+                pending[future] = (index, item, size)
+                fill()
+
+        pool = ProcessPoolExecutor(
+            max_workers=self.jobs,
+            initializer=_worker_init,
+            initargs=(dict(_settings),),
+        )
+        pending = {}
+        try:
+            admit()
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, item, size = pending.pop(future)
+                    in_use -= size
+                    try:
+                        value, error, events = future.result()
+                        profiler.merge(events)
+                    except Exception as e:  # e.g. the worker process crashed
+                        value, error = None, f"{type(e).__name__}: {e}"
+                    results[index] = JobResult(item, value, error)
+                    advance(results[index])
+                admit()
+        finally:
+            # Also reached on Ctrl+C or a failing callback: cancel what is
+            # queued and do not wait for the items still running
+            pool.shutdown(wait=not pending, cancel_futures=True)
+        return [results[index] for index in sorted(results)]
+
+    @staticmethod
+    def _report(results: List[JobResult]) -> None:
+        failed = [result for result in results if not result.ok]
+        for result in failed:
+            logger.error(f"{fg.RED}{result.item}{RESET}: {result.error}")
+        if failed:
+            print(f"{fg.BYELLOW}{len(failed)}/{len(results)} item(s) failed{RESET}")
+
+
+def run_batch(
+    func: Callable,
+    items: Iterable[Any],
+    *args,
+    desc: str = "Processing",
+    cost: Optional[Callable[[Any], int]] = None,
+    **kwargs,
+) -> List[Any]:
+    """Convenience wrapper returning only the values of successful items."""
+    results = BatchExecutor(desc=desc, cost=cost).map(func, items, *args, **kwargs)
+    return [result.value for result in results if result.ok]
+
+
+def ordered_map(func: Callable, items: Iterable[Any], jobs: int) -> Iterator[Any]:
+    """
+    Yield `func(item)` for every item in input order, computed by `jobs`
+    worker processes with a bounded number of items in flight.
+
+    Unlike BatchExecutor an exception aborts the whole map, it is meant for
+    the parts of one item (page ranges of a pdf) that stream into one output.
+    """
+    if jobs <= 1:
+        for item in items:
+            yield func(item)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    source = iter(items)
+    pool = ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_worker_init,
+        initargs=(dict(_settings),),
+    )
+    try:
+        pending = deque(
+            pool.submit(_call_in_worker, func, item)
+            for item in itertools.islice(source, jobs * 2)
+        )
+        while pending:
+            value, events = pending.popleft().result()
+            profiler.merge(events)
+            for item in itertools.islice(source, 1):
+                pending.append(pool.submit(_call_in_worker, func, item))
+            yield value
+    finally:
+        # Also reached when the consumer stops early or fails
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _stream_worker(func: Callable, tasks, out, settings: dict) -> None:
+    _worker_init(settings)
+    while True:
+        item = tasks.get()
+        if item is None:
+            out.put(("done", None, None))
+            return
+        try:
+            for value in func(item):
+                out.put(("value", item, value))
+        except BaseException as e:
+            try:
+                pickle.dumps(e)
+            except Exception:
+                e = RuntimeError(f"{type(e).__name__}: {e}")
+            out.put(("error", item, e))
+            return
+
+
+def _lost_workers(workers: list, finished: int) -> list:
+    """Workers that exited without reporting they were done."""
+    dead = [worker for worker in workers if worker.exitcode is not None]
+    if len(dead) > finished or any(worker.exitcode for worker in dead):
+        return dead
+    return []
+
+
+def merge_streams(
+    func: Callable, items: Iterable[Any], jobs: int, buffer: int = 4
+) -> Iterator[Tuple[Any, Any]]:
+    """
+    Yield `(item, value)` for every value of the generator `func(item)`, the
+    items being read by `jobs` worker processes.
+
+    Values of one item arrive in order, values of different items interleave.
+    Meant for many producers feeding a single consumer, e.g. workbooks loaded
+    into one database. At most `buffer` values per worker wait in the queue,
+    so fast producers block rather than fill memory. Like `ordered_map`, an
+    exception in a worker aborts the whole stream, and so does a worker that
+    dies (killed, crashed) before it is done.
+    """
+    items = list(items)
+    if jobs <= 1 or len(items) <= 1:
+        for item in items:
+            for value in func(item):
+                yield item, value
+        return
+
+    import multiprocessing
+
+    jobs = min(jobs, len(items))
+    tasks = multiprocessing.Queue()
+    out = multiprocessing.Queue(maxsize=jobs * buffer)
+    for item in items + [None] * jobs:
+        tasks.put(item)
+    workers = [
+        multiprocessing.Process(
+            target=_stream_worker,
+            args=(func, tasks, out, dict(_settings)),
+            daemon=True,
+        )
+        for _ in range(jobs)
+    ]
+    for worker in workers:
+        worker.start()
+    try:
+        running = jobs
+        lost = []
+        while running:
+            try:
+                kind, item, value = out.get(timeout=_POLL_S)
+            except queue.Empty:
+                # Checked on two polls, what a worker sent before it exited
+                # is readable by the second
+                if lost:
+                    codes = ", ".join(str(worker.exitcode) for worker in lost)
+                    raise RuntimeError(f"a stream worker died (exit codes {codes})")
+                lost = _lost_workers(workers, jobs - running)
+                continue
+            lost = []
+            if kind == "done":
+                running -= 1
+            elif kind == "error":
+                raise value
+            else:
+                yield item, value
+    finally:
+        # Also reached when the consumer stops early or fails
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+            worker.join()
+        tasks.cancel_join_thread()
@@ -2,7 +2,6 @@
 File utility functions for filemac.
 """
 
-import fnmatch
 import os
 import shutil
 import tempfile
@@ -16,29 +15,11 @@ from tqdm.auto import tqdm
 from ..core.exceptions import FileSystemError
 from .colors import OutputFormater as OF
 from .config import OUTPUT_DIR
+from .discovery import discover
 from .formats import SUPPORTED_IMAGE_FORMATS
 from .simple import logger
 
 
-def dirbuster(_dir_):
-    try:
-        target = []
-        for root, dirs, files in os.walk(_dir_):
-            for file in files:
-                ext = file.split(".")[-1]
-
-                _path_ = os.path.join(root, file)
-                if os.path.exists(_path_) and ext.lower() in ("pdf", "doc", "docx"):
-                    target.append(_path_)
-        return target
-    except FileNotFoundError as e:
-        print(e)
-
-    except KeyboardInterrupt:
-        print("\nQuit!")
-        return
-
-
 def generate_filename(ext, basedir=OUTPUT_DIR, postfix="filemac") -> Path:
     """
     Generate Filename given its extension
@@ -70,21 +51,16 @@ class FileSystemHandler:
                 path_obj = Path(path).expanduser().resolve()
                 if not path_obj.exists():
                     continue
-                if recursive:
-                    for file in tqdm(
-                        path_obj.rglob("*"), desc="Searching", leave=False
-                    ):
-                        if file.is_file() and any(
-                            fnmatch.fnmatch(file.name, pat) for pat in patterns
-                        ):
-                            candidates.append(file)
-                else:
-                    for file in tqdm(path_obj.glob("*"), desc="Searching", leave=False):
-                        if file.is_file() and any(
-                            fnmatch.fnmatch(file.name, pat) for pat in patterns
-                        ):
-                            candidates.append(file)
-            return self.ignore_pattern(candidates)
+                # Ignored directories are pruned during the walk
+                found = discover(
+                    path_obj,
+                    patterns=patterns,
+                    recursive=recursive,
+                    ignore=self.ignore,
+                )
+                for file in tqdm(found, desc="Searching", leave=False):
+                    candidates.append(Path(file))
+            return candidates
         except Exception as e:
             raise FileSystemError(e)
 
@@ -203,10 +179,19 @@ class FileSystemHandler:
 class TemporaryFileManager:
     """Manages temporary files with proper cleanup."""
 
-    def __init__(self, prefix: str = "kcleaner_"):
+    def __init__(self, prefix: str = "kcleaner_", root: Optional[os.PathLike] = None):
         self.temp_files = []
         self.temp_dirs = []
         self.prefix = prefix
+        # Directory holding the temporary files, the system default when None
+        self.root = root
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cleanup()
+        return False
 
     def create_temp_file(self, suffix: str, content: str = "") -> Path:
         """Create a temporary file with the given suffix and content."""
@@ -215,6 +200,7 @@ class TemporaryFileManager:
                 mode="w",
                 suffix=suffix,
                 prefix=self.prefix,
+                dir=self.root,
                 encoding="utf-8",
                 delete=False,
             ) as f:
@@ -231,7 +217,7 @@ class TemporaryFileManager:
     def create_temp_dir(self) -> Path:
         """Create a temporary directory."""
         try:
-            temp_dir = Path(tempfile.mkdtemp(prefix=self.prefix))
+            temp_dir = Path(tempfile.mkdtemp(prefix=self.prefix, dir=self.root))
             self.temp_dirs.append(temp_dir)
             return temp_dir
         except OSError as e:
@@ -261,27 +247,21 @@ class DirectoryScanner:
     def __init__(self, input_obj: Optional[Union[str, list[str], os.PathLike]]):
         self.input_obj = input_obj
 
-    def get_dir_files(self):
+    def get_dir_files(self, path=None):
         """
         Get file path list given dir/folder
 
         -------
         Args:
-            path: path to the directory/folder
+            path: path to the directory/folder, defaults to the input object
         Returns:
         -------
             list
         """
-        files = [
-            os.path.join(self.input_obj, f)
-            for f in os.listdir(self.input_obj)
-            if os.path.isfile(os.path.join(self.input_obj, f))
-            and self._is_supported_image(f)
-        ]
+        path = self.input_obj if path is None else path
+        files = list(discover(path, extensions=SUPPORTED_IMAGE_FORMATS.values()))
         if not files:  # Check for empty directory *after* filtering
-            raise FileNotFoundError(
-                f"No supported image files found in: {self.input_obj}"
-            )
+            raise FileNotFoundError(f"No supported image files found in: {path}")
         return files
 
     def _is_supported_image(self, filename: str) -> bool:
@@ -0,0 +1,155 @@
+"""
+Change manifest for incremental directory conversion.
+
+`filemac --convert_doc <dir> -tf <fmt>` keeps a `.filemac_manifest.json` in the
+directory recording, per target format, every converted source (size, mtime,
+sha256) and the outputs it produced. Reruns then behave like make:
+
+    - unchanged sources whose outputs still exist are skipped
+    - sources that were touched but whose content is identical only get their
+      stat refreshed
+    - new or changed sources are converted
+    - outputs of sources that were deleted are removed
+
+Only the stat of each file is read on a rerun, content is hashed when the stat
+changed. Paths are stored relative to the directory so it can be moved.
+"""
+
+import json
+import os
+import time
+from typing import Dict, Iterable, List, Optional
+
+from .cache import file_digest
+from .simple import logger
+
+MANIFEST_NAME = ".filemac_manifest.json"
+_VERSION = 1
+# Checkpoint the manifest while a long batch runs
+_SAVE_INTERVAL = 30
+
+
+class ConversionManifest:
+    """
+    Track converted sources of a directory for one target format.
+
+    Args:
+        directory: root of the converted tree, the manifest lives there.
+        target: output format the records belong to.
+    """
+
+    def __init__(self, directory: os.PathLike, target: str):
+        self.directory = os.path.abspath(directory)
+        self.target = target.lower()
+        self.path = os.path.join(self.directory, MANIFEST_NAME)
+        self._data = self._load()
+        self.records: Dict[str, dict] = self._data["targets"].setdefault(
+            self.target, {}
+        )
+        self._dirty = False
+        self._saved_at = time.monotonic()
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == _VERSION:
+                return data
+            logger.warning(f"Ignoring manifest of version {data.get('version')}")
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable manifest {self.path}: {e}")
+        return {"version": _VERSION, "targets": {}}
+
+    def _rel(self, path: os.PathLike) -> str:
+        return os.path.relpath(os.path.abspath(path), self.directory)
+
+    def _abs(self, rel: str) -> str:
+        return os.path.join(self.directory, rel)
+
+    def outputs(self) -> set:
+        """Relative paths of every recorded output, they are never sources."""
+        return {out for record in self.records.values() for out in record["outputs"]}
+
+    def is_current(self, path: os.PathLike) -> bool:
+        """
+        Return True when `path` was converted before, is unchanged and all its
+        outputs still exist.
+        """
+        record = self.records.get(self._rel(path))
+        if record is None:
+            return False
+        if not all(os.path.exists(self._abs(out)) for out in record["outputs"]):
+            return False
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        if st.st_size != record["size"]:
+            return False
+        if st.st_mtime_ns == record["mtime_ns"]:
+            return True
+        # Touched, only trust the content
+        if file_digest(path) != record["sha256"]:
+            return False
+        record["mtime_ns"] = st.st_mtime_ns
+        self._dirty = True
+        return True
+
+    def record(self, path: os.PathLike, outputs: Iterable[os.PathLike]) -> None:
+        """
+        Remember that `path` was converted into `outputs`. Only call it for a
+        conversion that succeeded, a missing output records nothing.
+        """
+        if not outputs or not all(os.path.isfile(out) for out in outputs):
+            return
+        outputs = [self._rel(out) for out in outputs]
+        st = os.stat(path)
+        self.records[self._rel(path)] = {
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "sha256": file_digest(path),
+            "outputs": outputs,
+        }
+        self._dirty = True
+        if time.monotonic() - self._saved_at > _SAVE_INTERVAL:
+            self.save()
+
+    def prune(self, seen: Optional[Iterable[os.PathLike]] = None) -> List[str]:
+        """
+        Drop records whose source was deleted and remove their outputs.
+
+        Args:
+            seen: sources found by the current walk, records of sources that
+                still exist but were not walked (e.g. filtered out) are kept.
+
+        Returns:
+            The removed output paths.
+        """
+        seen = {self._rel(path) for path in seen} if seen is not None else None
+        removed = []
+        for rel in list(self.records):
+            if (seen is not None and rel in seen) or os.path.exists(self._abs(rel)):
+                continue
+            for out in self.records.pop(rel)["outputs"]:
+                try:
+                    os.remove(self._abs(out))
+                    removed.append(self._abs(out))
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    logger.warning(f"Could not remove stale output {out}: {e}")
+            self._dirty = True
+        return removed
+
+    def save(self) -> None:
+        """Atomically write the manifest if anything changed."""
+        if not self._dirty:
+            return
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._data, f, indent=1)
+        os.replace(tmp, self.path)
+        self._dirty = False
+        self._saved_at = time.monotonic()
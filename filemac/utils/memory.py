@@ -0,0 +1,156 @@
+"""
+Memory estimates and budget for the batch scheduler.
+
+Rasterizing a pdf, stitching a long image or decoding audio with pydub can
+each take gigabytes. The batch executor asks `estimate()` for the expected
+peak of every job and only admits new work while the estimates of the running
+jobs fit the budget, set with `--memory-budget` / FILEMAC_MEMORY_BUDGET and
+defaulting to 70% of the memory available at start.
+
+Estimates are deliberately rough, read from headers only: pdf page counts,
+image dimensions and audio durations scaled by what the decoders allocate.
+"""
+
+import os
+import re
+from typing import Optional
+
+from .simple import logger
+
+MB = 1024 * 1024
+# Interpreter, imported libraries and decoder state of a worker
+BASE_COST = 80 * MB
+# Share of the available memory used when no budget is configured
+DEFAULT_BUDGET_SHARE = 0.7
+
+# A4 page rendered at pdf2image's default 200 dpi, RGB
+_RASTER_DPI = 200
+_PAGE_RASTER = 1654 * 2339 * 3
+# Pages rendered at once by doc to image, see core/pdf/raster.py
+_RASTER_WINDOW = 8
+# Copies of a page the long image holds, see core/pdf/longimage.py
+_LONGIMAGE_COPIES = 4
+# Decoded PCM versus compressed audio (≈ 1411 kbps against 128 kbps)
+_AUDIO_EXPANSION = 11
+_COMPRESSED_AUDIO = {"mp3", "ogg", "m4a", "aac", "flac", "opus", "wma"}
+_IMAGES = {"png", "jpg", "jpeg", "bmp", "gif", "tiff", "tif", "webp"}
+_UNITS = {"": 1, "K": 1024, "M": MB, "G": 1024 * MB, "T": 1024 * 1024 * MB}
+
+
+def parse_size(value: str) -> int:
+    """Parse a size like `512M`, `4G` or `1073741824` into bytes."""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMGT]?)i?B?\s*", str(value), re.I)
+    if not match:
+        raise ValueError(f"Invalid size: {value!r}")
+    return int(float(match.group(1)) * _UNITS[match.group(2).upper()])
+
+
+def available_memory() -> Optional[int]:
+    """Memory available for new work in bytes, None when unknown."""
+    try:
+        with open("/proc/meminfo", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def default_budget() -> Optional[int]:
+    """Budget from FILEMAC_MEMORY_BUDGET, else a share of available memory."""
+    configured = os.environ.get("FILEMAC_MEMORY_BUDGET")
+    if configured:
+        try:
+            return parse_size(configured)
+        except ValueError as e:
+            logger.warning(f"Ignoring FILEMAC_MEMORY_BUDGET: {e}")
+    available = available_memory()
+    return int(available * DEFAULT_BUDGET_SHARE) if available else None
+
+
+def _pdf_pages(path: str) -> int:
+    try:
+        try:
+            import pymupdf
+        except ImportError:  # PyMuPDF < 1.24.3
+            import fitz as pymupdf
+
+        with pymupdf.open(path) as doc:
+            return doc.page_count
+    except Exception:
+        pass
+    try:
+        from PyPDF2 import PdfReader
+
+        return len(PdfReader(path).pages)
+    except Exception:
+        # Unreadable, assume a page per 100KB
+        return max(1, os.path.getsize(path) // (100 * 1024))
+
+
+def _image_pixels(path: str) -> Optional[int]:
+    try:
+        from PIL import Image
+
+        with Image.open(path) as img:  # Reads the header only
+            return img.width * img.height
+    except Exception:
+        return None
+
+
+def estimate(path: os.PathLike, stage: Optional[str] = None) -> int:
+    """
+    Estimate the peak memory in bytes of processing `path`.
+
+    Args:
+        path: the input file.
+        stage: what is done with it. `raster` renders every pdf page,
+            `longimage` additionally stitches them into one image, `audio`
+            decodes to PCM; other stages scale with the file size.
+    """
+    path = os.fspath(path)
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        return BASE_COST
+    ext = path.rsplit(".", 1)[-1].lower() if "." in path else ""
+
+    if stage in ("raster", "longimage") and ext in ("pdf", "doc", "docx", "odt"):
+        if ext == "pdf":
+            pages = _pdf_pages(path)
+        else:
+            # Converted to pdf first, roughly a page per 3KB of compressed text
+            pages = max(1, size // (3 * 1024))
+        # Pages are written as they are rendered, a window at a time; the long
+        # image streams one page at a time, held as rendered, decoded and
+        # filtered rows
+        dpi = int(os.environ.get("FILEMAC_DPI") or _RASTER_DPI)
+        if stage == "longimage":
+            pages = min(pages, _LONGIMAGE_COPIES)
+        else:
+            pages = min(pages, _RASTER_WINDOW)
+        return BASE_COST + int(pages * _PAGE_RASTER * (dpi / _RASTER_DPI) ** 2)
+    if ext in _IMAGES:
+        pixels = _image_pixels(path)
+        if pixels:
+            # Decoded RGBA plus a converted copy
+            return BASE_COST + pixels * 4 * 2
+    if stage == "audio" or ext in _COMPRESSED_AUDIO or ext == "wav":
+        expansion = _AUDIO_EXPANSION if ext in _COMPRESSED_AUDIO else 1
+        # pydub keeps the decoded segment plus the one being exported
+        return BASE_COST + size * expansion * 2
+    # Parsed documents (docx, pptx, xlsx, pdf text) grow several fold in memory
+    return BASE_COST + size * 8
+
+
+def cost_of(stage: Optional[str] = None):
+    """Return an estimator for BatchExecutor(cost=...) bound to `stage`."""
+
+    def cost(item) -> int:
+        return estimate(item, stage)
+
+    return cost
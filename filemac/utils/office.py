@@ -0,0 +1,326 @@
+"""
+Pool of long-lived headless LibreOffice instances.
+
+Starting soffice costs seconds per file, and two soffice processes sharing the
+default user profile cannot run side by side. Conversions go through this
+module instead:
+
+    from ..utils import office
+
+    pdf = office.convert("report.docx", "pdf")
+
+Each pooled instance runs with its own profile in a scratch workspace and
+listens on a private pipe; documents are converted over UNO, so a batch pays
+the startup once per instance. Crashed instances are restarted and the
+conversion retried once; one that takes longer than CONVERT_TIMEOUT is killed
+and restarted for the next file. The pool holds FILEMAC_OFFICE_POOL instances per
+process (1 by default, `--jobs` workers each get their own) and is shut down
+at exit.
+
+When the `uno` bindings of LibreOffice are not importable from this
+interpreter, every conversion runs `soffice --convert-to` with the instance's
+profile: still one launch per file, but batches can run in parallel.
+"""
+
+import atexit
+import functools
+import os
+import queue
+import shutil
+import subprocess
+import threading
+import time
+from typing import Optional
+
+from .simple import logger
+
+# Seconds to wait for a new instance to accept connections
+STARTUP_TIMEOUT = 60
+# Seconds a single conversion may take before the instance is considered hung
+CONVERT_TIMEOUT = 300
+
+_WRITER = {"doc", "docx", "odt", "rtf", "txt", "html", "htm", "wps"}
+_IMPRESS = {"ppt", "pptx", "odp", "pps", "ppsx"}
+_CALC = {"xls", "xlsx", "ods", "csv"}
+
+# (document family, target extension) -> LibreOffice export filter
+FILTERS = {
+    ("writer", "pdf"): "writer_pdf_Export",
+    ("writer", "docx"): "MS Word 2007 XML",
+    ("writer", "doc"): "MS Word 97",
+    ("writer", "odt"): "writer8",
+    ("writer", "txt"): "Text",
+    ("impress", "pdf"): "impress_pdf_Export",
+    ("impress", "pptx"): "Impress MS PowerPoint 2007 XML",
+    ("impress", "odp"): "impress8",
+    ("calc", "pdf"): "calc_pdf_Export",
+    ("calc", "xlsx"): "Calc MS Excel 2007 XML",
+    ("calc", "ods"): "calc8",
+}
+
+
+class OfficeError(RuntimeError):
+    """A LibreOffice conversion failed."""
+
+
+@functools.lru_cache(maxsize=None)
+def soffice_binary() -> Optional[str]:
+    """Path of the soffice executable, looked up once per process."""
+    for name in ("soffice", "libreoffice"):
+        path = shutil.which(name)
+        if path:
+            return path
+    return None
+
+
+def available() -> bool:
+    return soffice_binary() is not None
+
+
+@functools.lru_cache(maxsize=None)
+def _uno():
+    """The LibreOffice python bindings, None when not importable."""
+    try:
+        import uno
+        from com.sun.star.beans import PropertyValue
+    except ImportError:
+        return None
+    return uno, PropertyValue
+
+
+def _family(path: str) -> Optional[str]:
+    ext = os.path.splitext(path)[1][1:].lower()
+    for family, extensions in (
+        ("writer", _WRITER),
+        ("impress", _IMPRESS),
+        ("calc", _CALC),
+    ):
+        if ext in extensions:
+            return family
+    return None
+
+
+class _Instance:
+    """One headless soffice with a private profile."""
+
+    def __init__(self, number: int):
+        from .workspace import Workspace
+
+        self.number = number
+        self.workspace = Workspace("office")
+        self.profile_url = (self.workspace.path / "profile").as_uri()
+        self.pipe = f"filemac_{os.getpid()}_{number}"
+        self.process = None
+        self.desktop = None
+        # Set by the watchdog when it killed a hung conversion
+        self.expired = False
+
+    def _command(self, *args) -> list:
+        return [
+            soffice_binary(),
+            f"-env:UserInstallation={self.profile_url}",
+            "--headless",
+            "--invisible",
+            "--nologo",
+            "--norestore",
+            "--nodefault",
+            "--nolockcheck",
+            *args,
+        ]
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def start(self) -> None:
+        uno, _ = _uno()
+        self.process = subprocess.Popen(
+            self._command(f"--accept=pipe,name={self.pipe};urp;"),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        local = uno.getComponentContext()
+        resolver = local.ServiceManager.createInstanceWithContext(
+            "com.sun.star.bridge.UnoUrlResolver", local
+        )
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while True:
+            try:
+                context = resolver.resolve(
+                    f"uno:pipe,name={self.pipe};urp;StarOffice.ComponentContext"
+                )
+                break
+            except Exception:
+                if not self.alive or time.monotonic() > deadline:
+                    self.stop()
+                    raise OfficeError("LibreOffice did not start")
+                time.sleep(0.25)
+        self.desktop = context.ServiceManager.createInstanceWithContext(
+            "com.sun.star.frame.Desktop", context
+        )
+        logger.debug(f"LibreOffice instance {self.number} listening on {self.pipe}")
+
+    def stop(self) -> None:
+        if self.desktop is not None:
+            try:
+                self.desktop.terminate()
+            except Exception:
+                pass
+            self.desktop = None
+        if self.process is not None:
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+            self.process = None
+
+    def close(self) -> None:
+        self.stop()
+        self.workspace.cleanup()
+
+    def _expire(self) -> None:
+        self.expired = True
+        process = self.process
+        if process is not None:
+            process.kill()
+
+    def convert(self, source: str, target: str, filter_name: str) -> None:
+        if not self.alive:
+            self.start()
+        # UNO calls have no timeout, killing a hung instance fails them
+        watchdog = threading.Timer(CONVERT_TIMEOUT, self._expire)
+        watchdog.daemon = True
+        self.expired = False
+        watchdog.start()
+        try:
+            self._convert(source, target, filter_name)
+        except Exception as e:
+            if not self.expired:
+                raise
+            self.stop()
+            raise OfficeError(
+                f"LibreOffice timed out after {CONVERT_TIMEOUT}s on {source}"
+            ) from e
+        finally:
+            watchdog.cancel()
+
+    def _convert(self, source: str, target: str, filter_name: str) -> None:
+        uno, PropertyValue = _uno()
+
+        def prop(name, value):
+            return PropertyValue(Name=name, Value=value)
+
+        document = self.desktop.loadComponentFromURL(
+            uno.systemPathToFileUrl(source), "_blank", 0, (prop("Hidden", True),)
+        )
+        if document is None:
+            raise OfficeError(f"LibreOffice could not open {source}")
+        try:
+            document.storeToURL(
+                uno.systemPathToFileUrl(target), (prop("FilterName", filter_name),)
+            )
+        finally:
+            document.close(True)
+
+    def convert_cli(self, source: str, target_ext: str, outdir: str) -> None:
+        """One-shot `soffice --convert-to` with this instance's profile."""
+        result = subprocess.run(
+            self._command("--convert-to", target_ext, "--outdir", outdir, source),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            timeout=CONVERT_TIMEOUT,
+        )
+        if result.returncode != 0:
+            raise OfficeError(result.stdout.strip() or f"exit {result.returncode}")
+
+
+class OfficePool:
+    """
+    Fixed set of instances shared by the threads of one process.
+
+    Args:
+        size: number of soffice instances, started lazily on first use.
+    """
+
+    def __init__(self, size: int = 1):
+        self.size = max(1, size)
+        # Every instance, idle or checked out by a thread
+        self._instances = [_Instance(number) for number in range(self.size)]
+        self._idle = queue.Queue()
+        for instance in self._instances:
+            self._idle.put(instance)
+
+    def convert(self, source: os.PathLike, target_ext: str, outdir=None) -> str:
+        """
+        Convert `source` to `target_ext` in `outdir` (default: next to it).
+
+        Returns:
+            Path of the converted file.
+
+        Raises:
+            OfficeError: LibreOffice is missing or the conversion failed.
+        """
+        if not available():
+            raise OfficeError("LibreOffice (soffice) not found on PATH")
+        source = os.path.abspath(source)
+        target_ext = target_ext.lower().lstrip(".")
+        outdir = os.path.abspath(outdir or os.path.dirname(source))
+        stem = os.path.splitext(os.path.basename(source))[0]
+        target = os.path.join(outdir, f"{stem}.{target_ext}")
+        filter_name = FILTERS.get((_family(source), target_ext))
+
+        instance = self._idle.get()
+        try:
+            if _uno() is None or filter_name is None:
+                instance.convert_cli(source, target_ext, outdir)
+            else:
+                try:
+                    instance.convert(source, target, filter_name)
+                except OfficeError:
+                    raise
+                except Exception as e:
+                    # Most likely the instance crashed, retry on a fresh one
+                    logger.warning(f"Restarting LibreOffice after: {e}")
+                    instance.stop()
+                    instance.convert(source, target, filter_name)
+        finally:
+            self._idle.put(instance)
+
+        if not os.path.exists(target):
+            raise OfficeError(f"LibreOffice produced no {target_ext} for {source}")
+        return target
+
+    def close(self) -> None:
+        """Stop every instance, also those still converting in another thread."""
+        for instance in self._instances:
+            instance.close()
+
+
+_pool = {}
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> OfficePool:
+    """The pool of this process, created on first use."""
+    pid = os.getpid()
+    with _pool_lock:
+        # A forked worker must not share the parent's pipes and instances
+        if pid not in _pool:
+            _pool.clear()
+            _pool[pid] = OfficePool(int(os.environ.get("FILEMAC_OFFICE_POOL", 1)))
+        return _pool[pid]
+
+
+def convert(source: os.PathLike, target_ext: str, outdir=None) -> str:
+    """Convert `source` with the process pool, see OfficePool.convert."""
+    return get_pool().convert(source, target_ext, outdir)
+
+
+@atexit.register
+def shutdown() -> None:
+    """Stop this process's instances, also run by exiting pool workers."""
+    pool = _pool.pop(os.getpid(), None)
+    if pool is not None:
+        pool.close()
@@ -0,0 +1,212 @@
+"""
+Lightweight span/timer instrumentation behind `--profile out.json`.
+
+Converters mark their stages with `span()` blocks or the `timed()` decorator:
+
+    with span("ocr.tesseract", file=path):
+        text = pytesseract.image_to_string(img)
+
+    @timed("doc.word_to_pdf")
+    def _word_to_pdf(self, word_file): ...
+
+While profiling is off both cost a single flag check. When on, each span is
+recorded as a Chrome trace "complete" event (open the dump in
+chrome://tracing or https://ui.perfetto.dev); the dump also carries per-stage
+totals and the peak RSS of filemac and its children (LibreOffice, ffmpeg).
+Spans recorded in `--jobs` worker processes are shipped back to the parent by
+the batch executor.
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from typing import Callable, List, Optional
+
+from .simple import logger
+
+_state = {"enabled": False, "origin": 0}
+_events: List[dict] = []
+_lock = threading.Lock()
+
+
+class _NullSpan:
+    """Shared no-op span returned while profiling is disabled."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name: str, args: dict):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        end = time.perf_counter_ns()
+        event = {
+            "name": self.name,
+            "cat": self.name.split(".", 1)[0],
+            "ph": "X",
+            "ts": (self.start - _state["origin"]) / 1000,
+            "dur": (end - self.start) / 1000,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+        }
+        if self.args or exc_type is not None:
+            args = {key: str(value) for key, value in self.args.items()}
+            if exc_type is not None:
+                args["error"] = exc_type.__name__
+            event["args"] = args
+        with _lock:
+            _events.append(event)
+        return False
+
+
+def enabled() -> bool:
+    return _state["enabled"]
+
+
+def enable() -> None:
+    """Start recording spans in this process and the workers it spawns."""
+    _state["enabled"] = True
+    _state["origin"] = time.perf_counter_ns()
+    os.environ["FILEMAC_PROFILE"] = str(_state["origin"])
+
+
+def _inherit() -> None:
+    # Spawned workers share the parent's clock origin, forked ones already
+    # have the state copied
+    origin = os.environ.get("FILEMAC_PROFILE")
+    if origin and not _state["enabled"]:
+        _state.update(enabled=True, origin=int(origin))
+
+
+_inherit()
+
+
+def span(name: str, **args):
+    """Context manager timing the enclosed block as stage `name`."""
+    if not _state["enabled"]:
+        return _NULL_SPAN
+    return _Span(name, args)
+
+
+def timed(name: Optional[str] = None) -> Callable:
+    """Decorator timing every call of the function as stage `name`."""
+
+    def decorator(func):
+        stage = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _state["enabled"]:
+                return func(*args, **kwargs)
+            with _Span(stage, {}):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def drain() -> List[dict]:
+    """Remove and return the recorded events, used to ship them across processes."""
+    with _lock:
+        events = _events[:]
+        _events.clear()
+    return events
+
+
+def merge(events: Optional[List[dict]]) -> None:
+    """Add events recorded in another process."""
+    if events:
+        with _lock:
+            _events.extend(events)
+
+
+def totals(events: List[dict]) -> dict:
+    """Per-stage call count and total/max duration in milliseconds."""
+    stages = {}
+    for event in events:
+        stage = stages.setdefault(
+            event["name"], {"count": 0, "total_ms": 0.0, "max_ms": 0.0}
+        )
+        ms = event["dur"] / 1000
+        stage["count"] += 1
+        stage["total_ms"] += ms
+        stage["max_ms"] = max(stage["max_ms"], ms)
+    for stage in stages.values():
+        stage["total_ms"] = round(stage["total_ms"], 3)
+        stage["max_ms"] = round(stage["max_ms"], 3)
+    return dict(sorted(stages.items(), key=lambda item: -item[1]["total_ms"]))
+
+
+def peak_rss() -> dict:
+    """Peak resident set size in MB of this process and of its children."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return {}
+    # ru_maxrss is in KB on Linux and in bytes on macOS
+    scale = 1024 * 1024 if os.uname().sysname == "Darwin" else 1024
+    return {
+        "self_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1),
+        "children_mb": round(
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale, 1
+        ),
+    }
+
+
+def dump(path: os.PathLike) -> dict:
+    """Write the Chrome trace with totals and peak RSS to `path`."""
+    events = drain()
+    report = {
+        "traceEvents": events,
+        "displayTimeUnit": "ms",
+        "otherData": {"totals": totals(events), "peak_rss": peak_rss()},
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f)
+    return report
+
+
+def summary(report: dict, limit: int = 15) -> str:
+    """Human readable per-stage table of a dump."""
+    lines = [f"{'stage':<36} {'calls':>6} {'total ms':>12} {'max ms':>10}"]
+    for name, stage in list(report["otherData"]["totals"].items())[:limit]:
+        lines.append(
+            f"{name:<36} {stage['count']:>6} {stage['total_ms']:>12.1f} {stage['max_ms']:>10.1f}"
+        )
+    rss = report["otherData"]["peak_rss"]
+    if rss:
+        lines.append(
+            f"peak rss: {rss['self_mb']} MB (children {rss['children_mb']} MB)"
+        )
+    return "\n".join(lines)
+
+
+def report_to(path: os.PathLike) -> None:
+    """Dump the profile to `path` and log the stage summary."""
+    try:
+        report = dump(path)
+    except OSError as e:
+        logger.error(f"Could not write profile {path}: {e}")
+        return
+    print(summary(report))
+    logger.info(f"Profile written to {path}")
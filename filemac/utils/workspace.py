@@ -0,0 +1,196 @@
+"""
+Private scratch workspaces for intermediate files.
+
+Intermediate files (speech chunks, resume state, temporary audio) used to be
+written under fixed names in the current directory, so two filemac processes
+in the same directory overwrote each other. Every operation now gets its own
+directory under the scratch root and removes it when done:
+
+    with Workspace("tts") as ws:
+        chunk = ws.file("chunk_0.ogg")
+
+A keyed workspace (`Workspace("tts", key=output)`) always maps to the same
+directory so an interrupted job can resume from it. It is locked while in use,
+a second process asking for the same key gets a fresh private workspace
+instead. With `keep_on_error` it survives a failure for the next attempt.
+
+The scratch root is `--scratch DIR` / FILEMAC_SCRATCH, else /dev/shm with
+`--tmpfs` / FILEMAC_TMPFS=1, else the system temporary directory.
+"""
+
+import atexit
+import hashlib
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+from .file_utils import TemporaryFileManager
+from .simple import logger
+
+TMPFS_DIR = Path("/dev/shm")
+
+_LOCK_NAME = ".lock"
+
+# Workspaces not cleaned up yet, removed at exit if the owner never got to it
+_live = set()
+
+
+def set_scratch_root(path: Optional[os.PathLike]) -> None:
+    """Place workspaces under `path`, inherited by worker processes."""
+    if path is None:
+        os.environ.pop("FILEMAC_SCRATCH", None)
+    else:
+        os.environ["FILEMAC_SCRATCH"] = os.fspath(path)
+
+
+def use_tmpfs(enabled: bool = True) -> None:
+    """Prefer a memory backed filesystem for workspaces."""
+    os.environ["FILEMAC_TMPFS"] = "1" if enabled else "0"
+
+
+def scratch_root() -> Path:
+    """Directory under which workspaces are created."""
+    configured = os.environ.get("FILEMAC_SCRATCH")
+    if configured:
+        root = Path(configured).expanduser()
+        root.mkdir(parents=True, exist_ok=True)
+        return root
+    if os.environ.get("FILEMAC_TMPFS", "0") not in ("", "0"):
+        if TMPFS_DIR.is_dir() and os.access(TMPFS_DIR, os.W_OK):
+            return TMPFS_DIR
+        logger.warning(f"{TMPFS_DIR} is not available, using the temporary directory")
+    return Path(tempfile.gettempdir())
+
+
+def job_key(*parts) -> str:
+    """Stable short key for a job, e.g. from its absolute output path."""
+    text = "\0".join(os.fspath(part) for part in parts)
+    return hashlib.sha256(text.encode("utf-8", "surrogateescape")).hexdigest()[:16]
+
+
+def _lock(path: Path):
+    """Exclusive non-blocking lock on `path`, None when held elsewhere."""
+    try:
+        import fcntl
+    except ImportError:  # Windows, keyed workspaces are not shared there
+        return open(path, "a")
+    handle = open(path, "a")
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        return None
+    return handle
+
+
+class Workspace:
+    """
+    Scratch directory private to one operation.
+
+    Args:
+        name: operation name, used in the directory name.
+        key: reuse the directory of a previous run with the same key, see
+            `job_key`. Without a key the directory is unique.
+        keep_on_error: leave the directory in place when the `with` block
+            raises, so a keyed job can resume.
+        fresh: empty a keyed directory left by a previous run.
+    """
+
+    def __init__(
+        self,
+        name: str = "job",
+        key: Optional[str] = None,
+        keep_on_error: bool = False,
+        fresh: bool = False,
+    ):
+        self.keep_on_error = keep_on_error
+        self._files = TemporaryFileManager(
+            prefix=f"filemac_{name}_", root=scratch_root()
+        )
+        self._lock = None
+        self.path = None
+        if key is not None:
+            self.path = Path(self._files.root) / f"filemac_{name}_{key}"
+            self.path.mkdir(parents=True, exist_ok=True)
+            self._lock = _lock(self.path / _LOCK_NAME)
+            if self._lock is None:
+                logger.warning(
+                    f"{self.path} is in use by another process, not resuming"
+                )
+                self.path = None
+            else:
+                if fresh:
+                    self._clear()
+                self._files.temp_dirs.append(self.path)
+        if self.path is None:
+            self.path = self._files.create_temp_dir()
+        # Forked workers inherit the object, only its creator removes it
+        self._owner = os.getpid()
+        _live.add(self)
+
+    def file(self, name: str) -> Path:
+        """Path of `name` inside the workspace."""
+        return self.path / name
+
+    def temp_file(self, suffix: str = "") -> Path:
+        """Create a new uniquely named empty file in the workspace."""
+        fd, path = tempfile.mkstemp(suffix=suffix, dir=self.path)
+        os.close(fd)
+        return Path(path)
+
+    def files(self, pattern: str = "*"):
+        """Files in the workspace matching `pattern`, bookkeeping excluded."""
+        return sorted(
+            path
+            for path in self.path.glob(pattern)
+            if path.is_file() and path.name != _LOCK_NAME
+        )
+
+    def _clear(self) -> None:
+        for entry in self.path.iterdir():
+            if entry.name == _LOCK_NAME:
+                continue
+            if entry.is_dir():
+                shutil.rmtree(entry, ignore_errors=True)
+            else:
+                entry.unlink(missing_ok=True)
+
+    def cleanup(self) -> None:
+        """Remove the workspace and release its lock."""
+        self._files.cleanup()
+        self._release()
+
+    def _release(self) -> None:
+        if self._lock is not None:
+            self._lock.close()
+            self._lock = None
+        _live.discard(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is not None and self.keep_on_error:
+            logger.info(f"Keeping {self.path} to resume")
+            self._release()
+        else:
+            self.cleanup()
+        return False
+
+    def __repr__(self):
+        return f"Workspace({str(self.path)!r})"
+
+
+@atexit.register
+def cleanup_live() -> None:
+    """Remove this process's workspaces, also run by exiting pool workers."""
+    for workspace in list(_live):
+        if workspace._owner != os.getpid():
+            continue
+        if workspace.keep_on_error:
+            # The owner exited without finishing, keep it for resuming
+            workspace._release()
+        else:
+            workspace.cleanup()
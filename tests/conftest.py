@@ -0,0 +1,18 @@
+import pytest
+
+from filemac.utils import cache, executor, workspace
+
+
+@pytest.fixture(autouse=True)
+def isolated(tmp_path, monkeypatch):
+    """Keep the cache, scratch directories and settings of a test to itself."""
+    monkeypatch.setattr(cache, "CACHE_ROOT", tmp_path / "cache")
+    # Set rather than deleted, so changes made by a test are undone
+    monkeypatch.setenv("FILEMAC_NO_CACHE", "0")
+    monkeypatch.setenv("FILEMAC_SCRATCH", str(tmp_path / "scratch"))
+    monkeypatch.setenv("FILEMAC_TMPFS", "0")
+    monkeypatch.delenv("FILEMAC_JOBS", raising=False)
+    monkeypatch.setitem(executor._settings, "jobs", None)
+    yield
+    for ws in list(workspace._live):
+        ws.cleanup()
@@ -0,0 +1,165 @@
+import os
+
+from filemac.utils import cache
+from filemac.utils.cache import (
+    ConversionCache,
+    cached_conversion,
+    cached_value,
+    reported_outputs,
+    set_cache_enabled,
+)
+
+
+def write(path, text):
+    path.write_text(text)
+    return path
+
+
+def convert(source, calls):
+    """A converter writing `<stem>.out` next to `source`."""
+
+    def produce():
+        calls.append(source)
+        output = source.with_suffix(".out")
+        output.write_text(source.read_text().upper())
+        return str(output)
+
+    return produce
+
+
+def test_key_follows_the_content_not_the_name(tmp_path):
+    store = ConversionCache()
+    a = write(tmp_path / "a.txt", "same")
+    b = write(tmp_path / "b.txt", "same")
+    c = write(tmp_path / "c.txt", "other")
+    assert store.key(a, "op") == store.key(b, "op")
+    assert store.key(a, "op") != store.key(c, "op")
+    assert store.key(a, "op") != store.key(a, "op", {"dpi": 300})
+    assert store.key(a, "op") != store.key(a, "other op")
+
+
+def test_key_includes_the_extension(tmp_path):
+    store = ConversionCache()
+    txt = write(tmp_path / "a.txt", "same")
+    docx = write(tmp_path / "a.docx", "same")
+    assert store.key(txt, "op") != store.key(docx, "op")
+
+
+def test_hit_restores_under_the_new_name(tmp_path):
+    calls = []
+    first = write(tmp_path / "first.txt", "hello")
+    assert cached_conversion(first, "upper", convert(first, calls)) == [
+        str(tmp_path / "first.out")
+    ]
+    copy = write(tmp_path / "copy.txt", "hello")
+    restored = cached_conversion(copy, "upper", convert(copy, calls))
+    assert restored == [str(tmp_path / "copy.out")]
+    assert (tmp_path / "copy.out").read_text() == "HELLO"
+    assert calls == [first]
+    stats = ConversionCache().stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+
+
+def test_edited_input_misses(tmp_path):
+    calls = []
+    source = write(tmp_path / "a.txt", "one")
+    cached_conversion(source, "upper", convert(source, calls))
+    write(source, "two")
+    cached_conversion(source, "upper", convert(source, calls))
+    assert len(calls) == 2
+    assert (tmp_path / "a.out").read_text() == "TWO"
+
+
+def test_restored_output_is_a_copy(tmp_path):
+    source = write(tmp_path / "a.txt", "text")
+    cached_conversion(source, "upper", convert(source, []))
+    (tmp_path / "a.out").write_text("edited")
+    os.remove(tmp_path / "a.out")
+    cached_conversion(source, "upper", convert(source, []))
+    assert (tmp_path / "a.out").read_text() == "TEXT"
+
+
+def test_failed_conversion_is_not_stored(tmp_path):
+    source = write(tmp_path / "a.txt", "text")
+    # A converter that logged its failure after writing part of the output
+    (tmp_path / "a.out").write_text("partial")
+    assert cached_conversion(source, "upper", lambda: None) == []
+    assert ConversionCache().stats()["entries"] == 0
+
+
+def test_only_reported_outputs_are_stored(tmp_path):
+    source = write(tmp_path / "a.txt", "text")
+    # Written by a sibling input converted at the same time
+    write(tmp_path / "a_b.out", "not ours")
+    cached_conversion(source, "upper", convert(source, []))
+    os.remove(tmp_path / "a.out")
+    os.remove(tmp_path / "a_b.out")
+    restored = cached_conversion(source, "upper", convert(source, []))
+    assert restored == [str(tmp_path / "a.out")]
+    assert not (tmp_path / "a_b.out").exists()
+
+
+def test_outputs_elsewhere_are_not_stored(tmp_path):
+    source = write(tmp_path / "a.txt", "text")
+    (tmp_path / "out").mkdir()
+    output = write(tmp_path / "out" / "a.out", "TEXT")
+    assert cached_conversion(source, "upper", lambda: str(output)) == [str(output)]
+    assert ConversionCache().stats()["entries"] == 0
+
+
+def test_disabled_cache_always_converts(tmp_path):
+    set_cache_enabled(False)
+    calls = []
+    source = write(tmp_path / "a.txt", "text")
+    cached_conversion(source, "upper", convert(source, calls))
+    cached_conversion(source, "upper", convert(source, calls))
+    assert len(calls) == 2
+    assert not cache.CACHE_ROOT.exists()
+
+
+def test_cached_value(tmp_path):
+    calls = []
+    source = write(tmp_path / "scan.png", "pixels")
+
+    def ocr():
+        calls.append(1)
+        return "recognized text"
+
+    assert cached_value(source, "ocr", ocr) == "recognized text"
+    assert cached_value(source, "ocr", ocr) == "recognized text"
+    assert calls == [1]
+
+
+def test_eviction_drops_the_least_recently_used(tmp_path):
+    store = ConversionCache(max_size=1500)
+    keys = []
+    for n in range(3):
+        source = write(tmp_path / f"in{n}.txt", str(n) * 600)
+        output = write(tmp_path / f"in{n}.out", str(n) * 600)
+        keys.append(store.key(source, "op"))
+        store.store(keys[-1], source, [output])
+        # Entries are ordered by mtime, keep them apart
+        os.utime(store._entry(keys[-1]), (n, n))
+    assert store.stats()["entries"] == 2
+    assert not store._entry(keys[0]).exists()
+    assert store._entry(keys[2]).exists()
+
+
+def test_corrupt_entry_is_a_miss(tmp_path):
+    store = ConversionCache()
+    source = write(tmp_path / "a.txt", "text")
+    output = write(tmp_path / "a.out", "TEXT")
+    key = store.key(source, "op")
+    store.store(key, source, [output])
+    (store._entry(key) / ".out").write_text("truncated")
+    assert store.lookup(key, source) is None
+    assert not store._entry(key).exists()
+
+
+def test_reported_outputs(tmp_path):
+    output = write(tmp_path / "a.out", "")
+    assert reported_outputs(str(output)) == [str(output)]
+    assert reported_outputs(output) == [str(output)]
+    assert reported_outputs([output, tmp_path / "missing.out"]) == [str(output)]
+    assert reported_outputs(None) == []
+    assert reported_outputs(True) == []
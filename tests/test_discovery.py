@@ -0,0 +1,68 @@
+import os
+
+import pytest
+
+from filemac.utils.discovery import discover, sniff
+
+
+@pytest.fixture
+def tree(tmp_path):
+    (tmp_path / "a.PDF").write_bytes(b"%PDF-1.7")
+    (tmp_path / "notes.txt").write_text("notes")
+    # A pdf without its extension
+    (tmp_path / "scan").write_bytes(b"%PDF-1.4")
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "b.pdf").write_bytes(b"%PDF-1.7")
+    (tmp_path / "sub" / "deep").mkdir()
+    (tmp_path / "sub" / "deep" / "c.pdf").write_bytes(b"%PDF-1.7")
+    (tmp_path / ".git").mkdir()
+    (tmp_path / ".git" / "d.pdf").write_bytes(b"%PDF-1.7")
+    return tmp_path
+
+
+def names(paths):
+    return sorted(os.path.basename(path) for path in paths)
+
+
+def test_extensions_are_case_insensitive(tree):
+    assert names(discover(tree, extensions=["pdf"])) == ["a.PDF"]
+    assert names(discover(tree, extensions=".pdf")) == ["a.PDF"]
+
+
+def test_recursive(tree):
+    found = discover(tree, extensions=["pdf"], recursive=True)
+    assert names(found) == ["a.PDF", "b.pdf", "c.pdf", "d.pdf"]
+
+
+def test_ignored_directories_are_not_entered(tree):
+    found = discover(
+        tree, extensions=["pdf"], recursive=True, ignore=[".git", "sub/deep"]
+    )
+    assert names(found) == ["a.PDF", "b.pdf"]
+
+
+def test_magic_matches_files_without_extension(tree):
+    assert names(discover(tree, extensions=["pdf"], magic=["pdf"])) == [
+        "a.PDF",
+        "scan",
+    ]
+
+
+def test_unknown_signature_is_rejected(tree):
+    with pytest.raises(ValueError):
+        list(discover(tree, magic=["nonsense"]))
+
+
+def test_patterns(tree):
+    assert names(discover(tree, patterns=["n*"])) == ["notes.txt"]
+
+
+def test_files_are_filtered_like_discovered_ones(tree):
+    files = [tree / "notes.txt", tree / "a.PDF", tree / "missing.pdf"]
+    assert names(discover(files, extensions=["pdf"])) == ["a.PDF"]
+
+
+def test_sniff(tree):
+    assert sniff(tree / "scan") == "pdf"
+    assert sniff(tree / "notes.txt") is None
+    assert sniff(tree / "missing") is None
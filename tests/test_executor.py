@@ -0,0 +1,105 @@
+import time
+
+import pytest
+
+from filemac.utils.executor import (
+    BatchExecutor,
+    get_jobs,
+    merge_streams,
+    ordered_map,
+    run_batch,
+    set_jobs,
+)
+
+
+def square(n):
+    return n * n
+
+
+def slow_square(n):
+    # Later items finish first, results must still come back in input order
+    time.sleep(0.05 * (4 - n))
+    return n * n
+
+
+def fail_on_two(n):
+    if n == 2:
+        raise ValueError("two")
+    return n
+
+
+def count_up(n):
+    yield from range(n)
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_map_keeps_input_order(jobs):
+    results = BatchExecutor(jobs=jobs, progress=False).map(slow_square, range(4))
+    assert [result.item for result in results] == [0, 1, 2, 3]
+    assert [result.value for result in results] == [0, 1, 4, 9]
+    assert all(result.ok for result in results)
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_failing_item_does_not_stop_the_batch(jobs):
+    results = BatchExecutor(jobs=jobs, progress=False).map(fail_on_two, range(4))
+    assert [result.ok for result in results] == [True, True, False, True]
+    assert "two" in results[2].error
+    assert results[2].value is None
+
+
+def test_run_batch_returns_the_successful_values():
+    set_jobs(1)
+    assert run_batch(fail_on_two, [1, 2, 3]) == [1, 3]
+
+
+def test_lazy_items_are_consumed():
+    results = BatchExecutor(jobs=2, progress=False).map(square, iter(range(10)))
+    assert [result.value for result in results] == [n * n for n in range(10)]
+
+
+def test_failing_callback_cancels_the_queued_items():
+    seen = []
+
+    def stop(result):
+        seen.append(result)
+        raise KeyboardInterrupt
+
+    executor = BatchExecutor(jobs=2, progress=False, on_result=stop)
+    with pytest.raises(KeyboardInterrupt):
+        executor.map(square, range(50))
+    assert len(seen) == 1
+
+
+def test_memory_budget_runs_heavy_items_alone():
+    executor = BatchExecutor(
+        jobs=2, progress=False, cost=lambda n: 100, memory_budget=150
+    )
+    results = executor.map(square, range(4))
+    assert [result.value for result in results] == [0, 1, 4, 9]
+
+
+def test_set_jobs_rejects_negative_counts():
+    with pytest.raises(ValueError):
+        set_jobs(-1)
+
+
+def test_jobs_from_the_environment(monkeypatch):
+    monkeypatch.setenv("FILEMAC_JOBS", "3")
+    assert get_jobs() == 3
+    set_jobs(2)
+    assert get_jobs() == 2
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_ordered_map(jobs):
+    assert list(ordered_map(slow_square, range(4), jobs)) == [0, 1, 4, 9]
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_merge_streams_keeps_the_order_of_each_item(jobs):
+    merged = list(merge_streams(count_up, [3, 5], jobs))
+    for item in (3, 5):
+        assert [value for source, value in merged if source == item] == list(
+            range(item)
+        )
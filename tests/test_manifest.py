@@ -0,0 +1,88 @@
+import json
+import os
+
+from filemac.utils.manifest import MANIFEST_NAME, ConversionManifest
+
+
+def converted(tmp_path, name="a.txt"):
+    source = tmp_path / name
+    source.write_text("content")
+    output = source.with_suffix(".pdf")
+    output.write_text("pdf")
+    return source, output
+
+
+def test_recorded_source_is_current(tmp_path):
+    source, output = converted(tmp_path)
+    manifest = ConversionManifest(tmp_path, "pdf")
+    assert not manifest.is_current(source)
+    manifest.record(source, [output])
+    assert manifest.is_current(source)
+    assert manifest.outputs() == {"a.pdf"}
+
+
+def test_survives_a_reload(tmp_path):
+    source, output = converted(tmp_path)
+    manifest = ConversionManifest(tmp_path, "pdf")
+    manifest.record(source, [output])
+    manifest.save()
+    assert ConversionManifest(tmp_path, "PDF").is_current(source)
+    assert not ConversionManifest(tmp_path, "docx").is_current(source)
+
+
+def test_edit_invalidates(tmp_path):
+    source, output = converted(tmp_path)
+    manifest = ConversionManifest(tmp_path, "pdf")
+    manifest.record(source, [output])
+    source.write_text("edited content")
+    assert not manifest.is_current(source)
+
+
+def test_touch_keeps_the_record(tmp_path):
+    source, output = converted(tmp_path)
+    manifest = ConversionManifest(tmp_path, "pdf")
+    manifest.record(source, [output])
+    st = os.stat(source)
+    os.utime(source, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert manifest.is_current(source)
+
+
+def test_missing_output_invalidates(tmp_path):
+    source, output = converted(tmp_path)
+    manifest = ConversionManifest(tmp_path, "pdf")
+    manifest.record(source, [output])
+    os.remove(output)
+    assert not manifest.is_current(source)
+
+
+def test_failed_conversion_is_not_recorded(tmp_path):
+    source, output = converted(tmp_path)
+    manifest = ConversionManifest(tmp_path, "pdf")
+    manifest.record(source, [])
+    manifest.record(source, [output, tmp_path / "a_2.pdf"])
+    assert not manifest.records
+
+
+def test_prune_removes_the_outputs_of_deleted_sources(tmp_path):
+    kept, kept_output = converted(tmp_path, "kept.txt")
+    gone, gone_output = converted(tmp_path, "gone.txt")
+    manifest = ConversionManifest(tmp_path, "pdf")
+    manifest.record(kept, [kept_output])
+    manifest.record(gone, [gone_output])
+    os.remove(gone)
+    assert manifest.prune([kept]) == [str(gone_output)]
+    assert not gone_output.exists()
+    assert kept_output.exists()
+    assert list(manifest.records) == ["kept.txt"]
+
+
+def test_unreadable_manifest_starts_over(tmp_path):
+    (tmp_path / MANIFEST_NAME).write_text("{not json")
+    assert ConversionManifest(tmp_path, "pdf").records == {}
+    (tmp_path / MANIFEST_NAME).write_text(json.dumps({"version": 0}))
+    assert ConversionManifest(tmp_path, "pdf").records == {}
+
+
+def test_save_is_skipped_without_changes(tmp_path):
+    ConversionManifest(tmp_path, "pdf").save()
+    assert not (tmp_path / MANIFEST_NAME).exists()
@@ -0,0 +1,79 @@
+import pytest
+
+from filemac.core import planner
+from filemac.core.planner import Cost, edge_cost, plan
+
+
+@pytest.fixture(autouse=True)
+def no_measured_costs(monkeypatch):
+    monkeypatch.setattr(planner, "measured_costs", lambda: {})
+
+
+def test_cheapest_chain():
+    edges = {
+        ("a", "b"): Cost(1.0, 0.0),
+        ("b", "c"): Cost(1.0, 0.0),
+        ("a", "c"): Cost(5.0, 0.0),
+    }
+    result = plan(edges, "a", "c")
+    assert result.formats == ["a", "b", "c"]
+    assert result.seconds == pytest.approx(2.0)
+
+
+def test_large_inputs_prefer_edges_cheap_per_mb():
+    edges = {
+        # Slow to start, fast per MB, like LibreOffice
+        ("a", "c"): Cost(10.0, 0.1),
+        ("a", "b"): Cost(0.0, 1.0),
+        ("b", "c"): Cost(0.0, 1.0),
+    }
+    assert plan(edges, "a", "c", size=1_000_000).formats == ["a", "b", "c"]
+    assert plan(edges, "a", "c", size=100_000_000).formats == ["a", "c"]
+
+
+def test_ratio_sizes_the_next_step():
+    edges = {("a", "b"): Cost(0.0, 1.0, ratio=0.5), ("b", "c"): Cost(0.0, 2.0)}
+    result = plan(edges, "a", "c", size=4_000_000)
+    assert [step.size for step in result.steps] == [4_000_000, 2_000_000]
+    assert [step.seconds for step in result.steps] == pytest.approx([4.0, 4.0])
+
+
+def test_fewest_steps_among_equal_costs():
+    edges = {
+        ("a", "b"): Cost(0.0, 0.0),
+        ("b", "c"): Cost(0.0, 0.0),
+        ("a", "c"): Cost(0.0, 0.0),
+    }
+    assert plan(edges, "a", "c").formats == ["a", "c"]
+
+
+def test_unreachable_target():
+    with pytest.raises(ValueError):
+        plan({("a", "b"): None}, "a", "c")
+
+
+def test_nothing_to_convert():
+    result = plan({}, "a", "a")
+    assert result.steps == []
+    assert result.describe() == "a: nothing to convert"
+
+
+def test_cost_origins():
+    assert edge_cost(("docx", "txt")) == (planner.COSTS["docx", "txt"], "reference")
+    assert edge_cost(("x", "y"), Cost(1.0)) == (Cost(1.0), "estimate")
+    assert edge_cost(("x", "y")) == (planner.DEFAULT_COST, "default")
+
+
+def test_measured_costs_take_precedence(monkeypatch):
+    measured = {("docx", "txt"): Cost(0.0, 9.0)}
+    monkeypatch.setattr(planner, "measured_costs", lambda: measured)
+    assert edge_cost(("docx", "txt")) == (measured["docx", "txt"], "measured")
+
+
+def test_describe():
+    edges = {("a", "b"): Cost(0.5, 0.0, ratio=2.0)}
+    text = plan(edges, "a", "b", size=1_000_000).describe()
+    assert text.splitlines() == [
+        "a -> b: about 500ms for 1.00 MB",
+        "  1. a -> b  500ms for 1.00 MB (estimate)",
+    ]
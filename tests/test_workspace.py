@@ -0,0 +1,58 @@
+import pytest
+
+from filemac.utils.workspace import Workspace, job_key, scratch_root
+
+
+def test_scratch_root_from_the_environment(tmp_path):
+    assert scratch_root() == tmp_path / "scratch"
+    with Workspace("test") as ws:
+        assert ws.path.parent == tmp_path / "scratch"
+
+
+def test_cleanup_removes_the_directory():
+    with Workspace("test") as ws:
+        ws.file("out.txt").write_text("data")
+        scratch = ws.temp_file(".wav")
+        assert scratch.suffix == ".wav"
+        assert ws.files() == sorted([ws.file("out.txt"), scratch])
+    assert not ws.path.exists()
+
+
+def test_unkeyed_workspaces_are_unique():
+    with Workspace("test") as a, Workspace("test") as b:
+        assert a.path != b.path
+
+
+def test_keyed_workspace_is_kept_on_error_and_resumed():
+    key = job_key("/out/book.pdf")
+    with pytest.raises(RuntimeError):
+        with Workspace("test", key=key, keep_on_error=True) as ws:
+            ws.file("page-1.png").write_text("done")
+            raise RuntimeError
+    assert ws.path.exists()
+    with Workspace("test", key=key, keep_on_error=True) as resumed:
+        assert resumed.path == ws.path
+        assert resumed.files() == [resumed.file("page-1.png")]
+    assert not ws.path.exists()
+
+
+def test_fresh_empties_a_keyed_workspace():
+    key = job_key("/out/book.pdf")
+    ws = Workspace("test", key=key, keep_on_error=True)
+    ws.file("stale.png").write_text("stale")
+    ws._release()
+    with Workspace("test", key=key, fresh=True) as fresh:
+        assert fresh.files() == []
+
+
+def test_a_locked_workspace_is_not_shared():
+    key = job_key("/out/book.pdf")
+    with Workspace("test", key=key) as owner:
+        with Workspace("test", key=key) as other:
+            assert other.path != owner.path
+
+
+def test_job_key_is_stable():
+    assert job_key("a", "b") == job_key("a", "b")
+    assert job_key("a", "b") != job_key("ab")
+    assert len(job_key("a")) == 16